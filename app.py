@@ -6,15 +6,18 @@ from dotenv import load_dotenv
 import os
 from flask_cors import CORS # Importa a extensão CORS
 
+# Carrega as variáveis de ambiente do .env antes de importar config.py, que as lê na importação
+load_dotenv()
+
 # Importa as configurações do seu novo arquivo config.py
 from config import Config
 
-# Carrega as variáveis de ambiente do .env
-load_dotenv()
-
 app = Flask(__name__)
 CORS(app) # Habilita CORS para todas as rotas e origens (para desenvolvimento)
 
+# Mesmo custo usado pelo pool de hash de utils/senha_utils.py
+app.config['BCRYPT_LOG_ROUNDS'] = Config.BCRYPT_CUSTO
+
 # Inicializa o Bcrypt e o anexa ao objeto 'app'
 # Isso o torna acessível em outros módulos via current_app.bcrypt
 bcrypt = Bcrypt(app)
@@ -23,6 +26,14 @@ app.bcrypt = bcrypt # LINHA CRUCIAL PARA RESOLVER O AttributeError
 # Configura o Flask com as chaves do Config
 app.config['SECRET_KEY'] = Config.SECRET_KEY
 
+# JSON das respostas com orjson, se instalado; datas e Decimal das linhas do MySQL saem direto
+from utils.json_utils import ProvedorJSONRapido
+app.json = ProvedorJSONRapido(app)
+
+# Latência por rota, tempo de SQL e serialização, expostos em /metrics (utils/metricas.py)
+from utils import metricas
+metricas.init_app(app)
+
 # --- Rotas de Teste Simples (podem permanecer aqui ou serem movidas, para simplicidade deixamos) ---
 @app.route('/')
 def hello_world():
@@ -39,20 +50,37 @@ def test_db_connection():
     else:
         return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados MySQL. Verifique as credenciais e se o MySQL está rodando."}), 500
 
+@app.route('/db/pool')
+def metricas_db_pool():
+    # Métricas do pool de conexões deste processo (em uso, aguardando, criadas, recicladas)
+    # e de cada réplica de leitura (saúde, atraso)
+    from utils.db_utils import metricas_pool, metricas_replicas
+    return jsonify({"status": "sucesso", "pool": metricas_pool(), "replicas": metricas_replicas()})
+
+@app.route('/cache/metricas')
+def metricas_cache_respostas():
+    # Taxa de acerto e memória do cache de listagens (utils/cache_utils.py)
+    from utils.cache_utils import metricas_respostas
+    return jsonify({"status": "sucesso", "cache": metricas_respostas()})
+
 # --- Registro de Blueprints (Os conjuntos de rotas que foram criadas) ---
 # Importa os blueprints das rotas
 from routes.auth_routes import auth_bp
 from routes.livro_routes import livro_bp
 from routes.categoria_routes import categoria_bp
+from routes.capa_routes import capa_bp
+from routes.sync_routes import sync_bp
 
 # Registra os blueprints no aplicativo Flask
 app.register_blueprint(auth_bp)
 app.register_blueprint(livro_bp)
 app.register_blueprint(categoria_bp)
+app.register_blueprint(capa_bp)
+app.register_blueprint(sync_bp)
 
 
 # --- Execução do Aplicativo ---
 if __name__ == '__main__':
-    # Apenas para depuração. NÃO USE em produção.
+    # Apenas para depuração. NÃO USE em produção: gunicorn -c gunicorn.conf.py wsgi:app
     # use_reloader=False é mantido para evitar o erro de rota duplicada
     app.run(debug=True, port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,402 @@
+# benchmarks/bench_api.py
+# Carga reproduzível na API: sobe o app.py num servidor HTTP local, cria usuários sintéticos com
+# catálogos de 1k/100k livros e mede vazão e latência p50/p99 de cada rota. O buscar-isbn aponta
+# para um servidor local que imita a Google Books API. O resultado sai em JSON, para comparar execuções.
+#
+# Usa o banco configurado em .env (as migrações são aplicadas). Os usuários bench_* são apagados
+# no final, a menos que --manter seja usado (aí a próxima execução os reaproveita).
+#
+# Uso:
+#   python benchmarks/bench_api.py [--catalogos 1000,100000] [--requisicoes 200] [--concorrencia 8]
+#                                  [--saida resultado.json] [--comparar base.json --tolerancia 0.2]
+#   python benchmarks/bench_api.py --resultado atual.json --comparar base.json   (só compara)
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SENHA = 'senha-do-benchmark'
+PALAVRAS = [
+    'amor', 'guerra', 'história', 'coração', 'noite', 'cidade', 'memórias', 'sertão',
+    'viagem', 'segredo', 'tempo', 'mar', 'ciência', 'programação', 'python', 'dados',
+    'machado', 'assis', 'clarice', 'lispector', 'jorge', 'amado', 'rosa', 'graciliano'
+]
+EDITORAS = ['Companhia das Letras', 'Rocco', 'Record', 'Intrínseca', "O'Reilly", 'Novatec']
+GENEROS = ['Romance', 'Ficção', 'Técnico', 'Poesia', 'Biografia', 'Fantasia']
+IDIOMAS = ['pt', 'en', 'es']
+TERMOS = ['coracao', 'machado assis', 'program', 'sertão']
+CATEGORIAS_POR_USUARIO = 20
+
+# --- Google Books de mentira ---
+
+class GoogleBooksFalso(BaseHTTPRequestHandler):
+    atraso = 0.0
+
+    def do_GET(self):
+        if self.atraso:
+            time.sleep(self.atraso)
+        corpo = json.dumps({"totalItems": 1, "items": [{"volumeInfo": {
+            "title": "Livro de Teste", "authors": ["Autora Exemplo"], "publisher": "Editora Local",
+            "publishedDate": "2020-01-01", "pageCount": 321, "language": "pt", "categories": ["Ficção"],
+            "imageLinks": {"thumbnail": "http://localhost/capa.jpg"}
+        }}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+def iniciar_servidor(servidor):
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_address[1]}"
+
+# --- Dados sintéticos ---
+
+def frase(n):
+    return ' '.join(random.choice(PALAVRAS) for _ in range(n)).capitalize()
+
+def livro_sintetico(i):
+    fim = f"20{random.randint(10, 24)}-0{random.randint(1, 9)}-1{random.randint(0, 9)}" if random.random() < 0.4 else None
+    return {
+        "isbn": f"978{i:010d}", "titulo": frase(3), "autores": frase(2),
+        "genero": random.choice(GENEROS), "editora": random.choice(EDITORAS),
+        "ano_publicacao": random.randint(1900, 2024), "numero_paginas": random.randint(80, 900),
+        "idioma": random.choice(IDIOMAS), "notas_pessoais": frase(8), "data_fim_leitura": fim,
+    }
+
+def preparar_usuario(cliente, total_livros, lote=5000):
+    """Cria (ou reaproveita) o usuário bench_<total> com o catálogo já populado.
+    Retorna (token, id_usuario, ids_livros, ids_categorias)."""
+    from utils.db_utils import get_db_connection
+    from utils.estatisticas_utils import reconstruir_estatisticas
+
+    username = f"bench_{total_livros}"
+    cliente.post('/registrar', json={"username": username, "password": SENHA}) # 409 se já existir
+    resposta = cliente.post('/login', json={"username": username, "password": SENHA})
+    resposta.raise_for_status()
+    token, id_usuario = resposta.json()['token'], resposta.json()['user_id']
+
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Falha ao conectar ao banco de dados. Verifique as credenciais no .env.")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM livros WHERE id_usuario = %s", (id_usuario,))
+        if cursor.fetchone()[0] != total_livros:
+            print(f"Populando {username} com {total_livros} livros...")
+            cursor.execute("DELETE FROM livros WHERE id_usuario = %s", (id_usuario,))
+            cursor.execute("DELETE FROM categorias WHERE id_usuario = %s", (id_usuario,))
+            cursor.executemany(
+                "INSERT INTO categorias (nome, descricao, id_usuario) VALUES (%s, %s, %s)",
+                [(f"Categoria {n}", frase(4), id_usuario) for n in range(CATEGORIAS_POR_USUARIO)]
+            )
+            colunas = list(livro_sintetico(0)) + ['id_usuario']
+            sql = f"INSERT INTO livros ({', '.join(colunas)}) VALUES ({', '.join(['%s'] * len(colunas))})"
+            for inicio in range(0, total_livros, lote):
+                linhas = [
+                    tuple(livro_sintetico(i).values()) + (id_usuario,)
+                    for i in range(inicio, min(inicio + lote, total_livros))
+                ]
+                cursor.executemany(sql, linhas)
+                conn.commit()
+            # Um terço dos livros numa categoria, distribuídos entre as categorias do usuário
+            cursor.execute("SELECT id FROM categorias WHERE id_usuario = %s ORDER BY id", (id_usuario,))
+            categorias = [linha[0] for linha in cursor.fetchall()]
+            cursor.execute("SELECT id FROM livros WHERE id_usuario = %s AND MOD(id, 3) = 0", (id_usuario,))
+            pares = [(linha[0], categorias[linha[0] % len(categorias)]) for linha in cursor.fetchall()]
+            for inicio in range(0, len(pares), lote):
+                cursor.executemany("INSERT INTO livro_categoria (id_livro, id_categoria) VALUES (%s, %s)",
+                                   pares[inicio:inicio + lote])
+            conn.commit()
+            reconstruir_estatisticas(conn, id_usuario)
+            cursor.execute("ANALYZE TABLE livros, livro_categoria")
+            cursor.fetchall()
+        cursor.execute("SELECT id FROM livros WHERE id_usuario = %s ORDER BY id", (id_usuario,))
+        ids_livros = [linha[0] for linha in cursor.fetchall()]
+        cursor.execute("SELECT id FROM categorias WHERE id_usuario = %s ORDER BY id", (id_usuario,))
+        ids_categorias = [linha[0] for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+    return token, id_usuario, ids_livros, ids_categorias
+
+def remover_usuario(id_usuario):
+    from utils.db_utils import get_db_connection
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    try:
+        # livros, categorias e associações saem em cascata; as tabelas abaixo não têm chave estrangeira
+        cursor.execute("DELETE FROM estatisticas_usuario WHERE id_usuario = %s", (id_usuario,))
+        cursor.execute("DELETE FROM alteracoes WHERE id_usuario = %s", (id_usuario,))
+        cursor.execute("DELETE FROM alteracoes_sequencia WHERE id_usuario = %s", (id_usuario,))
+        cursor.execute("DELETE FROM usuarios WHERE id = %s", (id_usuario,))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+# --- Cenários ---
+
+def cenarios(username, token, ids_livros, ids_categorias):
+    """[(nome, função(sessão) -> resposta, status esperados)] na ordem em que são executados."""
+    headers = {'Authorization': f'Bearer {token}'}
+    sequencia = itertools.count(10 ** 12) # ISBNs novos, fora da faixa do catálogo sintético
+    criados = [] # Livros criados pelo cenário de criação, usados por atualizar/excluir
+    criados_lock = threading.Lock()
+    categoria = ids_categorias[0]
+
+    def get(caminho, **params):
+        return lambda s: s.get(caminho, params=params, headers=headers)
+
+    def criar(s):
+        resposta = s.post('/livros', headers=headers, json=livro_sintetico(next(sequencia)))
+        if resposta.status_code == 201:
+            with criados_lock:
+                criados.append(resposta.json()['livro_cadastrado']['id'])
+        return resposta
+
+    def um_criado(remover=False):
+        with criados_lock:
+            if not criados:
+                return None
+            return criados.pop() if remover else random.choice(criados)
+
+    def atualizar(s):
+        return s.put(f'/livros/{um_criado()}', headers=headers,
+                     json={"notas_pessoais": frase(6), "numero_paginas": random.randint(80, 900)})
+
+    def excluir(s):
+        return s.delete(f'/livros/{um_criado(remover=True)}', headers=headers)
+
+    def associar(metodo):
+        return lambda s: s.request(
+            metodo, f'/livros/{random.choice(ids_livros)}/categorias/{random.choice(ids_categorias)}', headers=headers)
+
+    def associar_lote(metodo):
+        return lambda s: s.request(metodo, '/livros/categorias/lote', headers=headers, json={
+            "livros": random.sample(ids_livros, min(50, len(ids_livros))), "categorias": [categoria]})
+
+    lista = [
+        ("login", lambda s: s.post('/login', json={"username": username, "password": SENHA}), (200,)),
+        ("livros padrao", get('/livros'), (200,)),
+        ("livros paginado", get('/livros', limite=50), (200,)),
+    ]
+    for campo in ['titulo', 'autores', 'ano_publicacao', 'data_cadastro', 'id']:
+        lista.append((f"livros ordenar_por={campo}", get('/livros', ordenar_por=campo, ordem='DESC', limite=50), (200,)))
+    lista += [
+        ("livros genero", get('/livros', genero=GENEROS[0], limite=50), (200,)),
+        ("livros editora", get('/livros', editora=EDITORAS[0], limite=50), (200,)),
+        ("livros idioma", get('/livros', idioma=IDIOMAS[0], limite=50), (200,)),
+        ("livros categoria_id", get('/livros', categoria_id=categoria, limite=50), (200,)),
+        ("livros incluir=categorias", get('/livros', limite=50, incluir='categorias'), (200,)),
+    ]
+    for termo in TERMOS:
+        lista.append((f"busca '{termo}'", get('/livros', busca=termo, limite=50), (200,)))
+    lista += [
+        ("estatisticas", get('/livros/estatisticas'), (200,)),
+        ("categorias", get('/categorias'), (200,)),
+        ("livro por id", lambda s: s.get(f'/livros/{random.choice(ids_livros)}', headers=headers), (200,)),
+        ("criar livro", criar, (201,)),
+        ("atualizar livro", atualizar, (200,)),
+        ("excluir livro", excluir, (200,)),
+        ("associar categoria", associar('POST'), (201, 409)),
+        ("desassociar categoria", associar('DELETE'), (200, 404)),
+        ("associar lote", associar_lote('POST'), (200,)),
+        ("desassociar lote", associar_lote('DELETE'), (200,)),
+        ("buscar-isbn", lambda s: s.get('/livros/buscar-isbn', headers=headers,
+                                        params={"isbn": f"978{random.randint(0, 10 ** 10 - 1):010d}"}), (200, 404)),
+    ]
+    return lista
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+def executar(base_url, funcao, esperados, requisicoes, concorrencia, aquecimento):
+    import requests
+    local = threading.local()
+
+    def sessao():
+        if not hasattr(local, 'sessao'):
+            local.sessao = requests.Session()
+            # Caminhos relativos: o prefixo do servidor é acrescentado aqui
+            original = local.sessao.request
+            local.sessao.request = lambda metodo, url, **kw: original(metodo, base_url + url, **kw)
+        return local.sessao
+
+    def uma(_):
+        inicio = time.perf_counter()
+        try:
+            ok = funcao(sessao()).status_code in esperados
+        except Exception:
+            ok = False
+        return time.perf_counter() - inicio, ok
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(uma, range(aquecimento)))
+        inicio = time.perf_counter()
+        medidas = list(executor.map(uma, range(requisicoes)))
+        duracao = time.perf_counter() - inicio
+
+    latencias = sorted(t * 1000 for t, _ in medidas)
+    return {
+        "requisicoes": requisicoes,
+        "erros": sum(1 for _, ok in medidas if not ok),
+        "rps": round(requisicoes / duracao, 2),
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+    }
+
+# --- Comparação entre execuções ---
+
+def comparar(atual, base, tolerancia):
+    """Lista de regressões: p99 acima de base*(1+tolerancia) ou vazão abaixo de base*(1-tolerancia)."""
+    chave = lambda r: (r['catalogo'], r['cenario'])
+    anteriores = {chave(r): r for r in base['resultados']}
+    regressoes = []
+    print(f"{'catalogo':>9} {'cenario':<32} {'p99 base':>10} {'p99 atual':>10} {'rps base':>9} {'rps atual':>9}")
+    for r in atual['resultados']:
+        b = anteriores.get(chave(r))
+        if b is None:
+            continue
+        piorou = []
+        if r['p99_ms'] > b['p99_ms'] * (1 + tolerancia):
+            piorou.append('p99')
+        if r['rps'] < b['rps'] * (1 - tolerancia):
+            piorou.append('rps')
+        if r['erros'] > b['erros']:
+            piorou.append('erros')
+        marca = f"  <-- {', '.join(piorou)}" if piorou else ""
+        print(f"{r['catalogo']:>9} {r['cenario']:<32} {b['p99_ms']:>8.1f}ms {r['p99_ms']:>8.1f}ms "
+              f"{b['rps']:>9.1f} {r['rps']:>9.1f}{marca}")
+        if piorou:
+            regressoes.append((r['catalogo'], r['cenario'], piorou))
+    return regressoes
+
+# --- Execução ---
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga da API do catálogo de livros')
+    parser.add_argument('--catalogos', default='1000,100000', help='Tamanhos dos catálogos sintéticos')
+    parser.add_argument('--requisicoes', type=int, default=200, help='Requisições medidas por cenário')
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--aquecimento', type=int, default=10, help='Requisições descartadas por cenário')
+    parser.add_argument('--cenarios', help='Só os cenários que contenham um destes textos (separados por vírgula)')
+    parser.add_argument('--atraso-google', type=float, default=0.05, help='Segundos de latência do Google falso')
+    parser.add_argument('--cache-respostas', action='store_true', help='Mantém o cache de respostas de GET /livros')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='Arquivo JSON de resultado (padrão: stdout)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior; sai com 1 se houver regressão')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    parser.add_argument('--resultado', help='Não executa: compara este JSON com --comparar')
+    parser.add_argument('--manter', action='store_true', help='Não apaga os usuários bench_* no final')
+    args = parser.parse_args()
+
+    if args.resultado:
+        if not args.comparar:
+            parser.error('--resultado exige --comparar')
+        with open(args.resultado, encoding='utf-8') as f, open(args.comparar, encoding='utf-8') as g:
+            return 1 if comparar(json.load(f), json.load(g), args.tolerancia) else 0
+
+    random.seed(args.semente)
+    GoogleBooksFalso.atraso = args.atraso_google
+    url_google = iniciar_servidor(ThreadingHTTPServer(('127.0.0.1', 0), GoogleBooksFalso))
+
+    # Ajustes para medir a aplicação, não os caches locais nem o limitador de taxa
+    os.environ['GOOGLE_BOOKS_API_URL'] = url_google
+    os.environ['GOOGLE_BOOKS_TAXA_MAXIMA'] = '0'
+    os.environ['ISBN_CACHE_ARQUIVO'] = ''
+    os.environ['CACHE_RESPOSTAS_ATIVO'] = 'true' if args.cache_respostas else 'false'
+    from dotenv import load_dotenv
+    load_dotenv() # Não sobrescreve as variáveis acima
+
+    import requests
+    from werkzeug.serving import make_server
+    from app import app
+    from config import Config
+    from utils import migracoes
+    from utils.db_utils import get_db_connection
+
+    conn = get_db_connection()
+    if not conn:
+        print("Falha ao conectar ao banco de dados. Verifique as credenciais no .env.")
+        return 1
+    try:
+        migracoes.migrar(conn)
+    finally:
+        conn.close()
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    base_url = iniciar_servidor(servidor)
+    cliente = requests.Session()
+    original = cliente.request
+    cliente.request = lambda metodo, url, **kw: original(metodo, base_url + url, **kw)
+
+    filtros = [c.strip() for c in args.cenarios.split(',')] if args.cenarios else None
+    resultado = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "ambiente": {
+            "python": platform.python_version(), "plataforma": platform.platform(),
+            "cpus": os.cpu_count(), "banco": Config.DB_HOST,
+        },
+        "parametros": {
+            "requisicoes": args.requisicoes, "concorrencia": args.concorrencia,
+            "aquecimento": args.aquecimento, "atraso_google": args.atraso_google,
+            "cache_respostas": args.cache_respostas, "bcrypt_custo": Config.BCRYPT_CUSTO,
+            "db_pool_tamanho": Config.DB_POOL_TAMANHO, "semente": args.semente,
+        },
+        "resultados": [],
+    }
+    usuarios = []
+    try:
+        for total in [int(t) for t in args.catalogos.split(',')]:
+            token, id_usuario, ids_livros, ids_categorias = preparar_usuario(cliente, total)
+            usuarios.append(id_usuario)
+            for nome, funcao, esperados in cenarios(f"bench_{total}", token, ids_livros, ids_categorias):
+                if filtros and not any(f in nome for f in filtros):
+                    continue
+                medida = executar(base_url, funcao, esperados, args.requisicoes, args.concorrencia, args.aquecimento)
+                resultado["resultados"].append({"catalogo": total, "cenario": nome, **medida})
+                print(f"{total:>7} {nome:<32} {medida['rps']:>8.1f} req/s  p50 {medida['p50_ms']:>8.2f}ms  "
+                      f"p99 {medida['p99_ms']:>8.2f}ms  erros {medida['erros']}", file=sys.stderr)
+    finally:
+        servidor.shutdown()
+        if not args.manter:
+            for id_usuario in usuarios:
+                remover_usuario(id_usuario)
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultado, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} cenário(s) com regressão acima de {args.tolerancia:.0%}.")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
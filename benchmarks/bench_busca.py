@@ -0,0 +1,110 @@
+# benchmarks/bench_busca.py
+# Compara a latência da busca antiga (LIKE '%x%') com a busca FULLTEXT em 10k/100k/1M livros.
+# Usa uma tabela própria (bench_livros) no banco configurado em .env, que é apagada no final.
+#
+# Uso: python benchmarks/bench_busca.py [--tamanhos 10000,100000,1000000] [--repeticoes 20]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import mysql.connector
+from config import Config
+from utils.busca_utils import COLUNAS_BUSCA, montar_consulta_booleana
+
+USUARIO = 'bench-usuario'
+PALAVRAS = [
+    'amor', 'guerra', 'história', 'coração', 'noite', 'cidade', 'memórias', 'sertão',
+    'viagem', 'segredo', 'tempo', 'mar', 'ciência', 'programação', 'python', 'dados',
+    'machado', 'assis', 'clarice', 'lispector', 'jorge', 'amado', 'rosa', 'graciliano'
+]
+EDITORAS = ['Companhia das Letras', 'Rocco', 'Record', 'Intrínseca', "O'Reilly", 'Novatec']
+GENEROS = ['Romance', 'Ficção', 'Técnico', 'Poesia', 'Biografia', 'Fantasia']
+TERMOS = ['coracao', 'machado assis', 'program', 'sertão', 'memorias noite']
+
+def frase(n):
+    return ' '.join(random.choice(PALAVRAS) for _ in range(n)).capitalize()
+
+def criar_tabela(cursor):
+    cursor.execute("DROP TABLE IF EXISTS bench_livros")
+    cursor.execute(f"""
+        CREATE TABLE bench_livros (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_usuario VARCHAR(36) NOT NULL,
+            titulo VARCHAR(255) NOT NULL,
+            autores VARCHAR(255) NOT NULL,
+            editora VARCHAR(255),
+            genero VARCHAR(100),
+            notas_pessoais TEXT,
+            INDEX idx_bench_usuario (id_usuario),
+            FULLTEXT INDEX ft_bench_busca ({', '.join(COLUNAS_BUSCA)})
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """)
+
+def popular(conn, cursor, total, lote=5000):
+    sql = ("INSERT INTO bench_livros (id_usuario, titulo, autores, editora, genero, notas_pessoais) "
+           "VALUES (%s, %s, %s, %s, %s, %s)")
+    inseridos = 0
+    while inseridos < total:
+        n = min(lote, total - inseridos)
+        linhas = [
+            (USUARIO, frase(3), frase(2), random.choice(EDITORAS), random.choice(GENEROS), frase(8))
+            for _ in range(n)
+        ]
+        cursor.executemany(sql, linhas)
+        conn.commit()
+        inseridos += n
+
+def medir(cursor, sql, valores, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        cursor.execute(sql, valores)
+        cursor.fetchall()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LIKE x FULLTEXT da busca de livros')
+    parser.add_argument('--tamanhos', default='10000,100000,1000000')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(host=Config.DB_HOST, user=Config.DB_USER,
+                                   password=Config.DB_PASSWORD, database=Config.DB_NAME)
+    cursor = conn.cursor()
+    sql_like = ("SELECT id FROM bench_livros l WHERE l.id_usuario = %s "
+                "AND (l.titulo LIKE %s OR l.autores LIKE %s)")
+    colunas = ', '.join(f"l.{c}" for c in COLUNAS_BUSCA)
+    sql_fulltext = (f"SELECT id, MATCH({colunas}) AGAINST (%s IN BOOLEAN MODE) AS relevancia "
+                    f"FROM bench_livros l WHERE l.id_usuario = %s "
+                    f"AND MATCH({colunas}) AGAINST (%s IN BOOLEAN MODE) ORDER BY relevancia DESC")
+    try:
+        criar_tabela(cursor)
+        atual = 0
+        print(f"{'linhas':>9} {'termo':<16} {'LIKE p50':>10} {'LIKE p95':>10} {'FT p50':>9} {'FT p95':>9}")
+        for tamanho in [int(t) for t in args.tamanhos.split(',')]:
+            popular(conn, cursor, tamanho - atual)
+            atual = tamanho
+            cursor.execute("ANALYZE TABLE bench_livros")
+            cursor.fetchall()
+            for termo in TERMOS:
+                like = medir(cursor, sql_like, (USUARIO, f"%{termo}%", f"%{termo}%"), args.repeticoes)
+                consulta = montar_consulta_booleana(termo)
+                ft = medir(cursor, sql_fulltext, (consulta, USUARIO, consulta), args.repeticoes)
+                print(f"{tamanho:>9} {termo:<16} {like[0]:>8.2f}ms {like[1]:>8.2f}ms {ft[0]:>7.2f}ms {ft[1]:>7.2f}ms")
+    finally:
+        cursor.execute("DROP TABLE IF EXISTS bench_livros")
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_token.py
+# Mede o custo do decorador token_required por requisição, com e sem o cache de tokens.
+# Não usa banco de dados: a view protegida apenas devolve o id do usuário.
+#
+# Uso: python benchmarks/bench_token.py [--iteracoes 20000]
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from flask import Flask
+
+from utils import auth_utils
+from utils.auth_utils import CacheTokens, token_required
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark do decorador token_required')
+    parser.add_argument('--iteracoes', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench'
+
+    @token_required
+    def view(current_user_id):
+        return current_user_id
+
+    token = jwt.encode(
+        {'user_id': 'bench-usuario', 'iat': datetime.utcnow(), 'exp': datetime.utcnow() + timedelta(hours=1)},
+        app.config['SECRET_KEY'], algorithm="HS256"
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_request_context('/livros', headers=headers):
+        for nome, capacidade in [('sem cache', 0), ('com cache', 10000)]:
+            auth_utils._cache_tokens = CacheTokens(capacidade)
+            view() # Aquece (e popula o cache, quando ligado)
+            total = timeit.timeit(view, number=args.iteracoes)
+            print(f"{nome:>10}: {total / args.iteracoes * 1e6:8.2f} µs por requisição")
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,116 @@ class Config:
     DB_USER = os.getenv("DB_USER", "root")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "")
     DB_NAME = os.getenv("DB_NAME", "catalogo_livros")
+    DB_PORT = int(os.getenv("DB_PORT", 3306))
+    # Pool de conexões (utils/db_utils.py)
+    DB_POOL_TAMANHO = int(os.getenv("DB_POOL_TAMANHO", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5)) # Segundos esperando uma conexão livre
+    DB_POOL_TEMPO_OCIOSO = int(os.getenv("DB_POOL_TEMPO_OCIOSO", 300)) # Recicla conexões paradas há mais tempo
+    DB_POOL_TEMPO_VIDA = int(os.getenv("DB_POOL_TEMPO_VIDA", 3600)) # Recicla conexões mais antigas que isso
+    DB_POOL_VERIFICAR = os.getenv("DB_POOL_VERIFICAR", "true").lower() == "true" # Ping ao emprestar
+    # Instruções preparadas no servidor guardadas por conexão (utils/repositorio.py); 0 desliga.
+    # Conta para max_prepared_stmt_count do MySQL: tamanho do pool x workers x este valor
+    DB_PREPARADAS_POR_CONEXAO = int(os.getenv("DB_PREPARADAS_POR_CONEXAO", 32))
+    # Réplicas de leitura: "host[:porta]" separados por vírgula, ex.: 127.0.0.1:3307 para uma segunda
+    # instância local replicando da primeira (vazio = tudo vai para DB_HOST). Estado em GET /db/pool.
+    # As rotas GET leem de uma réplica saudável; escritas e autenticação ficam no primário
+    DB_REPLICAS = os.getenv("DB_REPLICAS", "")
+    DB_REPLICA_USER = os.getenv("DB_REPLICA_USER", DB_USER) # Precisa de REPLICATION CLIENT para medir o atraso
+    DB_REPLICA_PASSWORD = os.getenv("DB_REPLICA_PASSWORD", DB_PASSWORD)
+    DB_REPLICA_POOL_TAMANHO = int(os.getenv("DB_REPLICA_POOL_TAMANHO", DB_POOL_TAMANHO)) # Por réplica
+    DB_REPLICA_ATRASO_MAXIMO = int(os.getenv("DB_REPLICA_ATRASO_MAXIMO", 5)) # Segundos; acima disso sai de rotação
+    DB_REPLICA_VERIFICAR_INTERVALO = float(os.getenv("DB_REPLICA_VERIFICAR_INTERVALO", 5)) # Segundos entre verificações
+    # Depois de uma escrita o usuário lê do primário até a réplica ter tido tempo de recebê-la:
+    # atraso medido da réplica + esta margem (o atraso pode crescer entre duas verificações)
+    DB_PRIMARIO_APOS_ESCRITA = float(os.getenv("DB_PRIMARIO_APOS_ESCRITA", 5))
+    # Instrumentação (/metrics): instruções SQL acima deste tempo vão para o log (0 desliga)
+    SQL_LENTO_MS = float(os.getenv("SQL_LENTO_MS", 0))
+    SQL_LENTO_TAMANHO_MAXIMO = int(os.getenv("SQL_LENTO_TAMANHO_MAXIMO", 1000)) # Caracteres do SQL no log
     SECRET_KEY = os.getenv("SECRET_KEY", "uma_chave_secreta_padrao_para_desenvolvimento")
     TOKEN_EXPIRATION_HOURS = int(os.getenv("TOKEN_EXPIRATION_HOURS", 24))
-    GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
\ No newline at end of file
+    # bcrypt: custo (log2 das rodadas) e pool de processos que calcula os hashes
+    BCRYPT_CUSTO = int(os.getenv("BCRYPT_CUSTO", 12))
+    SENHA_PROCESSOS = int(os.getenv("SENHA_PROCESSOS", min(4, os.cpu_count() or 1))) # 0 = calcula na própria requisição
+    SENHA_FILA_MAXIMA = int(os.getenv("SENHA_FILA_MAXIMA", 32)) # Acima disso, /login e /registrar respondem 429
+    SENHA_TIMEOUT = float(os.getenv("SENHA_TIMEOUT", 10))
+    TOKEN_CACHE_TAMANHO = int(os.getenv("TOKEN_CACHE_TAMANHO", 10000)) # Tokens verificados em cache (0 desliga)
+    # Tokens revogados (logout): SQLite local compartilhado pelos workers (vazio = só memória;
+    # com ESTADO_REDIS_URL ficam no Redis)
+    REVOGACOES_ARQUIVO = os.getenv("REVOGACOES_ARQUIVO", os.path.join("instance", "revogacoes.sqlite3"))
+    # Paginação de GET /livros
+    LIVROS_LIMITE_PADRAO = int(os.getenv("LIVROS_LIMITE_PADRAO", 50))
+    LIVROS_LIMITE_MAXIMO = int(os.getenv("LIVROS_LIMITE_MAXIMO", 500))
+    # Sincronização incremental (GET /sync) e retenção das lápides no registro de alterações
+    SYNC_LIMITE_PADRAO = int(os.getenv("SYNC_LIMITE_PADRAO", 500))
+    SYNC_LIMITE_MAXIMO = int(os.getenv("SYNC_LIMITE_MAXIMO", 2000))
+    SYNC_RETENCAO_DIAS = int(os.getenv("SYNC_RETENCAO_DIAS", 90)) # Cursor mais velho que isso refaz a carga completa
+    # Importação em lote (POST /livros/importar)
+    IMPORTACAO_TAMANHO_LOTE = int(os.getenv("IMPORTACAO_TAMANHO_LOTE", 500))
+    IMPORTACAO_TAMANHO_LOTE_MAXIMO = int(os.getenv("IMPORTACAO_TAMANHO_LOTE_MAXIMO", 5000))
+    IMPORTACAO_MAX_LINHAS = int(os.getenv("IMPORTACAO_MAX_LINHAS", 50000))
+    # Exportação em streaming (GET /livros/exportar): linhas lidas do MySQL por vez
+    EXPORTACAO_TAMANHO_LOTE = int(os.getenv("EXPORTACAO_TAMANHO_LOTE", 500))
+    # ETags por versão do catálogo; o SQLite local é compartilhado pelos workers (vazio = só memória)
+    VERSOES_ARQUIVO = os.getenv("VERSOES_ARQUIVO", os.path.join("instance", "versoes.sqlite3"))
+    # Com mais de uma máquina atrás do balanceador, os arquivos SQLite acima (VERSOES_ARQUIVO e
+    # REVOGACOES_ARQUIVO) não bastam: cada máquina teria suas versões e revogações. Com um Redis
+    # aqui, versões do catálogo e tokens revogados passam a ser compartilhados por todas elas
+    ESTADO_REDIS_URL = os.getenv("ESTADO_REDIS_URL", "")
+    ESTADO_REDIS_PREFIXO = os.getenv("ESTADO_REDIS_PREFIXO", "catalogo:estado:")
+    COMPRESSAO_MINIMO_BYTES = int(os.getenv("COMPRESSAO_MINIMO_BYTES", 2048)) # Listagens maiores vão com gzip/br
+    COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", 6))
+    # Cache de respostas de GET /livros: "memoria" (LRU por bytes, por processo) ou "redis"
+    CACHE_RESPOSTAS_ATIVO = os.getenv("CACHE_RESPOSTAS_ATIVO", "true").lower() == "true"
+    CACHE_RESPOSTAS_BACKEND = os.getenv("CACHE_RESPOSTAS_BACKEND", "memoria")
+    CACHE_RESPOSTAS_REDIS_URL = os.getenv("CACHE_RESPOSTAS_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_RESPOSTAS_PREFIXO = os.getenv("CACHE_RESPOSTAS_PREFIXO", "catalogo:")
+    CACHE_RESPOSTAS_TTL = int(os.getenv("CACHE_RESPOSTAS_TTL", 600))
+    CACHE_RESPOSTAS_MAX_BYTES = int(os.getenv("CACHE_RESPOSTAS_MAX_BYTES", 64 * 1024 * 1024))
+    CACHE_RESPOSTAS_MAX_ITEM_BYTES = int(os.getenv("CACHE_RESPOSTAS_MAX_ITEM_BYTES", 4 * 1024 * 1024))
+    # Associação livro-categoria em lote (/livros/categorias/lote)
+    ASSOCIACAO_MAX_PARES = int(os.getenv("ASSOCIACAO_MAX_PARES", 10000))
+    ASSOCIACAO_TAMANHO_LOTE = int(os.getenv("ASSOCIACAO_TAMANHO_LOTE", 1000)) # Pares por instrução SQL
+    # Busca textual (?busca=): FULLTEXT com relevância; "false" volta ao LIKE em título/autor
+    BUSCA_FULLTEXT = os.getenv("BUSCA_FULLTEXT", "true").lower() == "true"
+    BUSCA_TAMANHO_MINIMO_TOKEN = int(os.getenv("BUSCA_TAMANHO_MINIMO_TOKEN", 3)) # innodb_ft_min_token_size
+    # Pode apontar para um servidor local que imita a Google Books API (testes)
+    GOOGLE_BOOKS_API_URL = os.getenv("GOOGLE_BOOKS_API_URL", "https://www.googleapis.com/books/v1/volumes")
+    GOOGLE_BOOKS_TIMEOUT_CONEXAO = float(os.getenv("GOOGLE_BOOKS_TIMEOUT_CONEXAO", 3))
+    GOOGLE_BOOKS_TIMEOUT_LEITURA = float(os.getenv("GOOGLE_BOOKS_TIMEOUT_LEITURA", 10))
+    GOOGLE_BOOKS_POOL_TAMANHO = int(os.getenv("GOOGLE_BOOKS_POOL_TAMANHO", 10))
+    GOOGLE_BOOKS_TAXA_MAXIMA = float(os.getenv("GOOGLE_BOOKS_TAXA_MAXIMA", 10)) # Chamadas/s por processo (0 = sem limite)
+    GOOGLE_BOOKS_RAJADA = int(os.getenv("GOOGLE_BOOKS_RAJADA", 10))
+    # Disjuntor: após N falhas seguidas (timeout, conexão, 429, 5xx) falha na hora por ESPERA segundos (0 desliga)
+    GOOGLE_BOOKS_DISJUNTOR_FALHAS = int(os.getenv("GOOGLE_BOOKS_DISJUNTOR_FALHAS", 5))
+    GOOGLE_BOOKS_DISJUNTOR_ESPERA = float(os.getenv("GOOGLE_BOOKS_DISJUNTOR_ESPERA", 30))
+    # Caminho assíncrono (utils/google_books_async.py, requer httpx): event loop e cliente HTTP compartilhados
+    GOOGLE_BOOKS_ASSINCRONO = os.getenv("GOOGLE_BOOKS_ASSINCRONO", "true").lower() == "true"
+    GOOGLE_BOOKS_ASYNC_CONEXOES = int(os.getenv("GOOGLE_BOOKS_ASYNC_CONEXOES", 100))
+    # Consultas em andamento por processo; as demais esperam a vez sem reservar fichas do limitador.
+    # Com GOOGLE_BOOKS_TAXA_MAXIMA, a espera pela ficha fica em até CONCORRENCIA / TAXA segundos
+    GOOGLE_BOOKS_ASYNC_CONCORRENCIA = int(os.getenv("GOOGLE_BOOKS_ASYNC_CONCORRENCIA", 20))
+    # Prazo total de uma consulta. Síncrona (GET /livros/buscar-isbn): inclui a fila do limitador.
+    # Assíncrona (lote): inclui as novas tentativas e é contado depois da vez na fila
+    GOOGLE_BOOKS_PRAZO = float(os.getenv("GOOGLE_BOOKS_PRAZO", 15))
+    # Enriquecimento em lote (POST /livros/buscar-isbn/lote)
+    ENRIQUECIMENTO_THREADS = int(os.getenv("ENRIQUECIMENTO_THREADS", 8))
+    ENRIQUECIMENTO_MAX_ISBNS = int(os.getenv("ENRIQUECIMENTO_MAX_ISBNS", 500))
+    ENRIQUECIMENTO_TENTATIVAS = int(os.getenv("ENRIQUECIMENTO_TENTATIVAS", 3))
+    ENRIQUECIMENTO_BACKOFF = float(os.getenv("ENRIQUECIMENTO_BACKOFF", 0.5)) # Segundos, dobra a cada tentativa
+    ENRIQUECIMENTO_TTL_TAREFA = int(os.getenv("ENRIQUECIMENTO_TTL_TAREFA", 3600)) # Resultados de tarefas em segundo plano
+    # Tarefa em andamento renova a batida a cada intervalo; sem batida por 3 intervalos, é dada como interrompida
+    ENRIQUECIMENTO_BATIDA_INTERVALO = int(os.getenv("ENRIQUECIMENTO_BATIDA_INTERVALO", 10))
+    # Capas baixadas e servidas localmente em /capas/<hash> (CAPAS_ATIVO=false mantém só o link externo)
+    CAPAS_ATIVO = os.getenv("CAPAS_ATIVO", "true").lower() == "true"
+    CAPAS_DIRETORIO = os.getenv("CAPAS_DIRETORIO", os.path.join("instance", "capas"))
+    CAPAS_THREADS = int(os.getenv("CAPAS_THREADS", 2)) # Downloads em segundo plano por processo
+    CAPAS_TAMANHO_MAXIMO = int(os.getenv("CAPAS_TAMANHO_MAXIMO", 5 * 1024 * 1024)) # Bytes por imagem
+    # Hosts de onde as capas podem ser baixadas (vazio = qualquer um)
+    CAPAS_HOSTS_PERMITIDOS = os.getenv("CAPAS_HOSTS_PERMITIDOS", "books.google.com,books.googleusercontent.com")
+    CAPAS_QUALIDADE_JPEG = int(os.getenv("CAPAS_QUALIDADE_JPEG", 85)) # Miniaturas (requer Pillow)
+    # Cache de ISBN: LRU em memória + SQLite em disco (ISBN_CACHE_ARQUIVO vazio desliga o disco)
+    ISBN_CACHE_TAMANHO = int(os.getenv("ISBN_CACHE_TAMANHO", 5000))
+    ISBN_CACHE_TTL = int(os.getenv("ISBN_CACHE_TTL", 7 * 24 * 3600))
+    ISBN_CACHE_TTL_NAO_ENCONTRADO = int(os.getenv("ISBN_CACHE_TTL_NAO_ENCONTRADO", 6 * 3600))
+    ISBN_CACHE_ARQUIVO = os.getenv("ISBN_CACHE_ARQUIVO", os.path.join("instance", "cache_isbn.sqlite3"))
+
@@ -0,0 +1,70 @@
+# gunicorn.conf.py
+# Configuração de produção: gunicorn -c gunicorn.conf.py wsgi:app
+# Todos os valores podem ser trocados por variáveis GUNICORN_* no ambiente ou no .env.
+#
+# Recarga sem derrubar conexões:
+#   kill -HUP <pid do master>    novos workers com a configuração relida; os antigos terminam as requisições
+#   kill -USR2 <pid do master>   (com preload_app) sobe um master novo com o código novo; depois QUIT no antigo
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _cpus():
+    # Respeita o limite de CPUs do contêiner/afinidade, não só o total da máquina
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+CPUS = _cpus()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Workers com threads: as rotas passam a maior parte do tempo esperando o MySQL e a Google Books,
+# então um processo por CPU com algumas threads cada rende mais que muitos processos síncronos.
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", max(2, CPUS)))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# Cada worker tem o próprio pool de processos do bcrypt: divide as CPUs entre eles em vez de
+# abrir min(4, CPUs) processos por worker. Um SENHA_PROCESSOS explícito continua valendo.
+os.environ.setdefault("SENHA_PROCESSOS", str(max(1, CPUS // workers)))
+
+# Importa app.py (blueprints, bcrypt, config) uma vez no master; os workers herdam via fork.
+# Pool do MySQL, sessão HTTP e pools de threads/processos são criados sob demanda em cada
+# worker (verificação de os.getpid() em utils/), nunca herdados do master.
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30)) # Worker sem responder por mais que isso é reiniciado
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30)) # Prazo para terminar requisições em andamento
+# Atrás de um proxy/balanceador, mantenha maior que o tempo ocioso que ele usa para reaproveitar conexões
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Recicla workers periodicamente (com variação para não reiniciarem todos juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 500))
+backlog = int(os.getenv("GUNICORN_BACKLOG", 2048))
+
+# Heartbeat dos workers em memória: disco lento não derruba worker por timeout
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+forwarded_allow_ips = os.getenv("GUNICORN_FORWARDED_ALLOW_IPS", "127.0.0.1")
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+def when_ready(server):
+    from config import Config
+    if threads > Config.DB_POOL_TAMANHO:
+        server.log.warning(
+            f"GUNICORN_THREADS={threads} maior que DB_POOL_TAMANHO={Config.DB_POOL_TAMANHO}: "
+            "threads vão esperar por conexão do pool."
+        )
+    server.log.info(f"{workers} workers x {threads} threads ({CPUS} CPUs)")
+
+def worker_exit(server, worker):
+    # Fecha as conexões ociosas e o pool do bcrypt deste worker ao sair (HUP, max_requests, desligamento)
+    from utils.db_utils import fechar_pools
+    from utils.senha_utils import encerrar_executor
+    fechar_pools()
+    encerrar_executor()
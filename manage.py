@@ -0,0 +1,97 @@
+# manage.py
+# Comandos de manutenção do banco de dados.
+#
+#   python manage.py migrar [--ate N]           aplica as migrações pendentes
+#   python manage.py reverter [--passos N]      desfaz as últimas N migrações (padrão 1)
+#   python manage.py status                     lista as migrações e se já foram aplicadas
+#   python manage.py verificar-planos           EXPLAIN das consultas quentes; sai com 1 se alguma regrediu
+#   python manage.py reconstruir-estatisticas [--usuario ID]
+#   python manage.py baixar-capas               baixa as capas dos livros que ainda só têm o link externo
+#   python manage.py compactar-alteracoes [--dias N]  enxuga o registro lido por GET /sync
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+# Carrega o .env antes de importar config.py, que lê as variáveis na importação
+load_dotenv()
+
+from utils.db_utils import get_db_connection
+
+def baixar_capas(conn):
+    from utils.capas_utils import ErroCapa, processar_capa, url_permitida
+    import requests
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT DISTINCT id_usuario, capa_url FROM livros WHERE capa_url IS NOT NULL AND capa_hash IS NULL")
+        pendentes = cursor.fetchall()
+    finally:
+        cursor.close()
+    for id_usuario, url in pendentes:
+        if not url_permitida(url):
+            continue
+        try:
+            processar_capa(id_usuario, url)
+        except (requests.exceptions.RequestException, ErroCapa, OSError) as e:
+            print(f"Erro ao baixar capa {url}: {e}")
+    print(f"{len(pendentes)} capa(s) processada(s).")
+
+def main():
+    parser = argparse.ArgumentParser(description='Manutenção do banco do catálogo de livros')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_migrar = comandos.add_parser('migrar', help='Aplica as migrações pendentes')
+    p_migrar.add_argument('--ate', type=int, help='Para nesta versão')
+
+    p_reverter = comandos.add_parser('reverter', help='Desfaz as últimas migrações')
+    p_reverter.add_argument('--passos', type=int, default=1)
+
+    comandos.add_parser('status', help='Mostra as migrações aplicadas e pendentes')
+    comandos.add_parser('verificar-planos', help='Falha se uma consulta conhecida virou varredura completa')
+
+    p_estatisticas = comandos.add_parser('reconstruir-estatisticas', help='Recalcula estatisticas_usuario')
+    p_estatisticas.add_argument('--usuario', help='Só este id de usuário')
+
+    comandos.add_parser('baixar-capas', help='Preenche livros.capa_hash dos livros já cadastrados')
+
+    p_compactar = comandos.add_parser('compactar-alteracoes', help='Remove alterações substituídas e lápides antigas')
+    p_compactar.add_argument('--dias', type=int, help='Retenção das lápides (padrão SYNC_RETENCAO_DIAS)')
+
+    args = parser.parse_args()
+
+    from utils import migracoes
+    conn = get_db_connection()
+    if not conn:
+        print("Falha ao conectar ao banco de dados. Verifique as credenciais no .env.")
+        return 1
+    try:
+        if args.comando == 'migrar':
+            migracoes.migrar(conn, ate=args.ate)
+            print("Banco de dados atualizado.")
+        elif args.comando == 'reverter':
+            migracoes.reverter(conn, passos=args.passos)
+        elif args.comando == 'status':
+            for versao, descricao, aplicada in migracoes.situacao(conn):
+                print(f"[{'x' if aplicada else ' '}] {versao:03d} {descricao}")
+        elif args.comando == 'verificar-planos':
+            problemas = migracoes.verificar_planos(conn)
+            if problemas:
+                print(f"{len(problemas)} consulta(s) com varredura completa.")
+                return 1
+        elif args.comando == 'reconstruir-estatisticas':
+            from utils.estatisticas_utils import reconstruir_estatisticas
+            reconstruir_estatisticas(conn, args.usuario)
+            print("Estatísticas reconstruídas com sucesso.")
+        elif args.comando == 'baixar-capas':
+            baixar_capas(conn)
+        elif args.comando == 'compactar-alteracoes':
+            from config import Config
+            from utils.alteracoes_utils import compactar_alteracoes
+            substituidas, lapides = compactar_alteracoes(conn, args.dias if args.dias is not None else Config.SYNC_RETENCAO_DIAS)
+            print(f"{substituidas} alteração(ões) substituída(s) e {lapides} lápide(s) removida(s).")
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
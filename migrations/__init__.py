@@ -0,0 +1,3 @@
+# migrations/__init__.py
+# Cada módulo vNNN_*.py define VERSAO, DESCRICAO, SUBIR e DESCER. Os passos são SQL (str)
+# ou funções que recebem o cursor. Execute com: python manage.py migrar
@@ -0,0 +1,65 @@
+# migrations/v001_tabelas_iniciais.py
+# Tabelas usadas pelas rotas. IF NOT EXISTS: bancos criados à mão antes das migrações continuam válidos.
+VERSAO = 1
+DESCRICAO = "Tabelas usuarios, livros, categorias e livro_categoria"
+
+SUBIR = [
+    """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id VARCHAR(36) NOT NULL PRIMARY KEY,
+        username VARCHAR(50) NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NULL,
+        UNIQUE KEY uq_usuarios_username (username),
+        UNIQUE KEY uq_usuarios_email (email)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS livros (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        isbn VARCHAR(20) NOT NULL,
+        titulo VARCHAR(255) NOT NULL,
+        autores VARCHAR(255) NOT NULL,
+        genero VARCHAR(100) NULL,
+        editora VARCHAR(255) NULL,
+        ano_publicacao INT NULL,
+        numero_paginas INT NULL,
+        capa_url VARCHAR(500) NULL,
+        localizacao_fisica VARCHAR(255) NULL,
+        notas_pessoais TEXT NULL,
+        idioma VARCHAR(10) NULL,
+        data_inicio_leitura DATE NULL,
+        data_fim_leitura DATE NULL,
+        data_cadastro DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        id_usuario VARCHAR(36) NOT NULL,
+        UNIQUE KEY uq_livros_usuario_isbn (id_usuario, isbn),
+        CONSTRAINT fk_livros_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS categorias (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        nome VARCHAR(100) NOT NULL,
+        descricao TEXT NULL,
+        id_usuario VARCHAR(36) NOT NULL,
+        UNIQUE KEY uq_categorias_usuario_nome (id_usuario, nome),
+        CONSTRAINT fk_categorias_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS livro_categoria (
+        id_livro INT NOT NULL,
+        id_categoria INT NOT NULL,
+        PRIMARY KEY (id_livro, id_categoria),
+        CONSTRAINT fk_lc_livro FOREIGN KEY (id_livro) REFERENCES livros (id) ON DELETE CASCADE,
+        CONSTRAINT fk_lc_categoria FOREIGN KEY (id_categoria) REFERENCES categorias (id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """,
+]
+
+DESCER = [
+    "DROP TABLE IF EXISTS livro_categoria",
+    "DROP TABLE IF EXISTS categorias",
+    "DROP TABLE IF EXISTS livros",
+    "DROP TABLE IF EXISTS usuarios",
+]
@@ -0,0 +1,25 @@
+# migrations/v002_indices_consultas.py
+# Índices das consultas de routes/livro_routes.py e routes/categoria_routes.py.
+# Todo índice secundário do InnoDB termina implicitamente no id (PK), então
+# (id_usuario, titulo) também atende o desempate "ORDER BY titulo, id" da paginação por cursor.
+from utils.migracoes import criar_indice, remover_indice
+
+VERSAO = 2
+DESCRICAO = "Índices compostos para listagem, filtros, ordenação e livro_categoria"
+
+_INDICES = [
+    # GET /livros: filtro por usuário + cada opção de ordenar_por (id usa o próprio uq/PK)
+    ('livros', 'idx_livros_usuario_titulo', ['id_usuario', 'titulo']),
+    ('livros', 'idx_livros_usuario_autores', ['id_usuario', 'autores']),
+    ('livros', 'idx_livros_usuario_ano', ['id_usuario', 'ano_publicacao']),
+    ('livros', 'idx_livros_usuario_cadastro', ['id_usuario', 'data_cadastro']),
+    # Filtros exatos seguidos da ordenação padrão (titulo)
+    ('livros', 'idx_livros_usuario_genero', ['id_usuario', 'genero', 'titulo']),
+    ('livros', 'idx_livros_usuario_editora', ['id_usuario', 'editora', 'titulo']),
+    ('livros', 'idx_livros_usuario_idioma', ['id_usuario', 'idioma', 'titulo']),
+    # ?categoria_id= (EXISTS) e contagem de livros por categoria; a PK cobre id_livro
+    ('livro_categoria', 'idx_lc_categoria_livro', ['id_categoria', 'id_livro']),
+]
+
+SUBIR = [criar_indice(tabela, nome, colunas) for tabela, nome, colunas in _INDICES]
+DESCER = [remover_indice(tabela, nome) for tabela, nome, _ in reversed(_INDICES)]
@@ -0,0 +1,9 @@
+# migrations/v003_fulltext_busca.py
+from utils.busca_utils import COLUNAS_BUSCA, INDICE_FULLTEXT
+from utils.migracoes import criar_indice, remover_indice
+
+VERSAO = 3
+DESCRICAO = "Índice FULLTEXT usado por ?busca= em GET /livros"
+
+SUBIR = [criar_indice('livros', INDICE_FULLTEXT, COLUNAS_BUSCA, tipo='FULLTEXT')]
+DESCER = [remover_indice('livros', INDICE_FULLTEXT)]
@@ -0,0 +1,11 @@
+# migrations/v004_estatisticas_usuario.py
+from utils.estatisticas_utils import SQL_CRIAR_TABELA, reconstruir_estatisticas
+
+VERSAO = 4
+DESCRICAO = "Contadores de GET /livros/estatisticas, já preenchidos a partir de livros"
+
+SUBIR = [
+    SQL_CRIAR_TABELA,
+    lambda conn: reconstruir_estatisticas(conn),
+]
+DESCER = ["DROP TABLE IF EXISTS estatisticas_usuario"]
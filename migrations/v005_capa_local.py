@@ -0,0 +1,8 @@
+# migrations/v005_capa_local.py
+from utils.migracoes import adicionar_coluna, remover_coluna
+
+VERSAO = 5
+DESCRICAO = "livros.capa_hash: capa baixada para o armazenamento local (utils/capas_utils.py)"
+
+SUBIR = [adicionar_coluna('livros', 'capa_hash', "CHAR(64) NULL AFTER capa_url")]
+DESCER = [remover_coluna('livros', 'capa_hash')]
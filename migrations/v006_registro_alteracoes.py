@@ -0,0 +1,13 @@
+# migrations/v006_registro_alteracoes.py
+from utils.alteracoes_utils import SQL_CRIAR_TABELAS, preencher_alteracoes
+
+VERSAO = 6
+DESCRICAO = "Registro de alterações por usuário para GET /sync, já preenchido com o catálogo atual"
+
+SUBIR = SQL_CRIAR_TABELAS + [
+    lambda conn: preencher_alteracoes(conn),
+]
+DESCER = [
+    "DROP TABLE IF EXISTS alteracoes_sequencia",
+    "DROP TABLE IF EXISTS alteracoes",
+]
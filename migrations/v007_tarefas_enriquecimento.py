@@ -0,0 +1,11 @@
+# migrations/v007_tarefas_enriquecimento.py
+from utils.enriquecimento import SQL_CRIAR_TABELAS
+
+VERSAO = 7
+DESCRICAO = "Estado das tarefas de enriquecimento em lote (?assincrono=true), visível a todos os workers"
+
+SUBIR = SQL_CRIAR_TABELAS
+DESCER = [
+    "DROP TABLE IF EXISTS tarefas_enriquecimento_resultados",
+    "DROP TABLE IF EXISTS tarefas_enriquecimento",
+]
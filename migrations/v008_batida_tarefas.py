@@ -0,0 +1,8 @@
+# migrations/v008_batida_tarefas.py
+from utils.migracoes import adicionar_coluna, remover_coluna
+
+VERSAO = 8
+DESCRICAO = "tarefas_enriquecimento.batida_em: detecta tarefas interrompidas por reinício do worker"
+
+SUBIR = [adicionar_coluna('tarefas_enriquecimento', 'batida_em', "DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP AFTER atualizada_em")]
+DESCER = [remover_coluna('tarefas_enriquecimento', 'batida_em')]
@@ -8,13 +8,15 @@ from functools import wraps # Importa wraps para o decorador
 
 # Importa as funções utilitárias e o decorador de autenticação
 from utils.db_utils import get_db_connection
-from utils.auth_utils import token_required # Não precisamos mais da importação Bcrypt aqui
+from utils import repositorio
+from utils.auth_utils import token_required, token_da_requisicao, revogar_token, revogar_tokens_usuario # Não precisamos mais da importação Bcrypt aqui
+from utils.senha_utils import FilaSenhaCheiaError, gerar_hash_senha, verificar_senha, precisa_rehash
 from config import Config # Importa as configurações do seu config.py
 
 auth_bp = Blueprint('auth_bp', __name__)
 
-# NOTA: Bcrypt NÃO é inicializado aqui. Ele é inicializado em app.py
-# e acessado via current_app.bcrypt.
+# NOTA: o hash de senhas não roda mais na thread da requisição: utils/senha_utils.py
+# usa um pool de processos com o custo de Config.BCRYPT_CUSTO (o mesmo de current_app.bcrypt).
 
 @auth_bp.route('/registrar', methods=['POST'])
 def registrar_usuario():
@@ -28,32 +30,44 @@ def registrar_usuario():
 
     conn = get_db_connection()
     if conn:
-        cursor = conn.cursor()
         try:
-            cursor.execute("SELECT id FROM usuarios WHERE username = %s", (username,))
-            if cursor.fetchone():
+            if repositorio.usuario_por_username(conn, username):
                 return jsonify({"status": "erro", "mensagem": "Nome de usuário já existe."}), 409
 
-            if email:
-                cursor.execute("SELECT id FROM usuarios WHERE email = %s", (email,))
-                if cursor.fetchone():
-                    return jsonify({"status": "erro", "mensagem": "E-mail já está em uso."}), 409
+            if email and repositorio.email_em_uso(conn, email):
+                return jsonify({"status": "erro", "mensagem": "E-mail já está em uso."}), 409
+        except mysql.connector.Error as err:
+            print(f"Erro ao registrar usuário: {err}")
+            return jsonify({"status": "erro", "mensagem": f"Erro interno ao registrar usuário: {err}"}), 500
+        finally:
+            # Devolve a conexão ao pool antes do bcrypt, que leva centenas de ms
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para registrar usuário."}), 500
 
-            # Acessa o bcrypt que foi inicializado em app.py através de current_app
-            hashed_password = current_app.bcrypt.generate_password_hash(password).decode('utf-8')
-            user_id = str(uuid.uuid4())
+    try:
+        # O hash roda no pool de processos de utils/senha_utils.py, fora da thread da requisição
+        hashed_password = gerar_hash_senha(password)
+    except FilaSenhaCheiaError as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 429, {"Retry-After": "1"}
+    user_id = str(uuid.uuid4())
 
-            sql = "INSERT INTO usuarios (id, username, password_hash, email) VALUES (%s, %s, %s, %s)"
-            cursor.execute(sql, (user_id, username, hashed_password, email))
+    conn = get_db_connection()
+    if conn:
+        try:
+            repositorio.inserir_usuario(conn, user_id, username, hashed_password, email)
             conn.commit()
 
             return jsonify({"status": "sucesso", "mensagem": "Usuário registrado com sucesso.", "user_id": user_id}), 201
         except mysql.connector.Error as err:
             conn.rollback()
             print(f"Erro ao registrar usuário: {err}")
+            # Outro cadastro com o mesmo nome/e-mail pode ter entrado enquanto o hash era calculado
+            if "Duplicate entry" in str(err):
+                campo = "E-mail já está em uso." if "email" in str(err).lower() else "Nome de usuário já existe."
+                return jsonify({"status": "erro", "mensagem": campo}), 409
             return jsonify({"status": "erro", "mensagem": f"Erro interno ao registrar usuário: {err}"}), 500
         finally:
-            cursor.close()
             conn.close()
     else:
         return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para registrar usuário."}), 500
@@ -69,34 +83,73 @@ def login_usuario():
 
     conn = get_db_connection()
     if conn:
-        cursor = conn.cursor(dictionary=True)
         try:
-            sql = "SELECT id, username, password_hash FROM usuarios WHERE username = %s"
-            cursor.execute(sql, (username,))
-            user = cursor.fetchone()
-
-            # Acessa o bcrypt que foi inicializado em app.py através de current_app
-            if user and current_app.bcrypt.check_password_hash(user['password_hash'], password):
-                token_payload = {
-                    'user_id': user['id'],
-                    # Acessa TOKEN_EXPIRATION_HOURS diretamente de Config
-                    'exp': datetime.utcnow() + timedelta(hours=Config.TOKEN_EXPIRATION_HOURS)
-                }
-                token = jwt.encode(token_payload, current_app.config['SECRET_KEY'], algorithm="HS256")
-                
-                return jsonify({
-                    "status": "sucesso",
-                    "mensagem": "Login realizado com sucesso.",
-                    "token": token,
-                    "user_id": user['id']
-                }), 200
-            else:
-                return jsonify({"status": "erro", "mensagem": "Nome de usuário ou senha inválidos."}), 401
+            user = repositorio.usuario_por_username(conn, username)
         except mysql.connector.Error as err:
             print(f"Erro ao fazer login: {err}")
             return jsonify({"status": "erro", "mensagem": f"Erro interno ao fazer login: {err}"}), 500
         finally:
-            cursor.close()
+            # Devolve a conexão ao pool antes do bcrypt, que leva centenas de ms
             conn.close()
     else:
-        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para login."}), 500 
\ No newline at end of file
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para login."}), 500
+
+    try:
+        senha_ok = user is not None and verificar_senha(user.password_hash, password)
+    except FilaSenhaCheiaError as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 429, {"Retry-After": "1"}
+
+    if senha_ok and precisa_rehash(user.password_hash):
+        # BCRYPT_CUSTO mudou desde o cadastro: aproveita a senha em mãos para regravar o hash.
+        # Melhor esforço: com a fila cheia o login segue e o hash é regravado num próximo
+        try:
+            atualizar_hash_senha(user.id, gerar_hash_senha(password))
+        except FilaSenhaCheiaError as e:
+            print(f"Hash da senha não regravado: {e}")
+
+    if senha_ok:
+        token_payload = {
+            'user_id': user.id,
+            'iat': datetime.utcnow(), # Usado para revogar todos os tokens antigos do usuário
+            # Acessa TOKEN_EXPIRATION_HOURS diretamente de Config
+            'exp': datetime.utcnow() + timedelta(hours=Config.TOKEN_EXPIRATION_HOURS)
+        }
+        token = jwt.encode(token_payload, current_app.config['SECRET_KEY'], algorithm="HS256")
+
+        return jsonify({
+            "status": "sucesso",
+            "mensagem": "Login realizado com sucesso.",
+            "token": token,
+            "user_id": user.id
+        }), 200
+    else:
+        return jsonify({"status": "erro", "mensagem": "Nome de usuário ou senha inválidos."}), 401
+
+def atualizar_hash_senha(user_id, novo_hash):
+    """Regrava o hash com o custo atual. Falhas só são registradas: o login continua válido."""
+    conn = get_db_connection()
+    if not conn:
+        print("Falha ao conectar ao banco de dados para atualizar o hash da senha.")
+        return
+    try:
+        repositorio.atualizar_hash_senha(conn, user_id, novo_hash)
+        conn.commit()
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao atualizar hash da senha: {err}")
+    finally:
+        conn.close()
+
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+def logout_usuario(current_user_id):
+    # Revoga só o token usado nesta requisição
+    revogar_token(token_da_requisicao())
+    return jsonify({"status": "sucesso", "mensagem": "Logout realizado com sucesso."}), 200
+
+@auth_bp.route('/logout/todos', methods=['POST'])
+@token_required
+def logout_todas_sessoes(current_user_id):
+    # Para tokens comprometidos: invalida todos os tokens já emitidos para o usuário
+    revogar_tokens_usuario(current_user_id)
+    return jsonify({"status": "sucesso", "mensagem": "Todas as sessões foram encerradas."}), 200
@@ -0,0 +1,28 @@
+# routes/capa_routes.py
+from flask import Blueprint, request, jsonify, send_file
+import os
+
+from utils.capas_utils import TAMANHOS, caminho_capa
+
+capa_bp = Blueprint('capa_bp', __name__)
+
+# --- Capas armazenadas localmente (PÚBLICA: o endereço é o hash do conteúdo) ---
+@capa_bp.route('/capas/<hash_conteudo>', methods=['GET'])
+def get_capa(hash_conteudo):
+    tamanho = request.args.get('tamanho', 'original')
+    if tamanho != 'original' and tamanho not in TAMANHOS:
+        return jsonify({"status": "erro", "mensagem": f"Tamanho inválido. Use original, {', '.join(TAMANHOS)}."}), 400
+
+    caminho = caminho_capa(hash_conteudo, tamanho)
+    if caminho is None:
+        return jsonify({"status": "erro", "mensagem": "Capa não encontrada."}), 404
+
+    # conditional=True: If-None-Match/If-Modified-Since (304) e Range (206)
+    resposta = send_file(
+        os.path.abspath(caminho), conditional=True,
+        etag=os.path.basename(caminho), max_age=365 * 24 * 3600
+    )
+    # O conteúdo de um hash nunca muda: o navegador não precisa nem revalidar
+    resposta.cache_control.public = True
+    resposta.cache_control.immutable = True
+    return resposta
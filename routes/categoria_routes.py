@@ -4,12 +4,17 @@ import mysql.connector
 
 # Importa as funções utilitárias e o decorador de autenticação
 from utils.db_utils import get_db_connection
+from utils import repositorio
 from utils.auth_utils import token_required
+from utils.versao_utils import com_etag, altera_catalogo
+from utils.estatisticas_utils import remover_categoria
+from utils.alteracoes_utils import CATEGORIA, ASSOCIACAO, EXCLUIR, chave_associacao, registrar_alteracoes
 
 categoria_bp = Blueprint('categoria_bp', __name__)
 
 @categoria_bp.route('/categorias', methods=['POST'])
 @token_required
+@altera_catalogo
 def create_categoria(current_user_id):
     data = request.get_json()
     if not data or 'nome' not in data or not data['nome']:
@@ -20,51 +25,45 @@ def create_categoria(current_user_id):
 
     conn = get_db_connection()
     if conn:
-        cursor = conn.cursor()
         try:
-            sql = "INSERT INTO categorias (nome, descricao, id_usuario) VALUES (%s, %s, %s)"
-            cursor.execute(sql, (nome, descricao, current_user_id))
+            categoria_id = repositorio.inserir_categoria(conn, nome, descricao, current_user_id)
+            registrar_alteracoes(conn, current_user_id, CATEGORIA, [categoria_id])
             conn.commit()
-            categoria_id = cursor.lastrowid
             return jsonify({"status": "sucesso", "mensagem": "Categoria criada com sucesso.", "categoria": {"id": categoria_id, "nome": nome, "descricao": descricao}}), 201
         except mysql.connector.Error as err:
             conn.rollback()
             print(f"Erro ao criar categoria: {err}")
             if "Duplicate entry" in str(err) and "nome" in str(err).lower():
-                cursor.execute("SELECT id FROM categorias WHERE nome = %s AND id_usuario = %s", (nome, current_user_id))
-                if cursor.fetchone():
+                if repositorio.categoria_nome_em_uso(conn, nome, current_user_id):
                     return jsonify({"status": "erro", "mensagem": f"Categoria com o nome '{nome}' já existe para este usuário."}), 409
                 else:
                     return jsonify({"status": "erro", "mensagem": f"Erro interno: Duplicidade de entrada genérica. {err}"}), 500
             return jsonify({"status": "erro", "mensagem": f"Erro interno ao criar categoria: {err}"}), 500
         finally:
-            cursor.close()
             conn.close()
     else:
         return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para criar categoria."}), 500
 
 @categoria_bp.route('/categorias', methods=['GET'])
 @token_required
+@com_etag
 def get_all_categorias(current_user_id):
-    conn = get_db_connection()
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
     if conn:
-        cursor = conn.cursor(dictionary=True)
         try:
-            sql = "SELECT id, nome, descricao FROM categorias WHERE id_usuario = %s"
-            cursor.execute(sql, (current_user_id,))
-            categorias = cursor.fetchall()
+            categorias = [linha._asdict() for linha in repositorio.listar_categorias(conn, current_user_id)]
             return jsonify({"status": "sucesso", "total": len(categorias), "categorias": categorias})
         except mysql.connector.Error as err:
             print(f"Erro ao buscar categorias: {err}")
             return jsonify({"status": "erro", "mensagem": f"Erro ao buscar categorias: {err}"}), 500
         finally:
-            cursor.close()
             conn.close()
     else:
         return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para buscar categorias."}), 500
 
 @categoria_bp.route('/categorias/<int:categoria_id>', methods=['PUT'])
 @token_required
+@altera_catalogo
 def update_categoria(current_user_id, categoria_id):
     data = request.get_json()
     if not data:
@@ -72,29 +71,22 @@ def update_categoria(current_user_id, categoria_id):
 
     conn = get_db_connection()
     if conn:
-        cursor = conn.cursor()
         try:
-            set_clauses = []
-            values = []
-
+            campos = {}
             if 'nome' in data and data['nome']:
-                set_clauses.append("nome = %s")
-                values.append(data['nome'])
+                campos['nome'] = data['nome']
             if 'descricao' in data:
-                set_clauses.append("descricao = %s")
-                values.append(data['descricao'])
+                campos['descricao'] = data['descricao']
 
-            if not set_clauses:
+            if not campos:
                 return jsonify({"status": "erro", "mensagem": "Nenhum campo válido (nome ou descricao) fornecido para atualização."}), 400
 
-            sql = f"UPDATE categorias SET {', '.join(set_clauses)} WHERE id = %s AND id_usuario = %s"
-            values.append(categoria_id)
-            values.append(current_user_id)
-
-            cursor.execute(sql, tuple(values))
+            alteradas = repositorio.atualizar_categoria(conn, categoria_id, current_user_id, campos)
+            if alteradas > 0:
+                registrar_alteracoes(conn, current_user_id, CATEGORIA, [categoria_id])
             conn.commit()
 
-            if cursor.rowcount == 0:
+            if alteradas == 0:
                 return jsonify({"status": "erro", "mensagem": "Categoria não encontrada ou você não tem permissão para atualizá-la."}), 404
             else:
                 return jsonify({"status": "sucesso", "mensagem": f"Categoria com ID {categoria_id} atualizada com sucesso."}), 200
@@ -102,30 +94,36 @@ def update_categoria(current_user_id, categoria_id):
             conn.rollback()
             print(f"Erro ao atualizar categoria: {err}")
             if "Duplicate entry" in str(err) and "nome" in str(err).lower():
-                cursor.execute("SELECT id FROM categorias WHERE nome = %s AND id_usuario = %s", (data.get('nome'), current_user_id))
-                if cursor.fetchone():
+                if repositorio.categoria_nome_em_uso(conn, data.get('nome'), current_user_id):
                     return jsonify({"status": "erro", "mensagem": f"Categoria com o nome '{data.get('nome')}' já existe para este usuário."}), 409
                 else:
                     return jsonify({"status": "erro", "mensagem": f"Erro interno: Duplicidade de entrada genérica. {err}"}), 500
             return jsonify({"status": "erro", "mensagem": f"Erro interno ao atualizar categoria: {err}"}), 500
         finally:
-            cursor.close()
             conn.close()
     else:
         return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para atualizar categoria."}), 500
 
 @categoria_bp.route('/categorias/<int:categoria_id>', methods=['DELETE'])
 @token_required
+@altera_catalogo
 def delete_categoria(current_user_id, categoria_id):
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
         try:
-            sql = "DELETE FROM categorias WHERE id = %s AND id_usuario = %s"
-            cursor.execute(sql, (categoria_id, current_user_id))
+            # Livros associados, para as lápides das associações que saem em cascata
+            livros_associados = repositorio.livros_da_categoria(conn, categoria_id, current_user_id)
+
+            excluidas = repositorio.excluir_categoria(conn, categoria_id, current_user_id)
+            if excluidas > 0:
+                remover_categoria(cursor, current_user_id, categoria_id)
+                registrar_alteracoes(conn, current_user_id, ASSOCIACAO,
+                                     [chave_associacao(l, categoria_id) for l in livros_associados], EXCLUIR)
+                registrar_alteracoes(conn, current_user_id, CATEGORIA, [categoria_id], EXCLUIR)
             conn.commit()
 
-            if cursor.rowcount == 0:
+            if excluidas == 0:
                 return jsonify({"status": "erro", "mensagem": "Categoria não encontrada ou você não tem permissão para excluí-la."}), 404
             else:
                 return jsonify({"status": "sucesso", "mensagem": f"Categoria com ID {categoria_id} excluída com sucesso."}), 200
@@ -1,16 +1,81 @@
 # routes/livro_routes.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import mysql.connector
 import requests
-from datetime import datetime
+import base64
+import csv
+import io
+import json
 
 # Importa as funções utilitárias e o decorador de autenticação
 from utils.db_utils import get_db_connection
+from utils import repositorio
+from utils.repositorio import SQL_INSERIR_LIVRO, CAMPOS_ATUALIZAVEIS_LIVRO
 from utils.auth_utils import token_required
+from utils.versao_utils import com_etag, altera_catalogo, catalogo_alterado
+from utils.cache_utils import com_cache_respostas
+from utils.busca_utils import clausula_busca, indice_fulltext_ausente
+from utils.json_utils import dumps as json_dumps
+from utils.importacao_utils import ErroImportacao, detectar_formato, validar_linha, ler_linhas, em_lotes
+from utils.capas_utils import agendar_capa
+from utils.google_books import buscar_dados_livro, livro_nao_encontrado, metricas_cache
+from utils.enriquecimento import enriquecer, iniciar_tarefa, obter_tarefa
+from utils.estatisticas_utils import (
+    contribuicoes, contribuicoes_categorias, aplicar_deltas, ler_estatisticas
+)
+from utils.alteracoes_utils import LIVRO, ASSOCIACAO, EXCLUIR, SALVAR, chave_associacao, registrar_alteracoes
 from config import Config # Para acessar GOOGLE_BOOKS_API_URL
 
 livro_bp = Blueprint('livro_bp', __name__)
 
+# Colunas que podem ser pedidas em ?campos= (projeção da listagem)
+CAMPOS_LIVRO = [
+    'id', 'isbn', 'titulo', 'autores', 'genero', 'editora', 'ano_publicacao',
+    'numero_paginas', 'capa_url', 'capa_hash', 'localizacao_fisica', 'notas_pessoais',
+    'idioma', 'data_inicio_leitura', 'data_fim_leitura', 'data_cadastro', 'id_usuario'
+]
+
+def codificar_cursor(ordenar_por, ordem, valor, livro_id):
+    """Gera o cursor opaco da próxima página a partir do último livro retornado."""
+    if valor is not None and not isinstance(valor, (int, str)):
+        valor = str(valor) # datetime -> 'AAAA-MM-DD HH:MM:SS', comparável no MySQL
+    payload = json.dumps({"o": ordenar_por, "d": ordem, "v": valor, "id": livro_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor_str):
+    """Decodifica o cursor; retorna None se ele estiver malformado."""
+    try:
+        padding = '=' * (-len(cursor_str) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor_str + padding).decode('utf-8'))
+        if not isinstance(dados, dict) or not isinstance(dados.get('id'), int):
+            return None
+        # 'v' vai direto para o WHERE: só texto (datas, títulos), inteiro ou nulo
+        valor = dados.get('v')
+        if isinstance(valor, bool) or not (valor is None or isinstance(valor, (str, int))):
+            return None
+        return dados
+    except (ValueError, TypeError):
+        return None
+
+def condicao_keyset(ordenar_por, ordem, valor, livro_id):
+    """Monta o WHERE que continua a ordenação (coluna, id) depois do último livro visto.
+    No MySQL NULL vem primeiro em ASC e por último em DESC, então ele é tratado à parte."""
+    coluna = f"l.{ordenar_por}"
+    if ordenar_por == 'id':
+        return ("l.id > %s" if ordem == 'ASC' else "l.id < %s"), [livro_id]
+
+    op = '>' if ordem == 'ASC' else '<'
+    if valor is None:
+        if ordem == 'ASC':
+            return f"(({coluna} IS NULL AND l.id > %s) OR {coluna} IS NOT NULL)", [livro_id]
+        return f"({coluna} IS NULL AND l.id < %s)", [livro_id]
+
+    condicao = f"({coluna} {op} %s OR ({coluna} = %s AND l.id {op} %s)"
+    if ordem == 'DESC':
+        condicao += f" OR {coluna} IS NULL"
+    condicao += ")"
+    return condicao, [valor, valor, livro_id]
+
 # --- Buscar dados do livro por ISBN na Google Books API (NÃO PROTEGIDA) ---
 @livro_bp.route('/livros/buscar-isbn', methods=['GET'])
 def buscar_livro_por_isbn():
@@ -20,44 +85,114 @@ def buscar_livro_por_isbn():
         return jsonify({"status": "erro", "mensagem": "ISBN é obrigatório para a busca."}), 400
 
     try:
-        search_url = f"{Config.GOOGLE_BOOKS_API_URL}?q=isbn:{isbn}"
-        response = requests.get(search_url)
-        response.raise_for_status()
-        google_data = response.json()
+        # Passa pelo cache (memória -> disco) antes de ir à Google Books API; a consulta à API
+        # tem prazo total de GOOGLE_BOOKS_PRAZO, então a thread do worker nunca fica presa além dele
+        book_data_preview = buscar_dados_livro(isbn)
 
-        if google_data and 'items' in google_data and len(google_data['items']) > 0:
-            volume_info = google_data['items'][0]['volumeInfo']
-            
-            book_data_preview = {
-                'isbn': isbn,
-                'titulo': volume_info.get('title', 'Título Desconhecido'),
-                'autores': ", ".join(volume_info.get('authors', ['Autor Desconhecido'])) if volume_info.get('authors') else 'Autor Desconhecido',
-                'genero': volume_info.get('categories', ['Gênero Desconhecido'])[0] if volume_info.get('categories') else 'Gênero Desconhecido',
-                'editora': volume_info.get('publisher', 'Editora Desconhecida'),
-                'ano_publicacao': int(volume_info.get('publishedDate', '0000')[:4]) if volume_info.get('publishedDate') and volume_info.get('publishedDate')[:4].isdigit() else None,
-                'numero_paginas': volume_info.get('pageCount', None),
-                'capa_url': volume_info['imageLinks']['thumbnail'] if 'imageLinks' in volume_info and 'thumbnail' in volume_info['imageLinks'] else None,
-                'idioma': volume_info.get('language', 'pt')[:2] if volume_info.get('language') else 'pt',
-                'localizacao_fisica': None,
-                'notas_pessoais': None,
-                'data_inicio_leitura': None,
-                'data_fim_leitura': None,
-                'id_usuario': None # Não podemos definir aqui, pois a busca é pública
-            }
+        if book_data_preview:
             return jsonify({"status": "sucesso", "mensagem": "Dados do livro encontrados.", "livro": book_data_preview})
         else:
             return jsonify({
                 "status": "sucesso",
                 "mensagem": f"Livro com ISBN {isbn} não encontrado na Google Books API. Por favor, insira os dados manualmente.",
-                "livro": {'isbn': isbn, 'titulo': 'Título Desconhecido', 'autores': 'Autor Desconhecido', 'genero': None, 'editora': None, 'ano_publicacao': None, 'numero_paginas': None, 'capa_url': None, 'idioma': 'pt', 'localizacao_fisica': None, 'notas_pessoais': None, 'data_inicio_leitura': None, 'data_fim_leitura': None, 'id_usuario': None}
+                "livro": livro_nao_encontrado(isbn)
             })
     except requests.exceptions.RequestException as e:
         print(f"Erro na requisição à Google Books API: {e}")
         return jsonify({"status": "erro", "mensagem": f"Erro ao comunicar com a API do Google Books: {e}"}), 500
 
+@livro_bp.route('/livros/buscar-isbn/metricas', methods=['GET'])
+def metricas_buscar_isbn():
+    # Acertos/falhas do cache de ISBN e latência das chamadas à Google Books API
+    return jsonify({"status": "sucesso", "metricas": metricas_cache()})
+
+# --- Enriquecimento de vários ISBNs de uma vez (PROTEGIDA) ---
+@livro_bp.route('/livros/buscar-isbn/lote', methods=['POST'])
+@token_required
+def buscar_isbns_em_lote(current_user_id):
+    data = request.get_json(silent=True)
+    isbns = data.get('isbns') if isinstance(data, dict) else None
+    if not isinstance(isbns, list) or not isbns:
+        return jsonify({"status": "erro", "mensagem": "Envie uma lista de ISBNs em 'isbns'."}), 400
+    isbns = [str(isbn).strip() for isbn in isbns if str(isbn).strip()]
+    if len(isbns) > Config.ENRIQUECIMENTO_MAX_ISBNS:
+        return jsonify({"status": "erro", "mensagem": f"Máximo de {Config.ENRIQUECIMENTO_MAX_ISBNS} ISBNs por lote."}), 400
+
+    # ?assincrono=true: responde na hora com o id da tarefa, consultado depois via GET
+    if request.args.get('assincrono', 'false').lower() == 'true':
+        conn = get_db_connection()
+        if conn:
+            try:
+                tarefa_id = iniciar_tarefa(conn, isbns, current_user_id)
+            except mysql.connector.Error as err:
+                print(f"Erro ao iniciar tarefa de enriquecimento: {err}")
+                return jsonify({"status": "erro", "mensagem": f"Erro interno ao iniciar o enriquecimento: {err}"}), 500
+            finally:
+                conn.close()
+        else:
+            return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para iniciar o enriquecimento."}), 500
+        return jsonify({"status": "sucesso", "mensagem": "Enriquecimento iniciado.", "tarefa_id": tarefa_id, "total": len(isbns)}), 202
+
+    # Padrão: NDJSON, uma linha por ISBN na ordem em que as consultas terminam
+    def gerar():
+        for resultado in enriquecer(isbns):
+            yield json_dumps(resultado) + "\n"
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+
+@livro_bp.route('/livros/buscar-isbn/lote/<tarefa_id>', methods=['GET'])
+@token_required
+def get_tarefa_enriquecimento(current_user_id, tarefa_id):
+    # Sempre no primário: o andamento é gravado a cada poucos décimos de segundo
+    conn = get_db_connection()
+    if conn:
+        try:
+            tarefa = obter_tarefa(conn, tarefa_id, current_user_id)
+        except mysql.connector.Error as err:
+            print(f"Erro ao buscar tarefa de enriquecimento: {err}")
+            return jsonify({"status": "erro", "mensagem": f"Erro interno ao buscar a tarefa: {err}"}), 500
+        finally:
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para buscar a tarefa."}), 500
+    if tarefa is None:
+        return jsonify({"status": "erro", "mensagem": "Tarefa de enriquecimento não encontrada."}), 404
+    return jsonify({"status": "sucesso", "tarefa": tarefa})
+
 # --- Salvar Livro no Banco de Dados (PROTEGIDA) ---
+def valores_livro(data, current_user_id):
+    """Valores de SQL_INSERIR_LIVRO; campos opcionais ausentes viram None."""
+    return (
+        data.get('isbn'),
+        data.get('titulo'),
+        data.get('autores'),
+        data.get('genero', None),
+        data.get('editora', None),
+        data.get('ano_publicacao', None),
+        data.get('numero_paginas', None),
+        data.get('capa_url', None),
+        data.get('localizacao_fisica', None),
+        data.get('notas_pessoais', None),
+        data.get('idioma', None),
+        data.get('data_inicio_leitura', None),
+        data.get('data_fim_leitura', None),
+        current_user_id # Usa o ID do usuário logado
+    )
+
+def classificar_erro_livro(err, isbn):
+    """Traduz erros do MySQL ao gravar um livro em (tipo, mensagem para o usuário)."""
+    if "Duplicate entry" in str(err) and "isbn" in str(err).lower():
+        return 'isbn_duplicado', f"Livro com ISBN {isbn} já existe no catálogo."
+    # Tratamento específico para o erro 1048 (NOT NULL)
+    if err.errno == 1048: # Código de erro MySQL para "Column cannot be null"
+        # Exemplo de mensagem de erro do MySQL: "Column 'genero' cannot be null"
+        # Usamos split("'")[1] para extrair o nome da coluna ('genero')
+        coluna = err.msg.split("'")[1]
+        return 'campo_nulo', f"Erro: O campo '{coluna}' não pode ser nulo. Por favor, forneça um valor."
+    return 'erro', f"Erro ao gravar livro: {err}"
+
 @livro_bp.route('/livros', methods=['POST'])
 @token_required # Aplica o decorador de proteção
+@altera_catalogo # Nova versão do catálogo (invalida os ETags das listagens)
 def adicionar_livro(current_user_id): # Recebe o ID do usuário logado
     data = request.get_json()
 
@@ -70,33 +205,13 @@ def adicionar_livro(current_user_id): # Recebe o ID do usuário logado
     if conn:
         cursor = conn.cursor()
         try:
-            sql = """
-            INSERT INTO livros (
-                isbn, titulo, autores, genero, editora, ano_publicacao,
-                numero_paginas, capa_url, localizacao_fisica, notas_pessoais,
-                idioma, data_inicio_leitura, data_fim_leitura, data_cadastro, id_usuario
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s)
-            """
-            values = (
-                data.get('isbn'),
-                data.get('titulo'),
-                data.get('autores'),
-                data.get('genero', None), # Garante que seja None se não vier
-                data.get('editora', None), # Garante que seja None se não vier
-                data.get('ano_publicacao', None), # Garante que seja None se não vier
-                data.get('numero_paginas', None), # Garante que seja None se não vier
-                data.get('capa_url', None), # Garante que seja None se não vier
-                data.get('localizacao_fisica', None), # Garante que seja None se não vier
-                data.get('notas_pessoais', None), # Garante que seja None se não vier
-                data.get('idioma', None), # Garante que seja None se não vier
-                data.get('data_inicio_leitura', None), # Garante que seja None se não vier
-                data.get('data_fim_leitura', None), # Garante que seja None se não vier
-                current_user_id # Usa o ID do usuário logado
-            )
-            cursor.execute(sql, values)
+            book_id = repositorio.inserir_livro(conn, valores_livro(data, current_user_id))
+            aplicar_deltas(cursor, current_user_id, adicionadas=contribuicoes(data))
+            registrar_alteracoes(conn, current_user_id, LIVRO, [book_id])
             conn.commit()
 
-            book_id = cursor.lastrowid
+            # A capa é baixada em segundo plano; até lá o livro fica com o link externo
+            agendar_capa(current_user_id, data.get('capa_url'))
             return jsonify({
                 "status": "sucesso",
                 "mensagem": f"Livro com ISBN {data.get('isbn')} adicionado com sucesso.",
@@ -105,18 +220,11 @@ def adicionar_livro(current_user_id): # Recebe o ID do usuário logado
         except mysql.connector.Error as err:
             conn.rollback()
             print(f"Erro ao inserir livro no DB: {err}")
-            if "Duplicate entry" in str(err) and "isbn" in str(err).lower():
-                 return jsonify({"status": "erro", "mensagem": f"Livro com ISBN {isbn} já existe no catálogo."}), 409
-            
-            # Tratamento específico para o erro 1048 (NOT NULL)
-            if err.errno == 1048: # Código de erro MySQL para "Column cannot be null"
-                # Exemplo de mensagem de erro do MySQL: "Column 'genero' cannot be null"
-                # Usamos split("'")[1] para extrair o nome da coluna ('genero')
-                return jsonify({
-                    "status": "erro", 
-                    "mensagem": f"Erro: O campo '{err.msg.split("'")[1]}' não pode ser nulo. Por favor, forneça um valor."
-                }), 400
-            
+            tipo_erro, mensagem = classificar_erro_livro(err, data.get('isbn'))
+            if tipo_erro == 'isbn_duplicado':
+                return jsonify({"status": "erro", "mensagem": mensagem}), 409
+            if tipo_erro == 'campo_nulo':
+                return jsonify({"status": "erro", "mensagem": mensagem}), 400
             return jsonify({"status": "erro", "mensagem": f"Erro interno ao adicionar livro: {err}"}), 500
         finally:
             cursor.close()
@@ -124,52 +232,269 @@ def adicionar_livro(current_user_id): # Recebe o ID do usuário logado
     else:
         return jsonify({"status": "erro", "mensagem": "Falha ao processar dados do livro ou conectar ao banco de dados."}), 500
 
+# --- Importação em lote (PROTEGIDA) ---
+def inserir_lote_livros(conn, cursor, itens, current_user_id, isbns_vistos):
+    """Grava um lote de (numero_linha, livro) numa transação e devolve o resultado de cada linha.
+    Tenta um INSERT multi-linha; se o MySQL recusar o lote, refaz linha a linha com
+    SAVEPOINT para saber exatamente quais linhas falharam."""
+    resultados = {}
+
+    # Duplicados dentro do próprio arquivo e contra o catálogo do usuário, numa única consulta
+    pendentes = []
+    for numero, livro in itens:
+        if livro['isbn'] in isbns_vistos:
+            resultados[numero] = ('isbn_duplicado', f"ISBN {livro['isbn']} repetido na importação.")
+        else:
+            isbns_vistos.add(livro['isbn'])
+            pendentes.append((numero, livro))
+    if pendentes:
+        marcadores = ", ".join(["%s"] * len(pendentes))
+        cursor.execute(
+            f"SELECT isbn FROM livros WHERE id_usuario = %s AND isbn IN ({marcadores})",
+            (current_user_id, *[livro['isbn'] for _, livro in pendentes])
+        )
+        existentes = {linha[0] for linha in cursor.fetchall()}
+        novos = []
+        for numero, livro in pendentes:
+            if livro['isbn'] in existentes:
+                resultados[numero] = ('isbn_duplicado', f"Livro com ISBN {livro['isbn']} já existe no catálogo.")
+            else:
+                novos.append((numero, livro))
+        pendentes = novos
+
+    if not pendentes:
+        return resultados
+
+    try:
+        # mysql.connector reescreve o executemany de INSERT num único INSERT multi-linha
+        cursor.executemany(SQL_INSERIR_LIVRO, [valores_livro(livro, current_user_id) for _, livro in pendentes])
+        aplicar_deltas(cursor, current_user_id,
+                       adicionadas=[linha for _, livro in pendentes for linha in contribuicoes(livro)])
+        # Os IDs de um INSERT multi-linha não são garantidamente contíguos: busca pelos ISBNs
+        cursor.execute(
+            f"SELECT id FROM livros WHERE id_usuario = %s AND isbn IN ({', '.join(['%s'] * len(pendentes))})",
+            (current_user_id, *[livro['isbn'] for _, livro in pendentes])
+        )
+        registrar_alteracoes(conn, current_user_id, LIVRO, [linha[0] for linha in cursor.fetchall()])
+        conn.commit()
+        for numero, _ in pendentes:
+            resultados[numero] = ('criado', None)
+        return resultados
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Lote de importação recusado, gravando linha a linha: {err}")
+
+    adicionadas = []
+    criados = []
+    for numero, livro in pendentes:
+        cursor.execute("SAVEPOINT linha_importacao")
+        try:
+            criados.append(repositorio.inserir_livro(conn, valores_livro(livro, current_user_id)))
+            resultados[numero] = ('criado', None)
+            adicionadas.extend(contribuicoes(livro))
+        except mysql.connector.Error as err:
+            cursor.execute("ROLLBACK TO SAVEPOINT linha_importacao")
+            resultados[numero] = classificar_erro_livro(err, livro['isbn'])
+    aplicar_deltas(cursor, current_user_id, adicionadas=adicionadas)
+    registrar_alteracoes(conn, current_user_id, LIVRO, criados)
+    conn.commit()
+    return resultados
+
+@livro_bp.route('/livros/importar', methods=['POST'])
+@token_required
+@altera_catalogo
+def importar_livros(current_user_id):
+    formato = detectar_formato(request)
+    if formato is None:
+        return jsonify({"status": "erro", "mensagem": "Formato não suportado. Envie JSON (lista), CSV ou NDJSON."}), 415
+
+    tamanho_lote = request.args.get('tamanho_lote', type=int) or Config.IMPORTACAO_TAMANHO_LOTE
+    tamanho_lote = max(1, min(tamanho_lote, Config.IMPORTACAO_TAMANHO_LOTE_MAXIMO))
+
+    conn = get_db_connection()
+    if conn:
+        cursor = conn.cursor()
+        resultados = []
+        resumo = {"criado": 0, "isbn_duplicado": 0, "campo_nulo": 0, "invalido": 0, "erro": 0}
+        isbns_vistos = set()
+        interrompido = None
+        try:
+            for lote in em_lotes(ler_linhas(request, formato), tamanho_lote):
+                validos = []
+                for numero, dados, erro in lote:
+                    if numero > Config.IMPORTACAO_MAX_LINHAS:
+                        interrompido = f"Limite de {Config.IMPORTACAO_MAX_LINHAS} linhas por importação atingido; as demais foram ignoradas."
+                        break
+                    livro = None
+                    if erro is None:
+                        livro, erro = validar_linha(dados)
+                    if erro:
+                        resultados.append({"linha": numero, "status": "invalido", "mensagem": erro})
+                        resumo["invalido"] += 1
+                    else:
+                        validos.append((numero, livro))
+
+                gravados = inserir_lote_livros(conn, cursor, validos, current_user_id, isbns_vistos)
+                for numero, livro in validos:
+                    if gravados.get(numero, (None,))[0] == 'criado':
+                        agendar_capa(current_user_id, livro.get('capa_url'))
+                for numero, (status, mensagem) in sorted(gravados.items()):
+                    item = {"linha": numero, "status": status}
+                    if mensagem:
+                        item["mensagem"] = mensagem
+                    resultados.append(item)
+                    resumo[status] += 1
+                if interrompido:
+                    break
+
+            resultados.sort(key=lambda item: item["linha"])
+            resposta = {"status": "sucesso", "resumo": resumo, "resultados": resultados}
+            if interrompido:
+                resposta["mensagem"] = interrompido
+            return jsonify(resposta), 201 if resumo["criado"] else 200
+        except ErroImportacao as e:
+            # Só o JSON é lido de uma vez, antes do primeiro lote: nada foi gravado
+            return jsonify({"status": "erro", "mensagem": str(e)}), 400
+        except mysql.connector.Error as err:
+            conn.rollback() # Desfaz só o lote que falhou
+            print(f"Erro ao importar livros: {err}")
+            mensagem = f"Erro interno ao importar livros: {err}."
+            if resumo["criado"]:
+                # Lotes anteriores já foram confirmados: @altera_catalogo não age num 500
+                catalogo_alterado(current_user_id)
+                mensagem += " Apenas o lote em andamento foi desfeito; os anteriores foram gravados (ver 'resultados')."
+            return jsonify({"status": "erro", "mensagem": mensagem, "resumo": resumo, "resultados": resultados}), 500
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para importar livros."}), 500
+
 # --- ROTAS DE LIVROS (PROTEGIDAS E FILTRADAS POR USUÁRIO) ---
 
+def filtros_livros(args, current_user_id, ignorar=None):
+    """Filtros exatos comuns à listagem e à exportação (categoria_id, genero, editora, idioma).
+    Retorna (where_clauses, values) já com o filtro obrigatório por usuário.
+    `ignorar` deixa de fora o filtro de uma faceta ('categoria', 'genero', ...)."""
+    values = []
+    where_clauses = ["l.id_usuario = %s"] # **FILTRO POR USUÁRIO SEMPRE**
+    values.append(current_user_id) # Adiciona o ID do usuário logado aos valores
+
+    categoria_id = args.get('categoria_id', type=int)
+    if categoria_id is not None and ignorar != 'categoria':
+        # Semi-join: cada livro aparece uma vez, sem precisar de DISTINCT (e da tabela temporária)
+        where_clauses.append("EXISTS (SELECT 1 FROM livro_categoria lc WHERE lc.id_livro = l.id AND lc.id_categoria = %s)")
+        values.append(categoria_id)
+
+    for campo in ['genero', 'editora', 'idioma']:
+        valor = args.get(campo)
+        if valor and campo != ignorar:
+            where_clauses.append(f"l.{campo} = %s")
+            values.append(valor)
+    return where_clauses, values
+
+FACETAS_COLUNA = ['genero', 'editora', 'idioma']
+
+def consulta_facetas(cursor, args, current_user_id):
+    """Total e contagens de cada faceta numa única instrução (UNION ALL de GROUP BYs).
+    Cada faceta é contada com os filtros das outras, para o menu continuar mostrando as alternativas."""
+    termo_busca = args.get('busca')
+    busca = clausula_busca(termo_busca, cursor) if termo_busca else None
+
+    def condicoes(ignorar):
+        where_clauses, values = filtros_livros(args, current_user_id, ignorar=ignorar)
+        if busca:
+            where_clauses.append(busca[0])
+            values.extend(busca[1])
+        return " AND ".join(where_clauses), values
+
+    partes, valores = [], []
+    condicao, values = condicoes(None)
+    partes.append(f"SELECT 'total' AS faceta, NULL AS valor, NULL AS nome, COUNT(*) AS quantidade "
+                  f"FROM livros l WHERE {condicao}")
+    valores.extend(values)
+    for campo in FACETAS_COLUNA:
+        condicao, values = condicoes(campo)
+        partes.append(
+            f"SELECT '{campo}', l.{campo}, NULL, COUNT(*) FROM livros l "
+            f"WHERE {condicao} AND l.{campo} IS NOT NULL AND l.{campo} <> '' GROUP BY l.{campo}"
+        )
+        valores.extend(values)
+    condicao, values = condicoes('categoria')
+    partes.append(
+        f"SELECT 'categoria', CAST(c.id AS CHAR), c.nome, COUNT(*) FROM livros l "
+        f"JOIN livro_categoria lc ON lc.id_livro = l.id JOIN categorias c ON c.id = lc.id_categoria "
+        f"WHERE {condicao} GROUP BY c.id, c.nome"
+    )
+    valores.extend(values)
+    return " UNION ALL ".join(f"({parte})" for parte in partes), tuple(valores)
+
+def facetas_sem_filtro(cursor, current_user_id):
+    """Catálogo inteiro: as contagens já estão em estatisticas_usuario (mantidas a cada escrita)."""
+    estatisticas = ler_estatisticas(cursor, current_user_id)
+    cursor.execute("SELECT id, nome FROM categorias WHERE id_usuario = %s", (current_user_id,))
+    nomes = {str(linha['id']): linha['nome'] for linha in cursor.fetchall()}
+    linhas = [('total', None, None, estatisticas['total_livros'])]
+    for campo in FACETAS_COLUNA:
+        linhas.extend((campo, valor, None, qtd) for valor, qtd in estatisticas[f'por_{campo}'].items())
+    linhas.extend(
+        ('categoria', valor, nomes[valor], qtd) for valor, qtd in estatisticas['por_categoria'].items() if valor in nomes
+    )
+    return linhas
+
+def montar_facetas(linhas):
+    total = 0
+    facetas = {campo: [] for campo in FACETAS_COLUNA + ['categoria']}
+    for faceta, valor, nome, quantidade in linhas:
+        if faceta == 'total':
+            total = quantidade
+        elif faceta == 'categoria':
+            facetas['categoria'].append({"id": int(valor), "nome": nome, "quantidade": quantidade})
+        else:
+            facetas[faceta].append({"valor": valor, "quantidade": quantidade})
+    for faceta, itens in facetas.items():
+        itens.sort(key=lambda item: (-item['quantidade'], item.get('nome') or item.get('valor')))
+    return total, facetas
+
+def anexar_categorias(cursor, livros):
+    """Preenche livro['categorias'] para todos os livros com uma consulta por bloco de IDs,
+    em vez de uma requisição por categoria no cliente. Usa cursor comum (linhas em tupla)."""
+    por_livro = {}
+    for livro in livros:
+        livro['categorias'] = []
+        por_livro[livro['id']] = livro
+    ids = list(por_livro)
+    for inicio in range(0, len(ids), Config.ASSOCIACAO_TAMANHO_LOTE):
+        bloco = ids[inicio:inicio + Config.ASSOCIACAO_TAMANHO_LOTE]
+        cursor.execute(
+            f"SELECT lc.id_livro, c.id, c.nome FROM livro_categoria lc "
+            f"JOIN categorias c ON c.id = lc.id_categoria "
+            f"WHERE lc.id_livro IN ({', '.join(['%s'] * len(bloco))}) ORDER BY c.nome",
+            tuple(bloco)
+        )
+        for id_livro, categoria_id, nome in cursor.fetchall():
+            por_livro[id_livro]['categorias'].append({"id": categoria_id, "nome": nome})
+
+def incluir_categorias(args):
+    """?incluir=categorias (aceita lista separada por vírgula para futuras inclusões)."""
+    return 'categorias' in [i.strip() for i in args.get('incluir', '').split(',')]
+
 @livro_bp.route('/livros', methods=['GET'])
 @token_required # Protege a rota
+@com_etag # Responde 304 sem consultar o MySQL se o catálogo não mudou
+@com_cache_respostas # Mesmo filtro/ordenação já consultado: devolve o JSON guardado
 def get_all_livros(current_user_id): # Recebe o ID do usuário logado
-    conn = get_db_connection()
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
     if conn:
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor() # Linhas em tupla; os dicts são montados abaixo com as colunas do SELECT
         try:
-            categoria_id = request.args.get('categoria_id', type=int)
-            termo_busca = request.args.get('busca') # Para título/autor
-            genero = request.args.get('genero')
-            editora = request.args.get('editora')
-            idioma = request.args.get('idioma')
+            termo_busca = request.args.get('busca') # Título, autores, editora, gênero e notas
 
+            # Com ?busca= e sem ordenação explícita, os resultados saem por relevância
+            ordenar_por_relevancia = bool(termo_busca) and request.args.get('ordenar_por', 'relevancia') == 'relevancia'
             ordenar_por = request.args.get('ordenar_por', 'titulo')
             ordem = request.args.get('ordem', 'ASC').upper()
 
-            sql = "SELECT DISTINCT l.* FROM livros l"
-            values = []
-            where_clauses = ["l.id_usuario = %s"] # **FILTRO POR USUÁRIO SEMPRE**
-            values.append(current_user_id) # Adiciona o ID do usuário logado aos valores
-
-            if categoria_id is not None:
-                sql += " JOIN livro_categoria lc ON l.id = lc.id_livro"
-                where_clauses.append("lc.id_categoria = %s")
-                values.append(categoria_id)
-
-            if termo_busca:
-                where_clauses.append("(l.titulo LIKE %s OR l.autores LIKE %s)")
-                values.append(f"%{termo_busca}%")
-                values.append(f"%{termo_busca}%")
-            
-            if genero:
-                where_clauses.append("l.genero = %s")
-                values.append(genero)
-            if editora:
-                where_clauses.append("l.editora = %s")
-                values.append(editora)
-            if idioma:
-                where_clauses.append("l.idioma = %s")
-                values.append(idioma)
-
-            if where_clauses:
-                sql += " WHERE " + " AND ".join(where_clauses)
-            
             valid_order_fields = ['titulo', 'autores', 'ano_publicacao', 'data_cadastro', 'id']
             if ordenar_por not in valid_order_fields:
                 ordenar_por = 'titulo'
@@ -177,20 +502,97 @@ def get_all_livros(current_user_id): # Recebe o ID do usuário logado
             if ordem not in ['ASC', 'DESC']:
                 ordem = 'ASC'
 
-            sql += f" ORDER BY {ordenar_por} {ordem}"
+            # Paginação por cursor (keyset): só é ativada com ?limite= ou ?cursor=.
+            # Sem eles a rota devolve o catálogo inteiro, como antes.
+            limite = request.args.get('limite', type=int)
+            cursor_str = request.args.get('cursor')
+            paginado = limite is not None or cursor_str is not None
+            cursor_dados = None
+            if paginado:
+                if limite is None:
+                    limite = Config.LIVROS_LIMITE_PADRAO
+                if limite < 1 or limite > Config.LIVROS_LIMITE_MAXIMO:
+                    return jsonify({"status": "erro", "mensagem": f"O parâmetro 'limite' deve estar entre 1 e {Config.LIVROS_LIMITE_MAXIMO}."}), 400
+                if cursor_str:
+                    cursor_dados = decodificar_cursor(cursor_str)
+                    if cursor_dados is None:
+                        return jsonify({"status": "erro", "mensagem": "Cursor de paginação inválido."}), 400
+                    if cursor_dados.get('o') != ordenar_por or cursor_dados.get('d') != ordem:
+                        return jsonify({"status": "erro", "mensagem": "O cursor não corresponde à ordenação solicitada."}), 400
+
+            # Projeção: ?campos=titulo,autores evita trazer notas_pessoais, capa_url etc.
+            campos_param = request.args.get('campos')
+            if campos_param:
+                campos = [c.strip() for c in campos_param.split(',') if c.strip()]
+                invalidos = [c for c in campos if c not in CAMPOS_LIVRO]
+                if invalidos:
+                    return jsonify({"status": "erro", "mensagem": f"Campos inválidos: {', '.join(invalidos)}."}), 400
+                # id e a coluna de ordenação são necessários para montar o cursor
+                for obrigatorio in ['id', ordenar_por]:
+                    if obrigatorio not in campos:
+                        campos.append(obrigatorio)
+                colunas_sql = ", ".join(f"l.{c}" for c in campos)
+            else:
+                campos = CAMPOS_LIVRO
+                colunas_sql = "l.*"
 
-            cursor.execute(sql, tuple(values))
-            livros = cursor.fetchall()
+            select_values = []
+            relevancia_sql = None
+            if termo_busca:
+                condicao_busca, valores_busca, relevancia_sql = clausula_busca(termo_busca, cursor)
+            # Relevância não tem valor estável para o cursor, então só vale sem paginação
+            if relevancia_sql and ordenar_por_relevancia and not paginado:
+                colunas_sql += f", {relevancia_sql} AS relevancia"
+                select_values.extend(valores_busca)
+            else:
+                ordenar_por_relevancia = False
 
-            for livro in livros:
-                for key in ['data_inicio_leitura', 'data_fim_leitura', 'data_cadastro']:
-                    if isinstance(livro.get(key), (type(None),)):
-                        livro[key] = None
-                    else:
-                        livro[key] = str(livro[key])
+            where_clauses, values = filtros_livros(request.args, current_user_id)
+            sql = f"SELECT {colunas_sql} FROM livros l"
+
+            if termo_busca:
+                where_clauses.append(condicao_busca)
+                values.extend(valores_busca)
+
+            if cursor_dados is not None:
+                condicao, valores_cursor = condicao_keyset(ordenar_por, ordem, cursor_dados.get('v'), cursor_dados['id'])
+                where_clauses.append(condicao)
+                values.extend(valores_cursor)
 
-            return jsonify({"status": "sucesso", "total": len(livros), "livros": livros})
+            if where_clauses:
+                sql += " WHERE " + " AND ".join(where_clauses)
+
+            if paginado:
+                # id desempata a ordenação para o cursor nunca pular nem repetir livros
+                sql += f" ORDER BY l.{ordenar_por} {ordem}, l.id {ordem} LIMIT %s"
+                values.append(limite + 1) # Um a mais para saber se existe próxima página
+            elif ordenar_por_relevancia:
+                sql += " ORDER BY relevancia DESC, l.id ASC"
+            else:
+                sql += f" ORDER BY {ordenar_por} {ordem}"
+
+            cursor.execute(sql, tuple(select_values + values))
+            linhas = cursor.fetchall()
+            colunas = cursor.column_names # Uma vez por consulta, não uma por linha
+            livros = [dict(zip(colunas, linha)) for linha in linhas]
+
+            proximo_cursor = None
+            if paginado and len(livros) > limite:
+                livros = livros[:limite]
+                ultimo = livros[-1]
+                proximo_cursor = codificar_cursor(ordenar_por, ordem, ultimo[ordenar_por], ultimo['id'])
+
+            # Datas seguem como date/datetime: o provedor JSON do app (utils/json_utils.py) as serializa
+            if incluir_categorias(request.args) and livros:
+                anexar_categorias(cursor, livros)
+
+            resposta = {"status": "sucesso", "total": len(livros), "livros": livros}
+            if paginado:
+                resposta["proximo_cursor"] = proximo_cursor
+            return jsonify(resposta)
         except mysql.connector.Error as err:
+            if indice_fulltext_ausente(err):
+                return jsonify({"status": "erro", "mensagem": "Busca indisponível no momento. Tente novamente."}), 503, {"Retry-After": "1"}
             print(f"Erro ao buscar livros: {err}")
             return jsonify({"status": "erro", "mensagem": f"Erro ao buscar livros: {err}"}), 500
         finally:
@@ -200,24 +602,138 @@ def get_all_livros(current_user_id): # Recebe o ID do usuário logado
         return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para buscar livros."}), 500
 
 
+# --- Facetas dos filtros de GET /livros (PROTEGIDA) ---
+@livro_bp.route('/livros/facetas', methods=['GET'])
+@token_required
+@com_etag
+@com_cache_respostas
+def get_facetas_livros(current_user_id):
+    # Aceita os mesmos filtros da listagem (genero, editora, idioma, categoria_id, busca)
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
+    if conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            filtrado = request.args.get('busca') or request.args.get('categoria_id', type=int) is not None \
+                or any(request.args.get(campo) for campo in FACETAS_COLUNA)
+            if filtrado:
+                sql, valores = consulta_facetas(cursor, request.args, current_user_id)
+                cursor.execute(sql, valores)
+                linhas = [(linha['faceta'], linha['valor'], linha['nome'], linha['quantidade']) for linha in cursor.fetchall()]
+            else:
+                linhas = facetas_sem_filtro(cursor, current_user_id)
+            total, facetas = montar_facetas(linhas)
+            return jsonify({"status": "sucesso", "total": total, "facetas": facetas})
+        except mysql.connector.Error as err:
+            if indice_fulltext_ausente(err):
+                return jsonify({"status": "erro", "mensagem": "Busca indisponível no momento. Tente novamente."}), 503, {"Retry-After": "1"}
+            print(f"Erro ao calcular facetas: {err}")
+            return jsonify({"status": "erro", "mensagem": f"Erro ao calcular facetas: {err}"}), 500
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para calcular facetas."}), 500
+
+# --- Exportação em streaming do catálogo (PROTEGIDA) ---
+@livro_bp.route('/livros/exportar', methods=['GET'])
+@token_required
+def exportar_livros(current_user_id):
+    formato = request.args.get('formato', 'ndjson').lower()
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({"status": "erro", "mensagem": "Formato de exportação inválido. Use 'ndjson' ou 'csv'."}), 400
+
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
+    if not conn:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para exportar livros."}), 500
+
+    # Cursor sem buffer: as linhas vêm do MySQL aos poucos, sem fetchall() na memória
+    cursor = conn.cursor(buffered=False)
+    try:
+        where_clauses, values = filtros_livros(request.args, current_user_id)
+        colunas_sql = ", ".join(f"l.{c}" for c in CAMPOS_LIVRO)
+        sql = f"SELECT {colunas_sql} FROM livros l WHERE {' AND '.join(where_clauses)} ORDER BY l.id"
+        cursor.execute(sql, tuple(values))
+    except mysql.connector.Error as err:
+        print(f"Erro ao exportar livros: {err}")
+        cursor.close()
+        conn.close()
+        return jsonify({"status": "erro", "mensagem": f"Erro ao exportar livros: {err}"}), 500
+
+    def gerar():
+        # A conexão só volta ao pool quando o último lote for enviado (ou o cliente desistir)
+        try:
+            if formato == 'csv':
+                buffer = io.StringIO()
+                escritor = csv.writer(buffer)
+                escritor.writerow(CAMPOS_LIVRO)
+            while True:
+                linhas = cursor.fetchmany(Config.EXPORTACAO_TAMANHO_LOTE)
+                if not linhas:
+                    break
+                if formato == 'csv':
+                    escritor.writerows(linhas)
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                else:
+                    yield "".join(
+                        json_dumps(dict(zip(CAMPOS_LIVRO, linha))) + "\n"
+                        for linha in linhas
+                    )
+        except mysql.connector.Error as err:
+            # O status 200 já foi enviado; só resta registrar e encerrar o stream
+            print(f"Erro durante a exportação de livros: {err}")
+        finally:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass # Linhas não lidas (cliente desconectou); a conexão é descartada pelo pool se preciso
+            conn.close()
+
+    extensao = 'csv' if formato == 'csv' else 'ndjson'
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(gerar()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=livros.{extensao}"}
+    )
+
+# --- Estatísticas do catálogo (PROTEGIDA) ---
+@livro_bp.route('/livros/estatisticas', methods=['GET'])
+@token_required
+@com_etag
+def get_estatisticas(current_user_id):
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
+    if conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            # Leitura O(1) dos contadores mantidos pelas rotas de escrita
+            estatisticas = ler_estatisticas(cursor, current_user_id)
+            return jsonify({"status": "sucesso", "estatisticas": estatisticas})
+        except mysql.connector.Error as err:
+            print(f"Erro ao buscar estatísticas: {err}")
+            return jsonify({"status": "erro", "mensagem": f"Erro ao buscar estatísticas: {err}"}), 500
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para buscar estatísticas."}), 500
+
 @livro_bp.route('/livros/<int:livro_id>', methods=['GET'])
 @token_required # Protege a rota
+@com_etag
 def get_livro_by_id(current_user_id, livro_id): # Recebe o ID do usuário
-    conn = get_db_connection()
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
     if conn:
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
         try:
             # Filtra por ID do livro E ID do usuário para garantir que o usuário só veja seus próprios livros
-            sql = "SELECT * FROM livros WHERE id = %s AND id_usuario = %s"
-            cursor.execute(sql, (livro_id, current_user_id))
-            livro = cursor.fetchone()
-
-            if livro:
-                for key in ['data_inicio_leitura', 'data_fim_leitura', 'data_cadastro']:
-                    if isinstance(livro.get(key), (type(None),)):
-                        livro[key] = None
-                    else:
-                        livro[key] = str(livro[key])
+            linha = repositorio.livro_por_id(conn, livro_id, current_user_id)
+
+            if linha:
+                livro = linha._asdict()
+                if incluir_categorias(request.args):
+                    anexar_categorias(cursor, [livro])
                 return jsonify({"status": "sucesso", "livro": livro})
             else:
                 return jsonify({"status": "erro", "mensagem": "Livro não encontrado ou você não tem permissão para acessá-lo."}), 404
@@ -232,6 +748,7 @@ def get_livro_by_id(current_user_id, livro_id): # Recebe o ID do usuário
 
 @livro_bp.route('/livros/<int:livro_id>', methods=['PUT'])
 @token_required # Protege a rota
+@altera_catalogo
 def update_livro(current_user_id, livro_id): # Recebe o ID do usuário
     data = request.get_json()
 
@@ -242,34 +759,27 @@ def update_livro(current_user_id, livro_id): # Recebe o ID do usuário
     if conn:
         cursor = conn.cursor()
         try:
-            set_clauses = []
-            values = []
-            
-            updatable_fields = [
-                'isbn', 'titulo', 'autores', 'genero', 'editora', 'ano_publicacao',
-                'numero_paginas', 'capa_url', 'localizacao_fisica', 'notas_pessoais',
-                'idioma', 'data_inicio_leitura', 'data_fim_leitura'
-            ]
-
-            for field in updatable_fields:
-                if field in data:
-                    set_clauses.append(f"{field} = %s")
-                    values.append(data[field])
-            
-            if not set_clauses:
+            if not any(field in data for field in CAMPOS_ATUALIZAVEIS_LIVRO):
                 return jsonify({"status": "erro", "mensagem": "Nenhum campo válido fornecido para atualização."}), 400
 
-            # Garante que só o próprio usuário possa atualizar seus livros
-            sql = f"UPDATE livros SET {', '.join(set_clauses)} WHERE id = %s AND id_usuario = %s"
-            values.append(livro_id)
-            values.append(current_user_id)
+            # Estado anterior do livro, para ajustar os contadores de estatística
+            anterior = repositorio.livro_para_estatisticas(conn, livro_id, current_user_id)
 
-            cursor.execute(sql, tuple(values))
+            # Garante que só o próprio usuário possa atualizar seus livros
+            alteradas = repositorio.atualizar_livro(conn, livro_id, current_user_id, data,
+                                                    limpar_capa='capa_url' in data)
+            if anterior is not None and alteradas > 0:
+                aplicar_deltas(cursor, current_user_id,
+                               removidas=contribuicoes(anterior),
+                               adicionadas=contribuicoes({**anterior, **data}))
+                registrar_alteracoes(conn, current_user_id, LIVRO, [livro_id])
             conn.commit()
 
-            if cursor.rowcount == 0:
+            if alteradas == 0:
                 return jsonify({"status": "erro", "mensagem": "Livro não encontrado ou você não tem permissão para atualizá-lo."}), 404
             else:
+                if 'capa_url' in data:
+                    agendar_capa(current_user_id, data['capa_url'])
                 return jsonify({"status": "sucesso", "mensagem": f"Livro com ID {livro_id} atualizado com sucesso."}), 200
 
         except mysql.connector.Error as err:
@@ -286,17 +796,28 @@ def update_livro(current_user_id, livro_id): # Recebe o ID do usuário
 
 @livro_bp.route('/livros/<int:livro_id>', methods=['DELETE'])
 @token_required # Protege a rota
+@altera_catalogo
 def delete_livro(current_user_id, livro_id): # Recebe o ID do usuário
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
         try:
+            anterior = repositorio.livro_para_estatisticas(conn, livro_id, current_user_id)
+            if anterior is not None:
+                categorias_anteriores = repositorio.categorias_do_livro(conn, livro_id)
+
             # Garante que só o próprio usuário possa excluir seus livros
-            sql = "DELETE FROM livros WHERE id = %s AND id_usuario = %s"
-            cursor.execute(sql, (livro_id, current_user_id))
+            excluidas = repositorio.excluir_livro(conn, livro_id, current_user_id)
+            if anterior is not None and excluidas > 0:
+                aplicar_deltas(cursor, current_user_id,
+                               removidas=contribuicoes(anterior) + contribuicoes_categorias(categorias_anteriores))
+                # Lápides também das associações que saíram em cascata
+                registrar_alteracoes(conn, current_user_id, ASSOCIACAO,
+                                     [chave_associacao(livro_id, c) for c in categorias_anteriores], EXCLUIR)
+                registrar_alteracoes(conn, current_user_id, LIVRO, [livro_id], EXCLUIR)
             conn.commit()
 
-            if cursor.rowcount == 0:
+            if excluidas == 0:
                 return jsonify({"status": "erro", "mensagem": "Livro não encontrado ou você não tem permissão para excluí-lo."}), 404
             else:
                 return jsonify({"status": "sucesso", "mensagem": f"Livro com ID {livro_id} excluído com sucesso."}), 200
@@ -313,23 +834,21 @@ def delete_livro(current_user_id, livro_id): # Recebe o ID do usuário
 # --- ROTAS DE ASSOCIAÇÃO LIVRO-CATEGORIA (PROTEGIDAS) ---
 @livro_bp.route('/livros/<int:livro_id>/categorias/<int:categoria_id>', methods=['POST'])
 @token_required
+@altera_catalogo
 def add_livro_to_categoria(current_user_id, livro_id, categoria_id):
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT id FROM livros WHERE id = %s AND id_usuario = %s", (livro_id, current_user_id))
-            livro_existe = cursor.fetchone()
-            if not livro_existe:
+            if not repositorio.livro_existe(conn, livro_id, current_user_id):
                 return jsonify({"status": "erro", "mensagem": "Livro não encontrado ou você não tem permissão para acessá-lo."}), 404
 
-            cursor.execute("SELECT id FROM categorias WHERE id = %s AND id_usuario = %s", (categoria_id, current_user_id))
-            categoria_existe = cursor.fetchone()
-            if not categoria_existe:
+            if not repositorio.categoria_existe(conn, categoria_id, current_user_id):
                 return jsonify({"status": "erro", "mensagem": "Categoria não encontrada ou você não tem permissão para acessá-la."}), 404
 
-            sql = "INSERT INTO livro_categoria (id_livro, id_categoria) VALUES (%s, %s)"
-            cursor.execute(sql, (livro_id, categoria_id))
+            repositorio.associar(conn, livro_id, categoria_id)
+            aplicar_deltas(cursor, current_user_id, adicionadas=contribuicoes_categorias([categoria_id]))
+            registrar_alteracoes(conn, current_user_id, ASSOCIACAO, [chave_associacao(livro_id, categoria_id)])
             conn.commit()
             return jsonify({"status": "sucesso", "mensagem": f"Livro {livro_id} associado à categoria {categoria_id} com sucesso."}), 201
         except mysql.connector.Error as err:
@@ -346,26 +865,25 @@ def add_livro_to_categoria(current_user_id, livro_id, categoria_id):
 
 @livro_bp.route('/livros/<int:livro_id>/categorias/<int:categoria_id>', methods=['DELETE'])
 @token_required
+@altera_catalogo
 def remove_livro_from_categoria(current_user_id, livro_id, categoria_id):
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT id FROM livros WHERE id = %s AND id_usuario = %s", (livro_id, current_user_id))
-            livro_existe = cursor.fetchone()
-            if not livro_existe:
+            if not repositorio.livro_existe(conn, livro_id, current_user_id):
                 return jsonify({"status": "erro", "mensagem": "Livro não encontrado ou você não tem permissão para acessá-lo."}), 404
 
-            cursor.execute("SELECT id FROM categorias WHERE id = %s AND id_usuario = %s", (categoria_id, current_user_id))
-            categoria_existe = cursor.fetchone()
-            if not categoria_existe:
+            if not repositorio.categoria_existe(conn, categoria_id, current_user_id):
                 return jsonify({"status": "erro", "mensagem": "Categoria não encontrada ou você não tem permissão para acessá-la."}), 404
             
-            sql = "DELETE FROM livro_categoria WHERE id_livro = %s AND id_categoria = %s"
-            cursor.execute(sql, (livro_id, categoria_id))
+            removidas = repositorio.desassociar(conn, livro_id, categoria_id)
+            if removidas > 0:
+                aplicar_deltas(cursor, current_user_id, removidas=contribuicoes_categorias([categoria_id]))
+                registrar_alteracoes(conn, current_user_id, ASSOCIACAO, [chave_associacao(livro_id, categoria_id)], EXCLUIR)
             conn.commit()
 
-            if cursor.rowcount == 0:
+            if removidas == 0:
                 return jsonify({"status": "erro", "mensagem": "Associação de livro e categoria não encontrada."}), 404
             else:
                 return jsonify({"status": "sucesso", "mensagem": f"Associação do Livro {livro_id} com a Categoria {categoria_id} removida com sucesso."}), 200
@@ -377,4 +895,112 @@ def remove_livro_from_categoria(current_user_id, livro_id, categoria_id):
             cursor.close()
             conn.close()
     else:
-        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para remover associação."}), 500
\ No newline at end of file
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para remover associação."}), 500
+
+# --- Associação em lote (PROTEGIDA) ---
+def ler_ids(data, campo):
+    """Lista de inteiros positivos sem repetição, ou None se o campo for inválido."""
+    valores = data.get(campo) if isinstance(data, dict) else None
+    if not isinstance(valores, list) or not valores:
+        return None
+    ids = []
+    for valor in valores:
+        if isinstance(valor, bool) or not isinstance(valor, int) or valor <= 0:
+            return None
+        if valor not in ids:
+            ids.append(valor)
+    return ids
+
+@livro_bp.route('/livros/categorias/lote', methods=['POST', 'DELETE'])
+@token_required
+@altera_catalogo
+def associar_categorias_em_lote(current_user_id):
+    data = request.get_json(silent=True)
+    livro_ids = ler_ids(data, 'livros')
+    categoria_ids = ler_ids(data, 'categorias')
+    if livro_ids is None or categoria_ids is None:
+        return jsonify({"status": "erro", "mensagem": "Envie listas não vazias de IDs em 'livros' e 'categorias'."}), 400
+    if len(livro_ids) * len(categoria_ids) > Config.ASSOCIACAO_MAX_PARES:
+        return jsonify({"status": "erro", "mensagem": f"Máximo de {Config.ASSOCIACAO_MAX_PARES} pares livro-categoria por requisição."}), 400
+    remover = request.method == 'DELETE'
+
+    conn = get_db_connection()
+    if conn:
+        cursor = conn.cursor()
+        try:
+            # Posse de livros e categorias verificada numa única consulta
+            marcadores_livros = ", ".join(["%s"] * len(livro_ids))
+            marcadores_categorias = ", ".join(["%s"] * len(categoria_ids))
+            cursor.execute(
+                f"SELECT 'livro', id FROM livros WHERE id_usuario = %s AND id IN ({marcadores_livros}) "
+                f"UNION ALL "
+                f"SELECT 'categoria', id FROM categorias WHERE id_usuario = %s AND id IN ({marcadores_categorias})",
+                (current_user_id, *livro_ids, current_user_id, *categoria_ids)
+            )
+            encontrados = cursor.fetchall()
+            livros_validos = {id_ for tipo, id_ in encontrados if tipo == 'livro'}
+            categorias_validas = {id_ for tipo, id_ in encontrados if tipo == 'categoria'}
+
+            existentes = set()
+            if livros_validos and categorias_validas:
+                cursor.execute(
+                    f"SELECT id_livro, id_categoria FROM livro_categoria "
+                    f"WHERE id_livro IN ({', '.join(['%s'] * len(livros_validos))}) "
+                    f"AND id_categoria IN ({', '.join(['%s'] * len(categorias_validas))}) FOR UPDATE",
+                    (*livros_validos, *categorias_validas)
+                )
+                existentes = set(cursor.fetchall())
+
+            resultados = []
+            pares = []
+            for livro_id in livro_ids:
+                for categoria_id in categoria_ids:
+                    if livro_id not in livros_validos:
+                        status = "livro_nao_encontrado"
+                    elif categoria_id not in categorias_validas:
+                        status = "categoria_nao_encontrada"
+                    elif remover:
+                        status = "removido" if (livro_id, categoria_id) in existentes else "nao_associado"
+                    else:
+                        status = "ja_associado" if (livro_id, categoria_id) in existentes else "associado"
+                    if status in ("associado", "removido"):
+                        pares.append((livro_id, categoria_id))
+                    resultados.append({"livro": livro_id, "categoria": categoria_id, "status": status})
+
+            # Uma instrução multi-linha por bloco, tudo na mesma transação
+            for inicio in range(0, len(pares), Config.ASSOCIACAO_TAMANHO_LOTE):
+                bloco = pares[inicio:inicio + Config.ASSOCIACAO_TAMANHO_LOTE]
+                valores = [v for par in bloco for v in par]
+                if remover:
+                    cursor.execute(
+                        f"DELETE FROM livro_categoria WHERE (id_livro, id_categoria) IN ({', '.join(['(%s, %s)'] * len(bloco))})",
+                        tuple(valores)
+                    )
+                else:
+                    cursor.execute(
+                        f"INSERT IGNORE INTO livro_categoria (id_livro, id_categoria) VALUES {', '.join(['(%s, %s)'] * len(bloco))}",
+                        tuple(valores)
+                    )
+
+            linhas_categoria = contribuicoes_categorias([categoria_id for _, categoria_id in pares])
+            if remover:
+                aplicar_deltas(cursor, current_user_id, removidas=linhas_categoria)
+            else:
+                aplicar_deltas(cursor, current_user_id, adicionadas=linhas_categoria)
+            registrar_alteracoes(conn, current_user_id, ASSOCIACAO,
+                                 [chave_associacao(l, c) for l, c in pares], EXCLUIR if remover else SALVAR)
+            conn.commit()
+
+            resumo = {}
+            for resultado in resultados:
+                resumo[resultado["status"]] = resumo.get(resultado["status"], 0) + 1
+            return jsonify({"status": "sucesso", "resumo": resumo, "resultados": resultados}), 200
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"Erro na associação em lote: {err}")
+            return jsonify({"status": "erro", "mensagem": f"Erro interno na associação em lote: {err}"}), 500
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para associar livros às categorias."}), 500
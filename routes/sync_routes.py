@@ -0,0 +1,118 @@
+# routes/sync_routes.py
+from flask import Blueprint, request, jsonify
+import mysql.connector
+import base64
+import json
+
+from utils.db_utils import get_db_connection
+from utils.auth_utils import token_required
+from utils.alteracoes_utils import LIVRO, CATEGORIA, ASSOCIACAO, EXCLUIR, ler_alteracoes, ler_horizonte
+from config import Config
+
+sync_bp = Blueprint('sync_bp', __name__)
+
+def codificar_cursor_sync(seq):
+    payload = json.dumps({"s": seq}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor_sync(cursor_str):
+    """Posição no registro de alterações; None se o cursor estiver malformado."""
+    try:
+        padding = '=' * (-len(cursor_str) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor_str + padding).decode('utf-8'))
+        if not isinstance(dados, dict) or not isinstance(dados.get('s'), int) or dados['s'] < 0:
+            return None
+        return dados['s']
+    except (ValueError, TypeError):
+        return None
+
+def _em_blocos(valores):
+    valores = list(valores)
+    for inicio in range(0, len(valores), Config.ASSOCIACAO_TAMANHO_LOTE):
+        yield valores[inicio:inicio + Config.ASSOCIACAO_TAMANHO_LOTE]
+
+def _par(id_entidade):
+    livro_id, categoria_id = id_entidade.split(':')
+    return int(livro_id), int(categoria_id)
+
+def estado_atual(cursor, current_user_id, salvos):
+    """Linhas atuais dos registros alterados. Um registro que sumiu depois da alteração fica de fora:
+    a lápide dele vem numa página seguinte."""
+    livros, categorias, associacoes = [], [], []
+    for bloco in _em_blocos(int(i) for i in salvos[LIVRO]):
+        cursor.execute(
+            f"SELECT * FROM livros WHERE id_usuario = %s AND id IN ({', '.join(['%s'] * len(bloco))})",
+            (current_user_id, *bloco)
+        )
+        colunas = cursor.column_names
+        livros.extend(dict(zip(colunas, linha)) for linha in cursor.fetchall())
+    for bloco in _em_blocos(int(i) for i in salvos[CATEGORIA]):
+        cursor.execute(
+            f"SELECT id, nome, descricao FROM categorias WHERE id_usuario = %s AND id IN ({', '.join(['%s'] * len(bloco))})",
+            (current_user_id, *bloco)
+        )
+        categorias.extend({"id": id_, "nome": nome, "descricao": descricao} for id_, nome, descricao in cursor.fetchall())
+    for bloco in _em_blocos(_par(i) for i in salvos[ASSOCIACAO]):
+        cursor.execute(
+            f"SELECT id_livro, id_categoria FROM livro_categoria "
+            f"WHERE (id_livro, id_categoria) IN ({', '.join(['(%s, %s)'] * len(bloco))})",
+            tuple(v for par in bloco for v in par)
+        )
+        associacoes.extend({"livro": livro_id, "categoria": categoria_id} for livro_id, categoria_id in cursor.fetchall())
+    return livros, categorias, associacoes
+
+# --- Sincronização incremental (PROTEGIDA) ---
+@sync_bp.route('/sync', methods=['GET'])
+@token_required
+def sincronizar(current_user_id):
+    """Sem ?desde= devolve o catálogo inteiro (em páginas); com o proximo_cursor da resposta
+    anterior, só o que foi inserido, alterado ou excluído desde então."""
+    desde = 0
+    cursor_str = request.args.get('desde')
+    if cursor_str:
+        desde = decodificar_cursor_sync(cursor_str)
+        if desde is None:
+            return jsonify({"status": "erro", "mensagem": "Cursor inválido."}), 400
+    limite = request.args.get('limite', type=int) or Config.SYNC_LIMITE_PADRAO
+    limite = max(1, min(limite, Config.SYNC_LIMITE_MAXIMO))
+
+    conn = get_db_connection(leitura=True, id_usuario=current_user_id)
+    if conn:
+        cursor = conn.cursor()
+        try:
+            # Todas as leituras abaixo na mesma transação: registro e linhas atuais do mesmo instante
+            if desde and desde < ler_horizonte(cursor, current_user_id):
+                return jsonify({
+                    "status": "erro", "recarregar": True,
+                    "mensagem": "Cursor anterior à compactação do registro de alterações. Sincronize de novo sem 'desde'."
+                }), 410
+
+            alteracoes, ultima_seq, tem_mais = ler_alteracoes(cursor, current_user_id, desde, limite)
+            salvos = {LIVRO: [], CATEGORIA: [], ASSOCIACAO: []}
+            excluidos = {LIVRO: [], CATEGORIA: [], ASSOCIACAO: []}
+            for entidade, id_entidade, operacao in alteracoes:
+                if entidade in salvos:
+                    (excluidos if operacao == EXCLUIR else salvos)[entidade].append(id_entidade)
+
+            livros, categorias, associacoes = estado_atual(cursor, current_user_id, salvos)
+            return jsonify({
+                "status": "sucesso",
+                "livros": livros,
+                "categorias": categorias,
+                "associacoes": associacoes,
+                "excluidos": {
+                    "livros": [int(i) for i in excluidos[LIVRO]],
+                    "categorias": [int(i) for i in excluidos[CATEGORIA]],
+                    "associacoes": [dict(zip(("livro", "categoria"), _par(i))) for i in excluidos[ASSOCIACAO]],
+                },
+                "proximo_cursor": codificar_cursor_sync(ultima_seq),
+                "tem_mais": tem_mais
+            })
+        except mysql.connector.Error as err:
+            print(f"Erro ao sincronizar: {err}")
+            return jsonify({"status": "erro", "mensagem": f"Erro interno ao sincronizar: {err}"}), 500
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        return jsonify({"status": "erro", "mensagem": "Falha ao conectar ao banco de dados para sincronizar."}), 500
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Rode da raiz do projeto: python -m pytest -q
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,126 @@
+# tests/test_cache_respostas.py
+# Cache de respostas com o backend Redis, usando um substituto em memória do cliente.
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+
+from config import Config
+from utils import cache_utils, versao_utils
+from utils.cache_utils import CacheRedis, com_cache_respostas, invalidar_respostas
+
+
+class RedisFalso:
+    """Só os comandos usados por CacheRedis: GET, SET com EX, INCR."""
+
+    def __init__(self):
+        self.dados = {} # chave -> (valor, expira_em)
+
+    def get(self, chave):
+        item = self.dados.get(chave)
+        if item is None or (item[1] is not None and item[1] <= time.time()):
+            return None
+        return item[0]
+
+    def set(self, chave, valor, ex=None):
+        self.dados[chave] = (valor, time.time() + ex if ex else None)
+
+    def incr(self, chave):
+        valor = int(self.get(chave) or 0) + 1
+        self.dados[chave] = (str(valor).encode('ascii'), None)
+        return valor
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = CacheRedis(RedisFalso(), 'teste:', max_item_bytes=1024)
+    monkeypatch.setattr(Config, 'CACHE_RESPOSTAS_ATIVO', True)
+    monkeypatch.setattr(cache_utils, '_backend', backend)
+    monkeypatch.setattr(versao_utils, '_versoes', versao_utils.VersoesMemoria())
+    return backend
+
+
+@pytest.fixture
+def app(backend):
+    app = Flask(__name__)
+    chamadas = []
+
+    # Faz o papel de @token_required: o usuário vem de um cabeçalho
+    @com_cache_respostas
+    def listar_cacheado(current_user_id):
+        chamadas.append(current_user_id)
+        return jsonify({"status": "sucesso", "usuario": current_user_id, "chamada": len(chamadas)})
+
+    @app.route('/livros')
+    def listar():
+        return listar_cacheado(request.headers['X-Usuario'])
+
+    app.chamadas = chamadas
+    return app
+
+
+def test_segunda_leitura_vem_do_redis(app, backend):
+    cliente = app.test_client()
+    primeira = cliente.get('/livros?genero=Romance', headers={'X-Usuario': 'u1'})
+    segunda = cliente.get('/livros?genero=Romance', headers={'X-Usuario': 'u1'})
+
+    assert app.chamadas == ['u1']
+    assert primeira.get_json() == segunda.get_json()
+    assert backend.metricas.acertos == 1
+    assert backend.metricas.gravacoes == 1
+
+
+def test_parametros_equivalentes_usam_a_mesma_chave(app):
+    cliente = app.test_client()
+    cliente.get('/livros?ordem=asc&genero=Romance', headers={'X-Usuario': 'u1'})
+    cliente.get('/livros?genero=Romance', headers={'X-Usuario': 'u1'})
+
+    assert app.chamadas == ['u1']
+
+
+def test_busca_por_relevancia_e_por_titulo_tem_chaves_diferentes(app):
+    cliente = app.test_client()
+    por_relevancia = cliente.get('/livros?busca=machado', headers={'X-Usuario': 'u1'})
+    por_titulo = cliente.get('/livros?busca=machado&ordenar_por=titulo', headers={'X-Usuario': 'u1'})
+    cliente.get('/livros?busca=machado&ordenar_por=relevancia', headers={'X-Usuario': 'u1'})
+
+    # Com ?busca= a ordem padrão é a relevância: só o pedido explícito por título é outra consulta
+    assert app.chamadas == ['u1', 'u1']
+    assert por_relevancia.get_json()['chamada'] == 1
+    assert por_titulo.get_json()['chamada'] == 2
+
+
+def test_sem_busca_titulo_e_a_ordem_padrao(app):
+    cliente = app.test_client()
+    cliente.get('/livros', headers={'X-Usuario': 'u1'})
+    cliente.get('/livros?ordenar_por=titulo&ordem=asc', headers={'X-Usuario': 'u1'})
+
+    assert app.chamadas == ['u1']
+
+
+def test_invalidacao_vale_so_para_o_usuario(app):
+    cliente = app.test_client()
+    cliente.get('/livros', headers={'X-Usuario': 'u1'})
+    cliente.get('/livros', headers={'X-Usuario': 'u2'})
+
+    invalidar_respostas('u1')
+    cliente.get('/livros', headers={'X-Usuario': 'u1'})
+    cliente.get('/livros', headers={'X-Usuario': 'u2'})
+
+    assert app.chamadas == ['u1', 'u2', 'u1']
+
+
+def test_nova_versao_do_catalogo_nao_serve_resposta_antiga(app):
+    cliente = app.test_client()
+    cliente.get('/livros', headers={'X-Usuario': 'u1'})
+    versao_utils.incrementar_versao('u1')
+    resposta = cliente.get('/livros', headers={'X-Usuario': 'u1'})
+
+    assert resposta.get_json()['chamada'] == 2
+
+
+def test_item_maior_que_o_limite_nao_e_gravado(backend):
+    assert backend.definir('u1', 'grande', b'x' * 2048, 60) is False
+    assert backend.definir('u1', 'pequeno', b'x' * 10, 60) is True
+    assert backend.obter('grande') is None
+    assert backend.obter('pequeno') == b'x' * 10
@@ -0,0 +1,156 @@
+# tests/test_google_books.py
+# Cache de ISBN em dois níveis contra um servidor HTTP local no lugar da Google Books API.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+from config import Config
+from utils import google_books as gb
+
+ISBN_13 = '9780306406157'
+ISBN_10 = '0306406152' # O mesmo livro
+ISBN_INEXISTENTE = '9781861972712'
+ISBN_LENTO = '9780141439518'
+
+VOLUMES = {
+    ISBN_13: {'title': 'Livro de Teste', 'authors': ['Autora Um', 'Autor Dois'], 'publisher': 'Editora',
+              'publishedDate': '1999-05-01', 'pageCount': 321, 'language': 'pt-BR'},
+    ISBN_LENTO: {'title': 'Livro Lento'},
+}
+
+
+class ApiFalsa(BaseHTTPRequestHandler):
+    """Responde como GET /books/v1/volumes?q=isbn:<isbn> e conta as consultas por ISBN."""
+    consultas = {}
+    atraso = 0.0
+
+    def do_GET(self):
+        isbn = parse_qs(urlparse(self.path).query).get('q', [''])[0].removeprefix('isbn:')
+        ApiFalsa.consultas[isbn] = ApiFalsa.consultas.get(isbn, 0) + 1
+        if isbn == ISBN_LENTO:
+            time.sleep(ApiFalsa.atraso)
+        volume = VOLUMES.get(isbn)
+        corpo = {'totalItems': 1, 'items': [{'volumeInfo': volume}]} if volume else {'totalItems': 0}
+        dados = json.dumps(corpo).encode('utf-8')
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # O cliente desistiu (teste de timeout)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ApiFalsa)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    ApiFalsa.consultas = {}
+    ApiFalsa.atraso = 0.0
+
+    monkeypatch.setattr(Config, 'GOOGLE_BOOKS_API_URL', f'http://127.0.0.1:{servidor.server_port}/books/v1/volumes')
+    monkeypatch.setattr(Config, 'ISBN_CACHE_ARQUIVO', str(tmp_path / 'cache_isbn.sqlite3'))
+    monkeypatch.setattr(Config, 'ISBN_CACHE_TTL', 3600)
+    monkeypatch.setattr(Config, 'ISBN_CACHE_TTL_NAO_ENCONTRADO', 60)
+    # Estado do módulo zerado a cada teste
+    monkeypatch.setattr(gb, 'metricas', gb.MetricasGoogleBooks())
+    monkeypatch.setattr(gb, '_cache_memoria', gb.CacheLRU(100))
+    monkeypatch.setattr(gb, '_cache_disco', None)
+    monkeypatch.setattr(gb, 'limitador', gb.LimitadorTaxa(0, 1))
+    monkeypatch.setattr(gb, 'disjuntor', gb.Disjuntor(5, 30))
+    yield ApiFalsa
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_isbn10_e_isbn13_usam_a_mesma_entrada(api):
+    por_13 = gb.buscar_dados_livro(ISBN_13)
+    por_10 = gb.buscar_dados_livro(ISBN_10)
+
+    assert api.consultas == {ISBN_13: 1}
+    assert por_13['titulo'] == por_10['titulo'] == 'Livro de Teste'
+    assert por_13['autores'] == 'Autora Um, Autor Dois'
+    # Cada resposta traz o ISBN como o usuário digitou
+    assert por_13['isbn'] == ISBN_13
+    assert por_10['isbn'] == ISBN_10
+    assert gb.metricas.acertos_memoria == 1
+
+
+def test_nao_encontrado_fica_em_cache_com_ttl_proprio(api):
+    assert gb.buscar_dados_livro(ISBN_INEXISTENTE) is None
+    assert gb.buscar_dados_livro(ISBN_INEXISTENTE) is None
+    gb.buscar_dados_livro(ISBN_13)
+
+    assert api.consultas == {ISBN_INEXISTENTE: 1, ISBN_13: 1}
+    assert gb.metricas.nao_encontrados == 2
+
+    _, restante_negativo = gb.get_cache_disco().obter(ISBN_INEXISTENTE)
+    _, restante_positivo = gb.get_cache_disco().obter(ISBN_13)
+    assert 0 < restante_negativo <= Config.ISBN_CACHE_TTL_NAO_ENCONTRADO
+    assert Config.ISBN_CACHE_TTL_NAO_ENCONTRADO < restante_positivo <= Config.ISBN_CACHE_TTL
+
+
+def test_nao_encontrado_expira_e_volta_a_consultar(api, monkeypatch):
+    assert gb.buscar_dados_livro(ISBN_INEXISTENTE) is None
+    relogio = time.time() + Config.ISBN_CACHE_TTL_NAO_ENCONTRADO + 1
+    monkeypatch.setattr(gb.time, 'time', lambda: relogio)
+
+    assert gb.buscar_dados_livro(ISBN_INEXISTENTE) is None
+    assert api.consultas == {ISBN_INEXISTENTE: 2}
+
+
+def test_cache_em_disco_sobrevive_a_limpeza_da_memoria(api, monkeypatch):
+    gb.buscar_dados_livro(ISBN_13)
+    # Novo processo/reinício: memória vazia, mesmo arquivo SQLite
+    monkeypatch.setattr(gb, '_cache_memoria', gb.CacheLRU(100))
+    monkeypatch.setattr(gb, '_cache_disco', None)
+
+    previa = gb.buscar_dados_livro(ISBN_10)
+
+    assert api.consultas == {ISBN_13: 1}
+    assert previa['titulo'] == 'Livro de Teste'
+    assert gb.metricas.acertos_disco == 1
+    # O acerto em disco repovoa a memória
+    gb.buscar_dados_livro(ISBN_13)
+    assert gb.metricas.acertos_memoria == 1
+
+
+def test_timeout_propaga_erro_e_nao_guarda_nada(api, monkeypatch):
+    monkeypatch.setattr(Config, 'GOOGLE_BOOKS_TIMEOUT_LEITURA', 0.2)
+    api.atraso = 1.0
+
+    with pytest.raises(requests.exceptions.Timeout):
+        gb.buscar_dados_livro(ISBN_LENTO)
+
+    assert gb.metricas.erros == 1
+    assert gb.disjuntor.estado()['falhas_seguidas'] == 1
+    assert gb.ler_cache(ISBN_LENTO) is None
+
+    # Serviço normalizado: a próxima consulta vai à API e fecha a contagem do disjuntor
+    api.atraso = 0.0
+    assert gb.buscar_dados_livro(ISBN_LENTO)['titulo'] == 'Livro Lento'
+    assert api.consultas[ISBN_LENTO] == 2
+    assert gb.disjuntor.estado()['falhas_seguidas'] == 0
+
+
+def test_prazo_total_vale_mesmo_com_timeout_de_leitura_maior(api, monkeypatch):
+    monkeypatch.setattr(Config, 'GOOGLE_BOOKS_TIMEOUT_LEITURA', 10)
+    monkeypatch.setattr(Config, 'GOOGLE_BOOKS_PRAZO', 0.3)
+    api.atraso = 2.0
+
+    inicio = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        gb.buscar_dados_livro(ISBN_LENTO)
+
+    assert time.monotonic() - inicio < 1.5
+    assert gb.metricas.erros == 1
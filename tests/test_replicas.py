@@ -0,0 +1,96 @@
+# tests/test_replicas.py
+# Roteamento de get_db_connection entre primário e réplica, com pools falsos (sem MySQL).
+import os
+
+import mysql.connector
+import pytest
+
+from config import Config
+from utils import db_utils, versao_utils
+from utils.db_utils import Replica, get_db_connection
+
+
+class PoolFalso:
+    def __init__(self, nome, erro=None):
+        self.nome = nome
+        self.erro = erro
+        self.emprestimos = 0
+
+    def obter(self):
+        if self.erro is not None:
+            raise self.erro
+        self.emprestimos += 1
+        return self.nome
+
+    def metricas(self):
+        return {"emprestimos": self.emprestimos}
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primario = PoolFalso('primario')
+    replica = Replica('replica-1:3306', PoolFalso('replica'))
+    replica.atraso_medido = 0
+    replica._medir = lambda: replica.atraso_medido # Em vez de SHOW REPLICA STATUS
+    monkeypatch.setattr(Config, 'DB_REPLICA_ATRASO_MAXIMO', 30)
+    monkeypatch.setattr(Config, 'DB_REPLICA_VERIFICAR_INTERVALO', 0) # Mede a cada leitura
+    monkeypatch.setattr(Config, 'DB_PRIMARIO_APOS_ESCRITA', 5)
+    monkeypatch.setattr(db_utils, '_pool', primario)
+    monkeypatch.setattr(db_utils, '_pool_pid', os.getpid())
+    monkeypatch.setattr(db_utils, '_replicas', [replica])
+    monkeypatch.setattr(db_utils, '_replicas_pid', os.getpid())
+    monkeypatch.setattr(versao_utils, '_versoes', versao_utils.VersoesMemoria())
+    return primario, replica
+
+
+def test_leitura_vai_para_a_replica(pools):
+    assert get_db_connection(leitura=True, id_usuario='u1') == 'replica'
+    assert get_db_connection(leitura=True) == 'replica'
+
+
+def test_escrita_vai_para_o_primario(pools):
+    assert get_db_connection() == 'primario'
+
+
+def test_quem_acabou_de_escrever_le_do_primario(pools):
+    versao_utils.incrementar_versao('u1')
+
+    assert get_db_connection(leitura=True, id_usuario='u1') == 'primario'
+    # Os outros usuários continuam na réplica
+    assert get_db_connection(leitura=True, id_usuario='u2') == 'replica'
+
+
+def test_escrita_antiga_volta_para_a_replica(pools, monkeypatch):
+    versao_utils.incrementar_versao('u1')
+    relogio = db_utils.time.time() + Config.DB_PRIMARIO_APOS_ESCRITA + 1
+    monkeypatch.setattr(db_utils.time, 'time', lambda: relogio)
+
+    assert get_db_connection(leitura=True, id_usuario='u1') == 'replica'
+
+
+def test_atraso_da_replica_estende_a_janela_do_primario(pools, monkeypatch):
+    _, replica = pools
+    replica.atraso_medido = 20
+    versao_utils.incrementar_versao('u1')
+    relogio = db_utils.time.time() + Config.DB_PRIMARIO_APOS_ESCRITA + 1
+    monkeypatch.setattr(db_utils.time, 'time', lambda: relogio)
+
+    assert get_db_connection(leitura=True, id_usuario='u1') == 'primario'
+
+
+def test_replica_atrasada_demais_sai_de_rotacao(pools):
+    _, replica = pools
+    replica.atraso_medido = Config.DB_REPLICA_ATRASO_MAXIMO + 1
+
+    assert get_db_connection(leitura=True, id_usuario='u1') == 'primario'
+    assert replica.metricas()['saudavel'] is False
+
+
+def test_falha_na_replica_cai_para_o_primario(pools):
+    primario, replica = pools
+    replica.pool.erro = mysql.connector.errors.InterfaceError("conexão recusada")
+
+    assert get_db_connection(leitura=True, id_usuario='u1') == 'primario'
+    assert primario.emprestimos == 1
+    assert replica.saudavel is False
+    assert "conexão recusada" in replica.erro
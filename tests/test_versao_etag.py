@@ -0,0 +1,49 @@
+# tests/test_versao_etag.py
+# ETag/304 de @com_etag, inclusive das variantes comprimidas.
+import pytest
+from flask import Flask, jsonify, request
+
+from config import Config
+from utils import versao_utils
+from utils.versao_utils import com_etag
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(versao_utils, '_versoes', versao_utils.VersoesMemoria())
+    monkeypatch.setattr(Config, 'COMPRESSAO_MINIMO_BYTES', 100)
+    app = Flask(__name__)
+
+    # Faz o papel de @token_required: o usuário vem de um cabeçalho
+    @com_etag
+    def listar_com_etag(current_user_id):
+        return jsonify({"status": "sucesso", "livros": [{"titulo": f"Livro {i}"} for i in range(50)]})
+
+    @app.route('/livros')
+    def listar():
+        return listar_com_etag(request.headers['X-Usuario'])
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize('codificacao', ['gzip', 'identity'])
+def test_304_devolve_a_etag_que_correspondeu(cliente, codificacao):
+    primeira = cliente.get('/livros', headers={'X-Usuario': 'u1', 'Accept-Encoding': codificacao})
+    etag = primeira.headers['ETag']
+    assert primeira.status_code == 200
+    assert etag.endswith('-gzip"') == (codificacao == 'gzip')
+
+    segunda = cliente.get('/livros', headers={'X-Usuario': 'u1', 'Accept-Encoding': codificacao, 'If-None-Match': etag})
+
+    assert segunda.status_code == 304
+    assert segunda.headers['ETag'] == etag
+
+
+def test_escrita_muda_a_etag(cliente):
+    etag = cliente.get('/livros', headers={'X-Usuario': 'u1'}).headers['ETag']
+    versao_utils.incrementar_versao('u1')
+
+    resposta = cliente.get('/livros', headers={'X-Usuario': 'u1', 'If-None-Match': etag})
+
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
@@ -0,0 +1,149 @@
+# utils/alteracoes_utils.py
+# Registro de alterações por usuário, lido por GET /sync para o cliente baixar só o que mudou.
+# Cada escrita em livros, categorias ou livro_categoria grava (seq, entidade, id, operacao) na mesma
+# transação. seq é uma sequência por usuário em alteracoes_sequencia: a linha do usuário fica travada
+# até o commit, então as alterações de um usuário ficam visíveis sempre na ordem de seq e um cursor
+# nunca pula uma transação que confirmou depois dele.
+# As tabelas são criadas pela migração 006 (python manage.py migrar).
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+SALVAR = 'salvar'   # Inserido ou alterado: o cliente busca o estado atual
+EXCLUIR = 'excluir' # Lápide: o cliente apaga o registro local
+
+LIVRO = 'livro'
+CATEGORIA = 'categoria'
+ASSOCIACAO = 'livro_categoria'
+
+SQL_CRIAR_TABELAS = [
+    """
+    CREATE TABLE IF NOT EXISTS alteracoes (
+        id_usuario VARCHAR(36) NOT NULL,
+        seq BIGINT NOT NULL,
+        entidade VARCHAR(20) NOT NULL,
+        id_entidade VARCHAR(64) NOT NULL,
+        operacao VARCHAR(10) NOT NULL,
+        alterado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id_usuario, seq),
+        KEY idx_alteracoes_entidade (id_usuario, entidade, id_entidade, seq)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS alteracoes_sequencia (
+        id_usuario VARCHAR(36) NOT NULL PRIMARY KEY,
+        ultima BIGINT NOT NULL DEFAULT 0,
+        horizonte BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+def chave_associacao(livro_id, categoria_id):
+    return f"{livro_id}:{categoria_id}"
+
+def registrar_alteracoes(conn, id_usuario, entidade, ids, operacao=SALVAR):
+    """Grava as alterações na transação de quem chamou. Chame logo antes do commit: a trava da
+    sequência do usuário deve ser a última adquirida, para não formar ciclo com outras travas."""
+    ids = [str(i) for i in ids]
+    if not ids:
+        return
+    cursor = conn.cursor() # Cursor próprio: não altera o rowcount do cursor da rota
+    try:
+        cursor.execute(
+            "INSERT INTO alteracoes_sequencia (id_usuario, ultima) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE ultima = ultima + VALUES(ultima)",
+            (id_usuario, len(ids))
+        )
+        cursor.execute("SELECT ultima FROM alteracoes_sequencia WHERE id_usuario = %s", (id_usuario,))
+        primeira = cursor.fetchone()[0] - len(ids) + 1
+        cursor.executemany(
+            "INSERT INTO alteracoes (id_usuario, seq, entidade, id_entidade, operacao) VALUES (%s, %s, %s, %s, %s)",
+            [(id_usuario, primeira + i, entidade, id_entidade, operacao) for i, id_entidade in enumerate(ids)]
+        )
+    finally:
+        cursor.close()
+
+def ler_alteracoes(cursor, id_usuario, desde, limite):
+    """Até `limite` alterações depois de `desde`, só a mais recente de cada registro.
+    Retorna (alteracoes, ultima_seq, tem_mais); alteracoes é [(entidade, id_entidade, operacao)]."""
+    cursor.execute(
+        "SELECT seq, entidade, id_entidade, operacao FROM alteracoes "
+        "WHERE id_usuario = %s AND seq > %s ORDER BY seq LIMIT %s",
+        (id_usuario, desde, limite + 1)
+    )
+    linhas = cursor.fetchall()
+    tem_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    ultimas = {}
+    for _, entidade, id_entidade, operacao in linhas:
+        ultimas.pop((entidade, id_entidade), None) # Reinsere para manter a ordem da última alteração
+        ultimas[(entidade, id_entidade)] = operacao
+    ultima_seq = linhas[-1][0] if linhas else desde
+    return [(entidade, id_entidade, operacao) for (entidade, id_entidade), operacao in ultimas.items()], ultima_seq, tem_mais
+
+def ler_horizonte(cursor, id_usuario):
+    """Maior seq já compactado: cursores anteriores a ele perderam lápides e precisam recomeçar."""
+    cursor.execute("SELECT horizonte FROM alteracoes_sequencia WHERE id_usuario = %s", (id_usuario,))
+    linha = cursor.fetchone()
+    return linha[0] if linha else 0
+
+# --- Compactação ---
+
+def compactar_alteracoes(conn, retencao_dias):
+    """Remove as alterações substituídas por outra mais nova do mesmo registro e as lápides mais
+    antigas que `retencao_dias`. Retorna (substituidas, lapides) removidas."""
+    cursor = conn.cursor()
+    try:
+        # Seguro para qualquer cursor: a alteração mais nova do registro continua depois dele
+        cursor.execute(
+            "DELETE a FROM alteracoes a JOIN alteracoes b "
+            "ON b.id_usuario = a.id_usuario AND b.entidade = a.entidade "
+            "AND b.id_entidade = a.id_entidade AND b.seq > a.seq"
+        )
+        substituidas = cursor.rowcount
+        limite = datetime.now() - timedelta(days=retencao_dias)
+        cursor.execute(
+            "INSERT INTO alteracoes_sequencia (id_usuario, horizonte) "
+            "SELECT id_usuario, MAX(seq) FROM alteracoes WHERE operacao = %s AND alterado_em < %s GROUP BY id_usuario "
+            "ON DUPLICATE KEY UPDATE horizonte = GREATEST(horizonte, VALUES(horizonte))",
+            (EXCLUIR, limite)
+        )
+        cursor.execute("DELETE FROM alteracoes WHERE operacao = %s AND alterado_em < %s", (EXCLUIR, limite))
+        lapides = cursor.rowcount
+        conn.commit()
+        return substituidas, lapides
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# --- Carga inicial a partir das tabelas existentes ---
+
+def preencher_alteracoes(conn):
+    """Uma alteração 'salvar' para cada categoria, livro e associação já cadastrados, para que
+    GET /sync sem cursor devolva o catálogo inteiro."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO alteracoes (id_usuario, seq, entidade, id_entidade, operacao) "
+            "SELECT id_usuario, ROW_NUMBER() OVER (PARTITION BY id_usuario ORDER BY ordem, n1, n2), "
+            "entidade, id_entidade, %s FROM ("
+            "  SELECT id_usuario, 1 AS ordem, id AS n1, 0 AS n2, %s AS entidade, CAST(id AS CHAR) AS id_entidade FROM categorias"
+            "  UNION ALL SELECT id_usuario, 2, id, 0, %s, CAST(id AS CHAR) FROM livros"
+            "  UNION ALL SELECT l.id_usuario, 3, lc.id_livro, lc.id_categoria, %s, CONCAT(lc.id_livro, ':', lc.id_categoria)"
+            "  FROM livro_categoria lc JOIN livros l ON l.id = lc.id_livro"
+            ") t",
+            (SALVAR, CATEGORIA, LIVRO, ASSOCIACAO)
+        )
+        cursor.execute(
+            "INSERT INTO alteracoes_sequencia (id_usuario, ultima) "
+            "SELECT id_usuario, MAX(seq) FROM alteracoes GROUP BY id_usuario "
+            "ON DUPLICATE KEY UPDATE ultima = GREATEST(ultima, VALUES(ultima))"
+        )
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
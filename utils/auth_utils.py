@@ -1,26 +1,238 @@
 # utils/auth_utils.py
 from flask import request, jsonify, current_app
 import jwt
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps # Importa wraps para manter metadados da função original
 
+from config import Config
+from utils.cache_utils import cliente_redis
+
+class CacheTokens:
+    """LRU de tokens já verificados: digest -> (user_id, exp, iat).
+    Evita refazer jwt.decode a cada requisição de um mesmo cliente."""
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, digest):
+        with self._lock:
+            entrada = self._dados.get(digest)
+            if entrada is not None:
+                self._dados.move_to_end(digest)
+            return entrada
+
+    def definir(self, digest, entrada):
+        if self.capacidade <= 0:
+            return # Cache desligado
+        with self._lock:
+            self._dados[digest] = entrada
+            self._dados.move_to_end(digest)
+            while len(self._dados) > self.capacidade:
+                self._dados.popitem(last=False)
+
+    def remover(self, digest):
+        with self._lock:
+            self._dados.pop(digest, None)
+
+    def remover_usuario(self, user_id):
+        with self._lock:
+            for digest in [d for d, entrada in self._dados.items() if entrada[0] == user_id]:
+                del self._dados[digest]
+
+
+class RevogacoesMemoria:
+    """Revogações só deste processo. Serve para desenvolvimento com um único worker."""
+
+    def __init__(self):
+        self._tokens = {} # digest -> exp; só precisa durar até o token expirar sozinho
+        self._cortes = {} # user_id -> segundo a partir do qual tokens antigos deixam de valer
+        self._lock = threading.Lock()
+
+    def revogar(self, digest, exp):
+        with self._lock:
+            agora = time.time()
+            for d in [d for d, e in self._tokens.items() if e <= agora]:
+                del self._tokens[d]
+            self._tokens[digest] = exp
+
+    def definir_corte(self, user_id, corte):
+        with self._lock:
+            self._cortes[user_id] = max(corte, self._cortes.get(user_id, corte))
+
+    def revogado(self, digest):
+        with self._lock:
+            return digest in self._tokens
+
+    def corte(self, user_id):
+        with self._lock:
+            return self._cortes.get(user_id)
+
+
+class RevogacoesSQLite:
+    """Revogações num arquivo SQLite local, compartilhadas por todos os workers da máquina
+    (mesmo esquema de conexões de utils/versao_utils.VersoesSQLite)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conn = self._conexao()
+        conn.execute("CREATE TABLE IF NOT EXISTS tokens_revogados (digest TEXT PRIMARY KEY, exp REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cortes_usuario (user_id TEXT PRIMARY KEY, corte INTEGER NOT NULL)")
+        conn.commit()
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def revogar(self, digest, exp):
+        conn = self._conexao()
+        conn.execute("DELETE FROM tokens_revogados WHERE exp <= ?", (time.time(),))
+        conn.execute("INSERT OR REPLACE INTO tokens_revogados (digest, exp) VALUES (?, ?)", (digest, exp))
+        conn.commit()
+
+    def definir_corte(self, user_id, corte):
+        conn = self._conexao()
+        conn.execute(
+            "INSERT INTO cortes_usuario (user_id, corte) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET corte = MAX(corte, excluded.corte)",
+            (user_id, corte)
+        )
+        conn.commit()
+
+    def revogado(self, digest):
+        return self._conexao().execute(
+            "SELECT 1 FROM tokens_revogados WHERE digest = ?", (digest,)
+        ).fetchone() is not None
+
+    def corte(self, user_id):
+        linha = self._conexao().execute("SELECT corte FROM cortes_usuario WHERE user_id = ?", (user_id,)).fetchone()
+        return linha[0] if linha else None
+
+
+class RevogacoesRedis:
+    """Revogações num Redis, compartilhadas por todas as máquinas. As chaves expiram sozinhas."""
+
+    def __init__(self, cliente, prefixo):
+        self.cliente = cliente
+        self.prefixo = prefixo
+
+    def revogar(self, digest, exp):
+        self.cliente.set(f"{self.prefixo}revogado:{digest}", 1, ex=max(1, int(exp - time.time()) + 1))
+
+    def definir_corte(self, user_id, corte):
+        # Tokens emitidos antes do corte expiram em até TOKEN_EXPIRATION_HOURS; depois disso o corte é inútil
+        self.cliente.set(f"{self.prefixo}corte:{user_id}", corte, ex=Config.TOKEN_EXPIRATION_HOURS * 3600)
+
+    def revogado(self, digest):
+        return bool(self.cliente.exists(f"{self.prefixo}revogado:{digest}"))
+
+    def corte(self, user_id):
+        corte = self.cliente.get(f"{self.prefixo}corte:{user_id}")
+        return int(corte) if corte is not None else None
+
+
+_cache_tokens = CacheTokens(Config.TOKEN_CACHE_TAMANHO)
+_revogacoes = None
+_revogacoes_lock = threading.Lock()
+
+def get_revogacoes():
+    global _revogacoes
+    if _revogacoes is None:
+        with _revogacoes_lock:
+            if _revogacoes is None:
+                _revogacoes = criar_revogacoes()
+    return _revogacoes
+
+def criar_revogacoes():
+    if Config.ESTADO_REDIS_URL:
+        return RevogacoesRedis(cliente_redis(Config.ESTADO_REDIS_URL, "ESTADO_REDIS_URL"), Config.ESTADO_REDIS_PREFIXO)
+    if Config.REVOGACOES_ARQUIVO:
+        return RevogacoesSQLite(Config.REVOGACOES_ARQUIVO)
+    return RevogacoesMemoria()
+
+def digest_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def token_da_requisicao():
+    """Extrai o token do cabeçalho 'Authorization: Bearer <token>'."""
+    partes = request.headers.get('Authorization', '').split(" ")
+    return partes[1] if len(partes) > 1 else None
+
+def revogar_token(token):
+    """Invalida um token (logout). Tokens inválidos ou expirados não precisam ser guardados."""
+    try:
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return
+    digest = digest_token(token)
+    get_revogacoes().revogar(digest, data.get('exp', time.time() + Config.TOKEN_EXPIRATION_HOURS * 3600))
+    _cache_tokens.remover(digest)
+
+def revogar_tokens_usuario(user_id):
+    """Invalida todos os tokens emitidos antes do segundo atual para o usuário (ex.: token comprometido)."""
+    # 'iat' do JWT é em segundos inteiros: o corte também, comparado com '<'. Assim o token
+    # emitido logo depois do /logout/todos, no mesmo segundo, continua valendo
+    get_revogacoes().definir_corte(user_id, int(time.time()))
+    _cache_tokens.remover_usuario(user_id)
+
+def _revogado(digest, user_id, iat):
+    revogacoes = get_revogacoes()
+    if revogacoes.revogado(digest):
+        return True
+    corte = revogacoes.corte(user_id)
+    # Tokens sem 'iat' (emitidos antes desta versão) também caem no corte
+    return corte is not None and (iat is None or iat < corte)
+
 def token_required(f):
     @wraps(f) # Adicionado @wraps para preservar metadados da função original
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
+        token = token_da_requisicao()
 
         if not token:
             return jsonify({"status": "erro", "mensagem": "Token de autenticação ausente!"}), 401
 
-        try:
-            # Tenta decodificar o token usando a SECRET_KEY do app Flask
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user_id = data['user_id']
-        except jwt.ExpiredSignatureError:
-            return jsonify({"status": "erro", "mensagem": "Token de autenticação expirado!"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"status": "erro", "mensagem": "Token de autenticação inválido!"}), 401
+        digest = digest_token(token)
+        entrada = _cache_tokens.obter(digest)
+        if entrada is not None:
+            current_user_id, exp, iat = entrada
+            if exp is not None and exp <= time.time():
+                _cache_tokens.remover(digest)
+                return jsonify({"status": "erro", "mensagem": "Token de autenticação expirado!"}), 401
+        else:
+            try:
+                # Tenta decodificar o token usando a SECRET_KEY do app Flask
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+                current_user_id = data['user_id']
+            except jwt.ExpiredSignatureError:
+                return jsonify({"status": "erro", "mensagem": "Token de autenticação expirado!"}), 401
+            except (jwt.InvalidTokenError, KeyError):
+                return jsonify({"status": "erro", "mensagem": "Token de autenticação inválido!"}), 401
+
+            iat = data.get('iat')
+            # Nunca mantém no cache além do 'exp' nem além de TOKEN_EXPIRATION_HOURS
+            exp = min(data.get('exp', float('inf')), time.time() + Config.TOKEN_EXPIRATION_HOURS * 3600)
+            _cache_tokens.definir(digest, (current_user_id, exp, iat))
+
+        # Consultado a cada requisição, mesmo com o token em cache: a revogação pode ter
+        # sido feita em outro worker
+        if _revogado(digest, current_user_id, iat):
+            _cache_tokens.remover(digest)
+            return jsonify({"status": "erro", "mensagem": "Token de autenticação revogado!"}), 401
 
         return f(current_user_id, *args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
@@ -0,0 +1,81 @@
+# utils/busca_utils.py
+import re
+import threading
+import unicodedata
+
+from config import Config
+
+# Colunas pesquisadas pelo parâmetro ?busca= de GET /livros.
+# A ordem precisa ser idêntica à do índice FULLTEXT da migração 003, senão o MySQL não usa o índice.
+# Com a collation utf8mb4_0900_ai_ci (padrão do MySQL 8) a comparação já ignora acentos e
+# maiúsculas: "sao" encontra "São".
+COLUNAS_BUSCA = ['titulo', 'autores', 'editora', 'genero', 'notas_pessoais']
+INDICE_FULLTEXT = 'ft_livros_busca'
+
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191 # MATCH sem índice FULLTEXT correspondente
+
+_fulltext_disponivel = None # Verificado uma vez por processo (ver fulltext_disponivel)
+_lock = threading.Lock()
+
+# Caracteres com significado especial no BOOLEAN MODE do MySQL
+_OPERADORES_BOOLEANOS = re.compile(r'[+\-<>()~*"@]')
+
+def remover_acentos(texto):
+    """'Coração' -> 'Coracao'."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+def tokenizar(termo):
+    """Quebra o termo em palavras normalizadas (sem acento, minúsculas, sem operadores)."""
+    termo = _OPERADORES_BOOLEANOS.sub(' ', remover_acentos(termo).lower())
+    return [t for t in re.split(r'\W+', termo) if t]
+
+def montar_consulta_booleana(termo):
+    """Converte o texto do usuário em consulta BOOLEAN MODE: todas as palavras obrigatórias
+    e com busca por prefixo ('mach ass' -> '+mach* +ass*').
+    Retorna None quando nenhuma palavra atinge o tamanho mínimo indexado pelo InnoDB."""
+    tokens = [t for t in tokenizar(termo) if len(t) >= Config.BUSCA_TAMANHO_MINIMO_TOKEN]
+    if not tokens:
+        return None
+    return ' '.join(f'+{t}*' for t in tokens)
+
+def fulltext_disponivel(cursor):
+    """True se a migração 003 já criou o índice FULLTEXT. Consultado uma vez por processo:
+    sem o índice, MATCH falharia com o erro 1191 em toda busca."""
+    global _fulltext_disponivel
+    if _fulltext_disponivel is None:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'livros' AND INDEX_NAME = %s LIMIT 1",
+            (INDICE_FULLTEXT,)
+        )
+        encontrado = cursor.fetchone() is not None
+        with _lock:
+            _fulltext_disponivel = encontrado
+        if not encontrado:
+            print(f"Índice {INDICE_FULLTEXT} ausente (rode 'python manage.py migrar'): ?busca= usa LIKE.")
+    return _fulltext_disponivel
+
+def indice_fulltext_ausente(err):
+    """Para o except das rotas: se o índice sumiu depois da verificação, as próximas buscas
+    deste processo voltam ao LIKE."""
+    global _fulltext_disponivel
+    if getattr(err, 'errno', None) != ER_FT_MATCHING_KEY_NOT_FOUND:
+        return False
+    with _lock:
+        _fulltext_disponivel = False
+    return True
+
+def clausula_busca(termo, cursor, alias='l'):
+    """Retorna (condição WHERE, valores, expressão de relevância ou None) para o termo.
+    Usa o índice FULLTEXT quando possível; senão cai no LIKE antigo (título/autor)."""
+    consulta = None
+    if Config.BUSCA_FULLTEXT and fulltext_disponivel(cursor):
+        consulta = montar_consulta_booleana(termo)
+    if consulta is None:
+        condicao = f"({alias}.titulo LIKE %s OR {alias}.autores LIKE %s)"
+        return condicao, [f"%{termo}%", f"%{termo}%"], None
+
+    colunas = ', '.join(f"{alias}.{c}" for c in COLUNAS_BUSCA)
+    match = f"MATCH({colunas}) AGAINST (%s IN BOOLEAN MODE)"
+    return match, [consulta], match
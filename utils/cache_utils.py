@@ -0,0 +1,247 @@
+# utils/cache_utils.py
+# Cache do resultado das listagens (GET /livros) por usuário + parâmetros normalizados.
+# A chave inclui a versão do catálogo (utils/versao_utils.py), então qualquer escrita do
+# usuário torna as entradas antigas inalcançáveis em todos os workers que veem a mesma versão
+# (os da máquina, ou todos com ESTADO_REDIS_URL); além disso as rotas de escrita apagam as
+# entradas do usuário no backend.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+
+from config import Config
+
+try:
+    import redis # Opcional: só necessário com CACHE_RESPOSTAS_BACKEND=redis ou ESTADO_REDIS_URL
+except ImportError:
+    redis = None
+
+def cliente_redis(url, configuracao):
+    """Cliente Redis para a URL; `configuracao` é o nome da variável que o exigiu (mensagem de erro)."""
+    if redis is None:
+        raise RuntimeError(f"{configuracao} exige o pacote 'redis'.")
+    return redis.Redis.from_url(url)
+
+
+class MetricasCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.gravacoes = 0
+        self.invalidacoes = 0
+        self.bytes_gravados = 0
+
+    def incrementar(self, nome, quantidade=1):
+        with self._lock:
+            setattr(self, nome, getattr(self, nome) + quantidade)
+
+    def como_dict(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else None,
+                "gravacoes": self.gravacoes,
+                "invalidacoes": self.invalidacoes,
+                "bytes_gravados": self.bytes_gravados,
+            }
+
+
+class CacheLRUBytes:
+    """LRU em memória limitado pelo total de bytes armazenados."""
+
+    def __init__(self, max_bytes, max_item_bytes):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.metricas = MetricasCache()
+        self._dados = OrderedDict() # chave -> (id_usuario, corpo, expira_em)
+        self._por_usuario = {} # id_usuario -> set(chaves), para invalidar só o que é dele
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def geracao(self, id_usuario):
+        return 0 # A versão do catálogo na chave já separa as gerações
+
+    def _remover(self, chave):
+        id_usuario, corpo, _ = self._dados.pop(chave)
+        self._bytes -= len(corpo)
+        chaves = self._por_usuario.get(id_usuario)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._por_usuario[id_usuario]
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            if item[2] < time.time():
+                self._remover(chave)
+                return None
+            self._dados.move_to_end(chave)
+            return item[1]
+
+    def definir(self, id_usuario, chave, corpo, ttl):
+        if len(corpo) > self.max_item_bytes:
+            return False
+        with self._lock:
+            if chave in self._dados:
+                self._remover(chave)
+            self._dados[chave] = (id_usuario, corpo, time.time() + ttl)
+            self._por_usuario.setdefault(id_usuario, set()).add(chave)
+            self._bytes += len(corpo)
+            while self._bytes > self.max_bytes and self._dados:
+                self._remover(next(iter(self._dados)))
+        return True
+
+    def invalidar_usuario(self, id_usuario):
+        with self._lock:
+            for chave in list(self._por_usuario.get(id_usuario, ())):
+                self._remover(chave)
+
+    def uso(self):
+        with self._lock:
+            return {"backend": "memoria", "entradas": len(self._dados), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class CacheRedis:
+    """Backend para qualquer servidor compatível com Redis (GET/SET EX/INCR).
+    Recebe o cliente pronto, então os testes podem passar um substituto local."""
+
+    def __init__(self, cliente, prefixo, max_item_bytes):
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self.max_item_bytes = max_item_bytes
+        self.metricas = MetricasCache()
+
+    def geracao(self, id_usuario):
+        # Contador compartilhado por todas as máquinas: INCR nele invalida tudo do usuário
+        return int(self.cliente.get(f"{self.prefixo}geracao:{id_usuario}") or 0)
+
+    def obter(self, chave):
+        return self.cliente.get(f"{self.prefixo}{chave}")
+
+    def definir(self, id_usuario, chave, corpo, ttl):
+        if len(corpo) > self.max_item_bytes:
+            return False
+        self.cliente.set(f"{self.prefixo}{chave}", corpo, ex=int(ttl))
+        return True
+
+    def invalidar_usuario(self, id_usuario):
+        self.cliente.incr(f"{self.prefixo}geracao:{id_usuario}")
+
+    def uso(self):
+        dados = {"backend": "redis"}
+        try:
+            dados["bytes_servidor"] = self.cliente.info('memory').get('used_memory')
+        except Exception:
+            pass # Substitutos locais podem não implementar INFO
+        return dados
+
+
+_backend = None
+_lock = threading.Lock()
+
+def criar_backend():
+    if Config.CACHE_RESPOSTAS_BACKEND == 'redis':
+        cliente = cliente_redis(Config.CACHE_RESPOSTAS_REDIS_URL, "CACHE_RESPOSTAS_BACKEND=redis")
+        return CacheRedis(cliente, Config.CACHE_RESPOSTAS_PREFIXO, Config.CACHE_RESPOSTAS_MAX_ITEM_BYTES)
+    return CacheLRUBytes(Config.CACHE_RESPOSTAS_MAX_BYTES, Config.CACHE_RESPOSTAS_MAX_ITEM_BYTES)
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = criar_backend()
+    return _backend
+
+def definir_backend(backend):
+    """Troca o backend (ex.: um Redis de mentira nos testes)."""
+    global _backend
+    _backend = backend
+
+# Valores padrão de GET /livros: ?ordem=asc e nenhum ?ordem= geram a mesma chave.
+# A ordenação padrão depende de ?busca=: relevância com ela, título sem ela
+_PADROES = {'ordem': 'ASC'}
+
+def parametros_normalizados(args):
+    parametros = {}
+    for chave in sorted(args.keys()):
+        valores = [v.strip() for v in args.getlist(chave) if v.strip()]
+        if not valores:
+            continue
+        if chave == 'ordem':
+            valores = [v.upper() for v in valores]
+        if chave == 'campos':
+            valores = [",".join(sorted(c.strip() for c in ",".join(valores).split(",") if c.strip()))]
+        parametros[chave] = valores
+    for chave, padrao in _PADROES.items():
+        if parametros.get(chave) == [padrao]:
+            del parametros[chave]
+    # Chave pela ordenação resolvida, como em get_all_livros
+    if 'busca' in parametros:
+        parametros.setdefault('ordenar_por', ['relevancia'])
+    elif parametros.get('ordenar_por') == ['titulo']:
+        del parametros['ordenar_por']
+    return "&".join(f"{k}={v}" for k, valores in sorted(parametros.items()) for v in valores)
+
+def chave_resposta(backend, id_usuario):
+    from utils.versao_utils import versao_catalogo
+    versao, _ = versao_catalogo(id_usuario)
+    parametros = hashlib.sha1(parametros_normalizados(request.args).encode('utf-8')).hexdigest()
+    return f"resp:{id_usuario}:{versao}.{backend.geracao(id_usuario)}:{request.path}:{parametros}"
+
+def invalidar_respostas(id_usuario):
+    if not Config.CACHE_RESPOSTAS_ATIVO:
+        return
+    backend = get_backend()
+    try:
+        backend.invalidar_usuario(id_usuario)
+        backend.metricas.incrementar('invalidacoes')
+    except Exception as e:
+        # A versão do catálogo na chave já garante que nada antigo será servido nesta máquina
+        print(f"Erro ao invalidar cache de respostas: {e}")
+
+def metricas_respostas():
+    if not Config.CACHE_RESPOSTAS_ATIVO:
+        return {"ativo": False}
+    backend = get_backend()
+    return {"ativo": True, **backend.metricas.como_dict(), **backend.uso()}
+
+def com_cache_respostas(f):
+    """Para rotas GET protegidas (abaixo de @token_required e @com_etag): guarda o corpo JSON."""
+    @wraps(f)
+    def decorated(current_user_id, *args, **kwargs):
+        if not Config.CACHE_RESPOSTAS_ATIVO:
+            return f(current_user_id, *args, **kwargs)
+        backend = get_backend()
+        try:
+            chave = chave_resposta(backend, current_user_id)
+            corpo = backend.obter(chave)
+        except Exception as e:
+            print(f"Erro ao ler cache de respostas: {e}")
+            return f(current_user_id, *args, **kwargs)
+
+        if corpo is not None:
+            backend.metricas.incrementar('acertos')
+            return make_response(corpo, 200, {'Content-Type': 'application/json'})
+
+        backend.metricas.incrementar('falhas')
+        resposta = make_response(f(current_user_id, *args, **kwargs))
+        if resposta.status_code == 200 and not resposta.direct_passthrough:
+            corpo = resposta.get_data()
+            try:
+                if backend.definir(current_user_id, chave, corpo, Config.CACHE_RESPOSTAS_TTL):
+                    backend.metricas.incrementar('gravacoes')
+                    backend.metricas.incrementar('bytes_gravados', len(corpo))
+            except Exception as e:
+                print(f"Erro ao gravar cache de respostas: {e}")
+        return resposta
+    return decorated
@@ -0,0 +1,221 @@
+# utils/capas_utils.py
+# Capas baixadas uma vez e servidas localmente (routes/capa_routes.py). Os arquivos ficam em
+# CAPAS_DIRETORIO endereçados pelo SHA-256 do conteúdo: a mesma imagem usada por vários livros
+# ou usuários é gravada uma vez só. Com o Pillow instalado, miniaturas de tamanho fixo são geradas
+# junto. O download roda em segundo plano e, ao terminar, preenche livros.capa_hash.
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import mysql.connector
+import requests
+
+from config import Config
+from utils.db_utils import get_db_connection
+from utils.google_books import CacheLRU, get_sessao
+from utils.versao_utils import incrementar_versao
+from utils.cache_utils import invalidar_respostas
+from utils.alteracoes_utils import LIVRO, registrar_alteracoes
+
+try:
+    from PIL import Image # Opcional: sem ele só a imagem original é servida
+except ImportError:
+    Image = None
+
+TAMANHOS = {'pequena': 128, 'media': 256, 'grande': 512} # Lado maior, em pixels
+TIPOS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp'}
+_HASH_VALIDO = re.compile(r'^[0-9a-f]{64}$')
+MAX_REDIRECIONAMENTOS = 5
+
+
+class ErroCapa(Exception):
+    """Conteúdo baixado não é uma imagem aceitável (tipo ou tamanho)."""
+
+
+# --- Armazenamento endereçado por conteúdo ---
+
+def _pasta(hash_conteudo):
+    return os.path.join(Config.CAPAS_DIRETORIO, hash_conteudo[:2])
+
+def caminho_capa(hash_conteudo, tamanho='original'):
+    """Arquivo da capa no tamanho pedido, ou None. Sem a miniatura, devolve a original."""
+    if not _HASH_VALIDO.match(hash_conteudo or ''):
+        return None
+    pasta = _pasta(hash_conteudo)
+    if tamanho in TAMANHOS:
+        miniatura = os.path.join(pasta, f"{hash_conteudo}_{tamanho}.jpg")
+        if os.path.exists(miniatura):
+            return miniatura
+    for extensao in TIPOS.values():
+        original = os.path.join(pasta, hash_conteudo + extensao)
+        if os.path.exists(original):
+            return original
+    return None
+
+def _gravar(caminho, dados):
+    # Arquivo temporário + rename: quem lê nunca vê uma imagem pela metade
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+def _gerar_miniaturas(hash_conteudo, dados):
+    if Image is None:
+        return
+    try:
+        with Image.open(io.BytesIO(dados)) as imagem:
+            imagem = imagem.convert('RGB')
+            for nome, lado in TAMANHOS.items():
+                caminho = os.path.join(_pasta(hash_conteudo), f"{hash_conteudo}_{nome}.jpg")
+                if os.path.exists(caminho):
+                    continue
+                copia = imagem.copy()
+                copia.thumbnail((lado, lado)) # Mantém a proporção e nunca amplia
+                saida = io.BytesIO()
+                copia.save(saida, 'JPEG', quality=Config.CAPAS_QUALIDADE_JPEG, optimize=True, progressive=True)
+                _gravar(caminho, saida.getvalue())
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Imagem corrompida, formato que o Pillow não lê ou com pixels demais: fica só a original
+        print(f"Erro ao gerar miniaturas da capa {hash_conteudo}: {e}")
+
+def guardar_capa(dados, tipo):
+    """Grava a imagem (se ainda não existir) e as miniaturas; devolve o hash do conteúdo."""
+    hash_conteudo = hashlib.sha256(dados).hexdigest()
+    os.makedirs(_pasta(hash_conteudo), exist_ok=True)
+    original = os.path.join(_pasta(hash_conteudo), hash_conteudo + TIPOS[tipo])
+    if not os.path.exists(original):
+        _gravar(original, dados)
+    _gerar_miniaturas(hash_conteudo, dados)
+    return hash_conteudo
+
+def baixar_capa(url):
+    """Baixa a imagem respeitando CAPAS_TAMANHO_MAXIMO e devolve o hash do conteúdo."""
+    resposta = _get_seguindo_permitidas(url)
+    try:
+        resposta.raise_for_status()
+        tipo = resposta.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo not in TIPOS:
+            raise ErroCapa(f"Tipo de conteúdo não suportado: '{tipo}'.")
+        dados = bytearray()
+        for bloco in resposta.iter_content(64 * 1024):
+            dados += bloco
+            if len(dados) > Config.CAPAS_TAMANHO_MAXIMO:
+                raise ErroCapa(f"Imagem maior que {Config.CAPAS_TAMANHO_MAXIMO} bytes.")
+    finally:
+        resposta.close()
+    return guardar_capa(bytes(dados), tipo)
+
+def _get_seguindo_permitidas(url):
+    """GET que segue os redirecionamentos um a um, conferindo url_permitida em cada salto:
+    um host permitido não pode levar o servidor a buscar um endereço interno."""
+    for _ in range(MAX_REDIRECIONAMENTOS + 1):
+        if not url_permitida(url):
+            raise ErroCapa(f"Endereço não permitido para capas: '{url}'.")
+        resposta = get_sessao().get(
+            url, stream=True, allow_redirects=False,
+            timeout=(Config.GOOGLE_BOOKS_TIMEOUT_CONEXAO, Config.GOOGLE_BOOKS_TIMEOUT_LEITURA)
+        )
+        if not resposta.is_redirect:
+            return resposta
+        url = urljoin(url, resposta.headers['Location'])
+        resposta.close()
+    raise ErroCapa(f"Mais de {MAX_REDIRECIONAMENTOS} redirecionamentos.")
+
+# --- Download em segundo plano ---
+
+_urls_baixadas = CacheLRU(10000) # URL -> hash, para não baixar de novo a mesma capa
+_executor = None
+_executor_pid = None
+_em_andamento = set() # (id_usuario, url)
+_lock = threading.Lock()
+
+def get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=Config.CAPAS_THREADS, thread_name_prefix='capas')
+                _executor_pid = os.getpid()
+                _em_andamento.clear()
+    return _executor
+
+def associar_capa(id_usuario, url, hash_conteudo):
+    """Preenche capa_hash dos livros do usuário com essa capa_url. Retorna quantos mudaram."""
+    conn = get_db_connection()
+    if not conn:
+        print("Falha ao conectar ao banco de dados para associar a capa.")
+        return 0
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE livros SET capa_hash = %s WHERE id_usuario = %s AND capa_url = %s "
+            "AND (capa_hash IS NULL OR capa_hash <> %s)",
+            (hash_conteudo, id_usuario, url, hash_conteudo)
+        )
+        alterados = cursor.rowcount
+        if alterados:
+            cursor.execute(
+                "SELECT id FROM livros WHERE id_usuario = %s AND capa_url = %s AND capa_hash = %s",
+                (id_usuario, url, hash_conteudo)
+            )
+            registrar_alteracoes(conn, id_usuario, LIVRO, [linha[0] for linha in cursor.fetchall()])
+        conn.commit()
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao associar capa: {err}")
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
+    if alterados:
+        # As listagens em cache ainda têm capa_hash vazio
+        incrementar_versao(id_usuario)
+        invalidar_respostas(id_usuario)
+    return alterados
+
+def processar_capa(id_usuario, url):
+    """Baixa (se preciso) e associa a capa. Usado pelo pool em segundo plano e pelo manage.py."""
+    hash_conteudo = _urls_baixadas.obter(url)
+    if hash_conteudo is None or caminho_capa(hash_conteudo) is None:
+        hash_conteudo = baixar_capa(url)
+        _urls_baixadas.definir(url, hash_conteudo, 24 * 3600)
+    return associar_capa(id_usuario, url, hash_conteudo)
+
+def _executar(id_usuario, url):
+    try:
+        processar_capa(id_usuario, url)
+    except (requests.exceptions.RequestException, ErroCapa, OSError) as e:
+        # O livro continua com o link externo em capa_url
+        print(f"Erro ao baixar capa {url}: {e}")
+    finally:
+        with _lock:
+            _em_andamento.discard((id_usuario, url))
+
+def url_permitida(url):
+    """Só http(s) e, se CAPAS_HOSTS_PERMITIDOS estiver definido, só esses hosts (e subdomínios):
+    o servidor não deve buscar endereços arbitrários informados pelo usuário."""
+    partes = urlsplit(str(url or ''))
+    if partes.scheme not in ('http', 'https') or not partes.hostname:
+        return False
+    hosts = [h.strip().lower() for h in Config.CAPAS_HOSTS_PERMITIDOS.split(',') if h.strip()]
+    return not hosts or any(partes.hostname == h or partes.hostname.endswith('.' + h) for h in hosts)
+
+def agendar_capa(id_usuario, url):
+    """Agenda o download sem bloquear a requisição. Pedidos repetidos em andamento são ignorados."""
+    if not Config.CAPAS_ATIVO or not url_permitida(url):
+        return
+    executor = get_executor()
+    with _lock:
+        if (id_usuario, url) in _em_andamento:
+            return
+        _em_andamento.add((id_usuario, url))
+    executor.submit(_executar, id_usuario, url)
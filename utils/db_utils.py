@@ -1,19 +1,407 @@
 # utils/db_utils.py
+import itertools
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+
 import mysql.connector
 from flask import jsonify # Usamos jsonify aqui para retornar erros formatados
 from config import Config # Importa as configurações
+from utils.metricas import CursorInstrumentado, registrar_conexao, leituras_total
+from utils.versao_utils import versao_catalogo
+
+
+class PoolEsgotadoError(Exception):
+    """Levantada quando nenhuma conexão fica livre dentro do timeout de checkout."""
+
+
+class ReplicaIndisponivelError(Exception):
+    """A réplica responde, mas não está replicando (sem canal ou com a replicação parada)."""
+
+
+class ConexaoPooled:
+    """Envolve uma conexão do MySQL; close() devolve a conexão ao pool em vez de fechá-la."""
+
+    def __init__(self, pool, conn_real):
+        self._pool = pool
+        self._conn = conn_real
+        self.criada_em = time.monotonic()
+        self.devolvida_em = self.criada_em
+        self._preparadas = OrderedDict() # SQL -> cursor preparado, na ordem do último uso
+
+    def close(self):
+        # Idempotente: as rotas sempre chamam conn.close() no finally
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.devolver(self)
+
+    def cursor(self, *args, **kwargs):
+        # Cada instrução é cronometrada e contada para /metrics
+        return CursorInstrumentado(self._conn.cursor(*args, **kwargs))
+
+    def preparada(self, sql):
+        """Cursor com a instrução já preparada no servidor para esta conexão. Vive enquanto a
+        conexão existir (passa por várias requisições); as menos usadas são desalocadas acima de
+        DB_PREPARADAS_POR_CONEXAO. Não feche o cursor devolvido."""
+        cursor = self._preparadas.get(sql)
+        if cursor is not None:
+            self._preparadas.move_to_end(sql)
+            return cursor
+        if not Config.DB_PREPARADAS_POR_CONEXAO:
+            return self.cursor()
+        cursor = self.cursor(prepared=True)
+        self._preparadas[sql] = cursor
+        while len(self._preparadas) > Config.DB_PREPARADAS_POR_CONEXAO:
+            _, antigo = self._preparadas.popitem(last=False)
+            try:
+                antigo.close() # COM_STMT_CLOSE: libera a instrução no servidor
+            except mysql.connector.Error:
+                pass
+        return cursor
+
+    def __getattr__(self, nome):
+        # Todo o resto (cursor, commit, rollback, ...) vai direto para a conexão real
+        return getattr(self._conn, nome)
+
+
+class PoolDeConexoes:
+    """Pool limitado de conexões MySQL com timeout de checkout, verificação no empréstimo e reciclagem."""
+
+    def __init__(self, tamanho_maximo, timeout_checkout, tempo_max_ocioso, tempo_max_vida,
+                 verificar_ao_emprestar, **parametros_conexao):
+        self.tamanho_maximo = tamanho_maximo
+        self.timeout_checkout = timeout_checkout
+        self.tempo_max_ocioso = tempo_max_ocioso
+        self.tempo_max_vida = tempo_max_vida
+        self.verificar_ao_emprestar = verificar_ao_emprestar
+        self._parametros_conexao = parametros_conexao
+
+        self._ociosas = deque() # LIFO: a conexão usada mais recentemente sai primeiro
+        self._cond = threading.Condition()
+        self._total = 0 # Conexões abertas (ociosas + emprestadas)
+        self._em_uso = 0
+        self._aguardando = 0
+        self._criadas = 0
+        self._recicladas = 0
+        self._timeouts = 0
+
+    def _abrir(self):
+        conn_real = mysql.connector.connect(**self._parametros_conexao)
+        return ConexaoPooled(self, conn_real)
+
+    def _descartar(self, conexao):
+        try:
+            conexao._conn.close()
+        except Exception:
+            pass
+
+    def _expirada(self, conexao, agora):
+        if self.tempo_max_ocioso and agora - conexao.devolvida_em > self.tempo_max_ocioso:
+            return True
+        if self.tempo_max_vida and agora - conexao.criada_em > self.tempo_max_vida:
+            return True
+        return False
+
+    def _saudavel(self, conexao):
+        if not self.verificar_ao_emprestar:
+            return True
+        try:
+            conexao._conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def obter(self):
+        """Empresta uma conexão do pool, abrindo uma nova se houver espaço."""
+        limite = time.monotonic() + self.timeout_checkout
+        while True:
+            conexao = self._reservar(limite)
+            if conexao is None:
+                break # Vaga reservada para uma conexão nova
+            # Verificação fora do lock: um ping lento não segura as outras threads
+            if not self._expirada(conexao, time.monotonic()) and self._saudavel(conexao):
+                conexao._pool = self
+                return conexao
+            self._descartar(conexao)
+            with self._cond:
+                self._total -= 1
+                self._em_uso -= 1
+                self._recicladas += 1
+                self._cond.notify()
+
+        try:
+            conexao = self._abrir()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._em_uso -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._criadas += 1
+        return conexao
+
+    def _reservar(self, limite):
+        """Sob o lock: tira uma conexão ociosa (ainda não verificada) ou reserva a vaga de uma nova
+        (retorna None). Nos dois casos a conexão já conta como em uso."""
+        with self._cond:
+            while True:
+                if self._ociosas:
+                    self._em_uso += 1
+                    return self._ociosas.pop() # LIFO: a conexão usada mais recentemente sai primeiro
+
+                if self._total < self.tamanho_maximo:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    self._total += 1
+                    self._em_uso += 1
+                    return None
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._timeouts += 1
+                    raise PoolEsgotadoError(
+                        f"Nenhuma conexão livre após {self.timeout_checkout}s (máximo de {self.tamanho_maximo})."
+                    )
+                self._aguardando += 1
+                try:
+                    self._cond.wait(restante)
+                finally:
+                    self._aguardando -= 1
+
+    def devolver(self, conexao):
+        """Recebe a conexão de volta; transações pendentes são desfeitas antes de reutilizá-la."""
+        reutilizavel = True
+        try:
+            # Sem isso, um SELECT sem commit manteria o snapshot antigo da transação
+            conexao._conn.rollback()
+        except Exception:
+            reutilizavel = False
+
+        with self._cond:
+            self._em_uso -= 1
+            if reutilizavel and not self._expirada(conexao, time.monotonic()):
+                conexao.devolvida_em = time.monotonic()
+                self._ociosas.append(conexao)
+            else:
+                self._descartar(conexao)
+                self._total -= 1
+                self._recicladas += 1
+            self._cond.notify()
+
+    def fechar_todas(self):
+        """Fecha as conexões ociosas (usado em testes e no desligamento do processo)."""
+        with self._cond:
+            while self._ociosas:
+                self._descartar(self._ociosas.pop())
+                self._total -= 1
+
+    def metricas(self):
+        with self._cond:
+            return {
+                "tamanho_maximo": self.tamanho_maximo,
+                "abertas": self._total,
+                "ociosas": len(self._ociosas),
+                "em_uso": self._em_uso,
+                "aguardando": self._aguardando,
+                "criadas": self._criadas,
+                "recicladas": self._recicladas,
+                "timeouts": self._timeouts,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Retorna o pool do processo atual, criando-o na primeira chamada."""
+    global _pool, _pool_pid
+    # Após um fork (ex.: workers do gunicorn) o pool herdado não pode ser reutilizado
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = PoolDeConexoes(
+                    tamanho_maximo=Config.DB_POOL_TAMANHO,
+                    timeout_checkout=Config.DB_POOL_TIMEOUT,
+                    tempo_max_ocioso=Config.DB_POOL_TEMPO_OCIOSO,
+                    tempo_max_vida=Config.DB_POOL_TEMPO_VIDA,
+                    verificar_ao_emprestar=Config.DB_POOL_VERIFICAR,
+                    host=Config.DB_HOST,
+                    port=Config.DB_PORT,
+                    user=Config.DB_USER,
+                    password=Config.DB_PASSWORD,
+                    database=Config.DB_NAME
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+# --- Réplicas de leitura ---
+
+class Replica:
+    """Pool de uma réplica de leitura e o último estado medido (saúde e atraso)."""
+
+    def __init__(self, endereco, pool):
+        self.endereco = endereco
+        self.pool = pool
+        self.saudavel = False
+        self.atraso = None # Segundos atrás do primário (Seconds_Behind_Source)
+        self.erro = None
+        self.verificada_em = 0.0
+        self._verificando = threading.Lock()
+
+    def _medir(self):
+        conn = self.pool.obter()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql.connector.Error:
+                cursor.execute("SHOW SLAVE STATUS") # MySQL anterior a 8.0.22
+            canais = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        if not canais:
+            raise ReplicaIndisponivelError("o servidor não está replicando de nenhum primário")
+        atrasos = [canal.get('Seconds_Behind_Source', canal.get('Seconds_Behind_Master')) for canal in canais]
+        if any(atraso is None for atraso in atrasos):
+            raise ReplicaIndisponivelError("replicação parada")
+        return max(atrasos)
+
+    def atualizar(self):
+        """Mede de novo se a última verificação venceu. Só uma thread mede; as outras seguem com o estado anterior."""
+        if time.monotonic() - self.verificada_em < Config.DB_REPLICA_VERIFICAR_INTERVALO:
+            return
+        if not self._verificando.acquire(blocking=False):
+            return
+        try:
+            self.atraso = self._medir()
+            self.saudavel = self.atraso <= Config.DB_REPLICA_ATRASO_MAXIMO
+            self.erro = None if self.saudavel else f"atraso de {self.atraso}s acima de DB_REPLICA_ATRASO_MAXIMO"
+        except (mysql.connector.Error, PoolEsgotadoError, ReplicaIndisponivelError) as err:
+            if self.saudavel:
+                print(f"Réplica {self.endereco} fora de rotação: {err}")
+            self.saudavel = False
+            self.atraso = None
+            self.erro = str(err)
+        finally:
+            self.verificada_em = time.monotonic()
+            self._verificando.release()
+
+    def marcar_falha(self, err):
+        """Tira a réplica de rotação até a próxima verificação."""
+        self.saudavel = False
+        self.erro = str(err)
+        self.verificada_em = time.monotonic()
+
+    def metricas(self):
+        return {
+            "endereco": self.endereco, "saudavel": self.saudavel, "atraso": self.atraso, "erro": self.erro,
+            **self.pool.metricas()
+        }
+
+
+def _host_porta(endereco):
+    host, separador, porta = endereco.rpartition(':')
+    if not separador:
+        return endereco, Config.DB_PORT
+    return host, int(porta)
+
+_replicas = None
+_replicas_pid = None
+_proxima_replica = itertools.count()
+
+def get_replicas():
+    """Réplicas configuradas em DB_REPLICAS, com um pool por réplica neste processo."""
+    global _replicas, _replicas_pid
+    if _replicas is None or _replicas_pid != os.getpid():
+        with _pool_lock:
+            if _replicas is None or _replicas_pid != os.getpid():
+                replicas = []
+                for endereco in [e.strip() for e in Config.DB_REPLICAS.split(',') if e.strip()]:
+                    host, porta = _host_porta(endereco)
+                    pool = PoolDeConexoes(
+                        tamanho_maximo=Config.DB_REPLICA_POOL_TAMANHO,
+                        timeout_checkout=Config.DB_POOL_TIMEOUT,
+                        tempo_max_ocioso=Config.DB_POOL_TEMPO_OCIOSO,
+                        tempo_max_vida=Config.DB_POOL_TEMPO_VIDA,
+                        verificar_ao_emprestar=Config.DB_POOL_VERIFICAR,
+                        host=host,
+                        port=porta,
+                        user=Config.DB_REPLICA_USER,
+                        password=Config.DB_REPLICA_PASSWORD,
+                        database=Config.DB_NAME
+                    )
+                    replicas.append(Replica(endereco, pool))
+                _replicas = replicas
+                _replicas_pid = os.getpid()
+    return _replicas
+
+def escolher_replica(id_usuario=None):
+    """Réplica saudável para a leitura (rodízio), ou None para ler do primário.
+    Se o usuário escreveu há menos tempo que o atraso da réplica + DB_PRIMARIO_APOS_ESCRITA, ela é
+    pulada: quem acabou de chamar POST /livros lê do primário e vê o próprio livro. O instante da
+    última escrita vem de utils/versao_utils.py: vale para os workers da máquina com VERSOES_ARQUIVO
+    e para todas as máquinas com ESTADO_REDIS_URL."""
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    for replica in replicas:
+        replica.atualizar()
+    desde_escrita = time.time() - (versao_catalogo(id_usuario)[1] if id_usuario else 0.0)
+    candidatas = [
+        r for r in replicas
+        if r.saudavel and r.atraso + Config.DB_PRIMARIO_APOS_ESCRITA < desde_escrita
+    ]
+    if not candidatas:
+        return None
+    return candidatas[next(_proxima_replica) % len(candidatas)]
+
+def _conexao_leitura(id_usuario):
+    replica = escolher_replica(id_usuario)
+    if replica is not None:
+        try:
+            conexao = replica.pool.obter()
+            leituras_total.incrementar('replica')
+            return conexao
+        except PoolEsgotadoError as err:
+            print(f"Pool da réplica {replica.endereco} esgotado, lendo do primário: {err}")
+        except mysql.connector.Error as err:
+            print(f"Réplica {replica.endereco} indisponível, lendo do primário: {err}")
+            replica.marcar_falha(err)
+    leituras_total.incrementar('primario')
+    return get_pool().obter()
+
+def metricas_pool():
+    """Métricas do pool do processo atual (em uso, aguardando, criadas, recicladas...)."""
+    return get_pool().metricas()
+
+def metricas_replicas():
+    """Estado (saúde, atraso) e pool de cada réplica neste processo."""
+    return [replica.metricas() for replica in get_replicas()]
+
+def fechar_pools():
+    """Fecha as conexões ociosas do primário e das réplicas (desligamento do worker)."""
+    get_pool().fechar_todas()
+    for replica in get_replicas():
+        replica.pool.fechar_todas()
 
-def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados MySQL."""
+def get_db_connection(leitura=False, id_usuario=None):
+    """Empresta uma conexão do pool de conexões MySQL. Chamar conn.close() a devolve ao pool.
+    leitura=True (rotas GET) usa uma réplica quando houver uma saudável e em dia com as escritas
+    de id_usuario; caso contrário, o primário. Não escreva numa conexão de leitura."""
+    inicio = time.perf_counter()
     try:
-        conn = mysql.connector.connect(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME
-        )
-        return conn
+        if leitura:
+            return _conexao_leitura(id_usuario)
+        return get_pool().obter()
+    except PoolEsgotadoError as err:
+        print(f"Pool de conexões esgotado: {err}")
+        return None
     except mysql.connector.Error as err:
         print(f"Erro ao conectar ao MySQL: {err}")
         # Não retorna jsonify aqui, pois isso é uma função utilitária
-        return None
\ No newline at end of file
+        return None
+    finally:
+        registrar_conexao(time.perf_counter() - inicio)
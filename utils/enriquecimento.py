@@ -0,0 +1,250 @@
+# utils/enriquecimento.py
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import mysql.connector
+import requests
+
+from config import Config
+from utils.db_utils import get_db_connection
+from utils.json_utils import dumps as json_dumps
+from utils import google_books_async
+from utils.google_books import buscar_valor, chave_isbn, como_resposta, erro_transitorio, livro_nao_encontrado
+
+_executor = None
+_executor_pid = None
+_em_andamento = {} # chave ISBN-13 -> Future, compartilhado entre requisições
+_lock = threading.RLock() # Reentrante: add_done_callback pode rodar na hora, com o lock já adquirido
+
+def get_executor():
+    """Pool de threads limitado usado para as consultas (um por processo)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=Config.ENRIQUECIMENTO_THREADS,
+                                               thread_name_prefix='enriquecimento')
+                _executor_pid = os.getpid()
+                _em_andamento.clear()
+    return _executor
+
+def buscar_com_tentativas(chave):
+    """buscar_valor com novas tentativas e backoff exponencial com jitter."""
+    for tentativa in range(Config.ENRIQUECIMENTO_TENTATIVAS):
+        try:
+            return buscar_valor(chave)
+        except requests.exceptions.RequestException as e:
+            if tentativa == Config.ENRIQUECIMENTO_TENTATIVAS - 1 or not erro_transitorio(e):
+                raise
+            espera = Config.ENRIQUECIMENTO_BACKOFF * (2 ** tentativa)
+            time.sleep(espera + random.uniform(0, espera / 2))
+
+def _agendar(chave, isbn):
+    """Reaproveita a consulta já em andamento para o mesmo ISBN, se houver."""
+    with _lock:
+        futuro = _em_andamento.get(chave)
+        if futuro is None:
+            if google_books_async.disponivel():
+                # Todas as consultas do lote em voo no event loop, sem o limite de ENRIQUECIMENTO_THREADS
+                futuro = google_books_async.agendar(isbn, Config.ENRIQUECIMENTO_TENTATIVAS, Config.ENRIQUECIMENTO_BACKOFF)
+            else:
+                futuro = get_executor().submit(buscar_com_tentativas, chave)
+            _em_andamento[chave] = futuro
+            futuro.add_done_callback(lambda f, c=chave: _liberar(c, f))
+        return futuro
+
+def _liberar(chave, futuro):
+    with _lock:
+        if _em_andamento.get(chave) is futuro:
+            del _em_andamento[chave]
+
+def _resultado(isbn, futuro):
+    """Mesmo formato de livro de GET /livros/buscar-isbn. Os dois caminhos entregam o valor de cache."""
+    try:
+        book_data_preview = como_resposta(isbn, futuro.result())
+    except requests.exceptions.RequestException as e:
+        return {"isbn": isbn, "status": "erro", "mensagem": f"Erro ao comunicar com a API do Google Books: {e}"}
+    if book_data_preview:
+        return {"isbn": isbn, "status": "sucesso", "encontrado": True, "livro": book_data_preview}
+    return {"isbn": isbn, "status": "sucesso", "encontrado": False, "livro": livro_nao_encontrado(isbn)}
+
+def enriquecer(isbns):
+    """Resolve os ISBNs em paralelo e gera cada resultado assim que fica pronto.
+    ISBNs repetidos (inclusive ISBN-10 x ISBN-13 do mesmo livro) são consultados uma só vez."""
+    por_futuro = {}
+    for isbn in isbns:
+        futuro = _agendar(chave_isbn(isbn), isbn)
+        por_futuro.setdefault(futuro, []).append(isbn)
+    for futuro in as_completed(por_futuro):
+        for isbn in por_futuro[futuro]:
+            yield _resultado(isbn, futuro)
+
+# --- Tarefas em segundo plano ---
+# O estado fica no MySQL (migração 007): GET /livros/buscar-isbn/lote/<id> pode cair em qualquer
+# worker ou máquina, não só no que executa a tarefa. Os resultados são gravados em lotes de
+# até INTERVALO_GRAVACAO segundos, cada lote numa transação junto com o contador de concluídos.
+# A tarefa roda numa thread do worker, que o gunicorn recicla (max_requests) ou que pode cair:
+# enquanto ela vive, batida_em é renovada a cada ENRIQUECIMENTO_BATIDA_INTERVALO segundos, e uma
+# tarefa em andamento sem batida há 3 intervalos é marcada como 'interrompida' ao ser consultada.
+
+INTERVALO_GRAVACAO = 0.5
+
+SQL_CRIAR_TABELAS = [
+    """
+    CREATE TABLE IF NOT EXISTS tarefas_enriquecimento (
+        id CHAR(36) NOT NULL PRIMARY KEY,
+        id_usuario VARCHAR(36) NOT NULL,
+        total INT NOT NULL,
+        concluidos INT NOT NULL DEFAULT 0,
+        situacao VARCHAR(20) NOT NULL,
+        atualizada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        batida_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        KEY idx_tarefas_atualizada (atualizada_em)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tarefas_enriquecimento_resultados (
+        id_tarefa CHAR(36) NOT NULL,
+        ordem INT NOT NULL,
+        resultado MEDIUMTEXT NOT NULL,
+        PRIMARY KEY (id_tarefa, ordem),
+        CONSTRAINT fk_resultados_tarefa FOREIGN KEY (id_tarefa)
+            REFERENCES tarefas_enriquecimento (id) ON DELETE CASCADE
+    )
+    """,
+]
+
+def iniciar_tarefa(conn, isbns, id_usuario):
+    """Registra a tarefa (com commit), dispara o enriquecimento sem bloquear a requisição e
+    devolve o id da tarefa. Erros do MySQL são propagados para a rota."""
+    tarefa_id = str(uuid.uuid4())
+    cursor = conn.cursor()
+    try:
+        # Os resultados vão junto pelo ON DELETE CASCADE
+        cursor.execute(
+            "DELETE FROM tarefas_enriquecimento WHERE atualizada_em < NOW() - INTERVAL %s SECOND",
+            (Config.ENRIQUECIMENTO_TTL_TAREFA,)
+        )
+        cursor.execute(
+            "INSERT INTO tarefas_enriquecimento (id, id_usuario, total, situacao) VALUES (%s, %s, %s, %s)",
+            (tarefa_id, id_usuario, len(isbns), 'em_andamento')
+        )
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    threading.Thread(target=_executar_tarefa, args=(tarefa_id, isbns),
+                     name=f'tarefa-{tarefa_id[:8]}', daemon=True).start()
+    return tarefa_id
+
+def _executar_tarefa(tarefa_id, isbns):
+    parar = threading.Event()
+    threading.Thread(target=_bater, args=(tarefa_id, parar), name=f'batida-{tarefa_id[:8]}', daemon=True).start()
+    gravados = 0
+    pendentes = []
+    gravado_em = time.monotonic()
+    try:
+        for resultado in enriquecer(isbns):
+            pendentes.append(resultado)
+            if time.monotonic() - gravado_em >= INTERVALO_GRAVACAO:
+                if _gravar_resultados(tarefa_id, gravados, pendentes, 'em_andamento'):
+                    gravados += len(pendentes)
+                    pendentes = []
+                gravado_em = time.monotonic() # Numa falha, os pendentes vão no próximo lote
+        _gravar_resultados(tarefa_id, gravados, pendentes, 'concluida')
+    except Exception as e:
+        print(f"Erro na tarefa de enriquecimento {tarefa_id}: {e}")
+        _gravar_resultados(tarefa_id, gravados, pendentes, 'interrompida')
+    finally:
+        parar.set()
+
+def _bater(tarefa_id, parar):
+    """Renova batida_em enquanto a tarefa roda, mesmo sem resultado novo (consultas lentas)."""
+    while not parar.wait(Config.ENRIQUECIMENTO_BATIDA_INTERVALO):
+        conn = get_db_connection()
+        if not conn:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE tarefas_enriquecimento SET batida_em = NOW() WHERE id = %s AND situacao = 'em_andamento'",
+                (tarefa_id,)
+            )
+            conn.commit()
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"Erro ao renovar a tarefa {tarefa_id}: {err}")
+        finally:
+            cursor.close()
+            conn.close()
+
+def _gravar_resultados(tarefa_id, inicio, resultados, situacao):
+    """Acrescenta os resultados (a partir da posição `inicio`) e atualiza o andamento."""
+    conn = get_db_connection()
+    if not conn:
+        print(f"Falha ao conectar ao banco de dados para gravar a tarefa {tarefa_id}.")
+        return False
+    cursor = conn.cursor()
+    try:
+        if resultados:
+            cursor.executemany(
+                "INSERT INTO tarefas_enriquecimento_resultados (id_tarefa, ordem, resultado) VALUES (%s, %s, %s)",
+                [(tarefa_id, inicio + i, json_dumps(resultado)) for i, resultado in enumerate(resultados)]
+            )
+        cursor.execute(
+            "UPDATE tarefas_enriquecimento SET concluidos = %s, situacao = %s, batida_em = NOW() WHERE id = %s",
+            (inicio + len(resultados), situacao, tarefa_id)
+        )
+        conn.commit()
+        return True
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao gravar resultados da tarefa {tarefa_id}: {err}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def obter_tarefa(conn, tarefa_id, id_usuario):
+    """Estado da tarefa, ou None se não existir, tiver expirado ou for de outro usuário."""
+    cursor = conn.cursor()
+    try:
+        # Worker reciclado ou derrubado no meio da tarefa: sem isso ela ficaria em andamento para sempre
+        cursor.execute(
+            "UPDATE tarefas_enriquecimento SET situacao = 'interrompida' "
+            "WHERE id = %s AND situacao = 'em_andamento' AND batida_em < NOW() - INTERVAL %s SECOND",
+            (tarefa_id, 3 * Config.ENRIQUECIMENTO_BATIDA_INTERVALO)
+        )
+        conn.commit()
+        # As duas leituras na mesma transação: contador e resultados do mesmo lote
+        cursor.execute(
+            "SELECT total, concluidos, situacao FROM tarefas_enriquecimento "
+            "WHERE id = %s AND id_usuario = %s AND atualizada_em >= NOW() - INTERVAL %s SECOND",
+            (tarefa_id, id_usuario, Config.ENRIQUECIMENTO_TTL_TAREFA)
+        )
+        linha = cursor.fetchone()
+        if linha is None:
+            return None
+        total, concluidos, situacao = linha
+        cursor.execute(
+            "SELECT resultado FROM tarefas_enriquecimento_resultados WHERE id_tarefa = %s ORDER BY ordem",
+            (tarefa_id,)
+        )
+        resultados = [json.loads(resultado) for (resultado,) in cursor.fetchall()]
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    tarefa = {"id": tarefa_id, "total": total, "concluidos": concluidos, "situacao": situacao, "resultados": resultados}
+    if situacao == 'interrompida':
+        tarefa["mensagem"] = "A tarefa parou antes de terminar (servidor reiniciado). Os resultados já obtidos estão abaixo; envie os ISBNs restantes de novo."
+    return tarefa
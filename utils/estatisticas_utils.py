@@ -0,0 +1,144 @@
+# utils/estatisticas_utils.py
+# Contadores por usuário mantidos a cada escrita, para GET /livros/estatisticas não varrer a tabela livros.
+# Cada linha é (id_usuario, dimensao, valor) -> quantidade de livros e soma de páginas.
+# A tabela é criada pela migração 004 (python manage.py migrar).
+import mysql.connector
+
+SQL_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS estatisticas_usuario (
+    id_usuario VARCHAR(36) NOT NULL,
+    dimensao VARCHAR(20) NOT NULL,
+    valor VARCHAR(255) NOT NULL DEFAULT '',
+    quantidade INT NOT NULL DEFAULT 0,
+    paginas BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_usuario, dimensao, valor)
+)
+"""
+
+# Dimensões simples: uma coluna de livros cada
+DIMENSOES_COLUNA = ['genero', 'editora', 'idioma']
+COLUNAS_ESTATISTICAS = ['id', 'numero_paginas', 'data_fim_leitura'] + DIMENSOES_COLUNA
+
+def _paginas(livro):
+    try:
+        return int(livro.get('numero_paginas') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _ano(data):
+    if not data:
+        return None
+    ano = str(data)[:4]
+    return ano if ano.isdigit() else None
+
+def contribuicoes(livro):
+    """Linhas de estatística que um livro (sem as categorias) soma: [(dimensao, valor, paginas)]."""
+    paginas = _paginas(livro)
+    linhas = [('total', '', paginas)]
+    for dimensao in DIMENSOES_COLUNA:
+        if livro.get(dimensao):
+            linhas.append((dimensao, str(livro[dimensao]), paginas))
+    ano_fim = _ano(livro.get('data_fim_leitura'))
+    if ano_fim:
+        linhas.append(('lidos', '', paginas)) # Páginas lidas = páginas dos livros terminados
+        linhas.append(('ano_fim_leitura', ano_fim, paginas))
+    return linhas
+
+def aplicar_deltas(cursor, id_usuario, removidas=(), adicionadas=()):
+    """Subtrai as contribuições antigas e soma as novas, na transação de quem chamou."""
+    deltas = {}
+    for sinal, linhas in ((-1, removidas), (1, adicionadas)):
+        for dimensao, valor, paginas in linhas:
+            qtd, pag = deltas.get((dimensao, valor), (0, 0))
+            deltas[(dimensao, valor)] = (qtd + sinal, pag + sinal * paginas)
+    valores = [
+        (id_usuario, dimensao, valor, qtd, pag)
+        for (dimensao, valor), (qtd, pag) in deltas.items() if qtd or pag
+    ]
+    if not valores:
+        return
+    cursor.executemany(
+        "INSERT INTO estatisticas_usuario (id_usuario, dimensao, valor, quantidade, paginas) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE quantidade = quantidade + VALUES(quantidade), paginas = paginas + VALUES(paginas)",
+        valores
+    )
+
+def contribuicoes_categorias(categoria_ids, paginas=0):
+    return [('categoria', str(categoria_id), paginas) for categoria_id in categoria_ids]
+
+def remover_categoria(cursor, id_usuario, categoria_id):
+    """Chamado ao excluir a categoria: as associações somem junto com ela."""
+    cursor.execute(
+        "DELETE FROM estatisticas_usuario WHERE id_usuario = %s AND dimensao = 'categoria' AND valor = %s",
+        (id_usuario, str(categoria_id))
+    )
+
+def ler_estatisticas(cursor, id_usuario):
+    """Monta a resposta de GET /livros/estatisticas a partir dos contadores (cursor dictionary=True)."""
+    cursor.execute(
+        "SELECT dimensao, valor, quantidade, paginas FROM estatisticas_usuario "
+        "WHERE id_usuario = %s AND quantidade > 0",
+        (id_usuario,)
+    )
+    resultado = {
+        "total_livros": 0, "livros_lidos": 0, "paginas_lidas": 0, "paginas_total": 0,
+        "por_genero": {}, "por_editora": {}, "por_idioma": {}, "por_categoria": {}, "lidos_por_ano": {}
+    }
+    agrupamentos = {
+        'genero': 'por_genero', 'editora': 'por_editora', 'idioma': 'por_idioma',
+        'categoria': 'por_categoria', 'ano_fim_leitura': 'lidos_por_ano'
+    }
+    for linha in cursor.fetchall():
+        if linha['dimensao'] == 'total':
+            resultado["total_livros"] = linha['quantidade']
+            resultado["paginas_total"] = int(linha['paginas'])
+        elif linha['dimensao'] == 'lidos':
+            resultado["livros_lidos"] = linha['quantidade']
+            resultado["paginas_lidas"] = int(linha['paginas'])
+        elif linha['dimensao'] in agrupamentos:
+            resultado[agrupamentos[linha['dimensao']]][linha['valor']] = linha['quantidade']
+    return resultado
+
+# --- Reconstrução a partir da tabela livros ---
+
+_SQL_RECONSTRUIR = [
+    ("SELECT l.id_usuario, 'total', '', COUNT(*), COALESCE(SUM(l.numero_paginas), 0) "
+     "FROM livros l {filtro} GROUP BY l.id_usuario"),
+    ("SELECT l.id_usuario, 'lidos', '', COUNT(*), COALESCE(SUM(l.numero_paginas), 0) "
+     "FROM livros l WHERE l.data_fim_leitura IS NOT NULL {e_filtro} GROUP BY l.id_usuario"),
+    ("SELECT l.id_usuario, 'ano_fim_leitura', CAST(YEAR(l.data_fim_leitura) AS CHAR), COUNT(*), "
+     "COALESCE(SUM(l.numero_paginas), 0) FROM livros l WHERE l.data_fim_leitura IS NOT NULL {e_filtro} "
+     "GROUP BY l.id_usuario, YEAR(l.data_fim_leitura)"),
+    ("SELECT l.id_usuario, 'categoria', CAST(lc.id_categoria AS CHAR), COUNT(*), 0 "
+     "FROM livros l JOIN livro_categoria lc ON lc.id_livro = l.id {filtro} GROUP BY l.id_usuario, lc.id_categoria"),
+] + [
+    (f"SELECT l.id_usuario, '{dimensao}', l.{dimensao}, COUNT(*), COALESCE(SUM(l.numero_paginas), 0) "
+     f"FROM livros l WHERE l.{dimensao} IS NOT NULL AND l.{dimensao} <> '' {{e_filtro}} "
+     f"GROUP BY l.id_usuario, l.{dimensao}")
+    for dimensao in DIMENSOES_COLUNA
+]
+
+def reconstruir_estatisticas(conn, id_usuario=None):
+    """Recalcula os contadores do zero (de um usuário ou de todos) numa única transação."""
+    cursor = conn.cursor()
+    try:
+        if id_usuario is None:
+            cursor.execute("DELETE FROM estatisticas_usuario")
+            filtro, e_filtro, valores = "", "", ()
+        else:
+            cursor.execute("DELETE FROM estatisticas_usuario WHERE id_usuario = %s", (id_usuario,))
+            filtro, e_filtro, valores = "WHERE l.id_usuario = %s", "AND l.id_usuario = %s", (id_usuario,)
+        for select in _SQL_RECONSTRUIR:
+            cursor.execute(
+                "INSERT INTO estatisticas_usuario (id_usuario, dimensao, valor, quantidade, paginas) "
+                + select.format(filtro=filtro, e_filtro=e_filtro)
+                + " ON DUPLICATE KEY UPDATE quantidade = quantidade + VALUES(quantidade), paginas = paginas + VALUES(paginas)",
+                valores
+            )
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
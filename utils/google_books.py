@@ -0,0 +1,455 @@
+# utils/google_books.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from utils.metricas import google_books_segundos
+
+# --- Normalização de ISBN ---
+
+def _digito_isbn13(doze_digitos):
+    soma = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(doze_digitos))
+    return str((10 - soma % 10) % 10)
+
+def _isbn10_valido(isbn):
+    soma = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(isbn))
+    return soma % 11 == 0
+
+def normalizar_isbn(isbn):
+    """Converte ISBN-10 ou ISBN-13 (com ou sem hífens) para ISBN-13.
+    Retorna None se o valor não for um ISBN válido."""
+    limpo = ''.join(c for c in str(isbn) if c.isalnum()).upper()
+    if len(limpo) == 10 and limpo[:9].isdigit() and (limpo[9].isdigit() or limpo[9] == 'X'):
+        if not _isbn10_valido(limpo):
+            return None
+        base = '978' + limpo[:9]
+        return base + _digito_isbn13(base)
+    if len(limpo) == 13 and limpo.isdigit():
+        if _digito_isbn13(limpo[:12]) != limpo[12]:
+            return None
+        return limpo
+    return None
+
+def chave_isbn(isbn):
+    """Chave de cache: ISBN-13 quando válido; senão o texto limpo, para não perder a consulta."""
+    return normalizar_isbn(isbn) or ''.join(c for c in str(isbn) if c.isalnum()).upper()
+
+# --- Mapeamento volumeInfo -> prévia do livro ---
+
+def montar_book_data_preview(isbn, volume_info):
+    """Converte o volumeInfo da Google Books API no formato de livro usado pelo frontend."""
+    return {
+        'isbn': isbn,
+        'titulo': volume_info.get('title', 'Título Desconhecido'),
+        'autores': ", ".join(volume_info.get('authors', ['Autor Desconhecido'])) if volume_info.get('authors') else 'Autor Desconhecido',
+        'genero': volume_info.get('categories', ['Gênero Desconhecido'])[0] if volume_info.get('categories') else 'Gênero Desconhecido',
+        'editora': volume_info.get('publisher', 'Editora Desconhecida'),
+        'ano_publicacao': int(volume_info.get('publishedDate', '0000')[:4]) if volume_info.get('publishedDate') and volume_info.get('publishedDate')[:4].isdigit() else None,
+        'numero_paginas': volume_info.get('pageCount', None),
+        'capa_url': volume_info['imageLinks']['thumbnail'] if 'imageLinks' in volume_info and 'thumbnail' in volume_info['imageLinks'] else None,
+        'idioma': volume_info.get('language', 'pt')[:2] if volume_info.get('language') else 'pt',
+        'localizacao_fisica': None,
+        'notas_pessoais': None,
+        'data_inicio_leitura': None,
+        'data_fim_leitura': None,
+        'id_usuario': None # Não podemos definir aqui, pois a busca é pública
+    }
+
+def livro_nao_encontrado(isbn):
+    """Prévia vazia devolvida quando a Google Books API não conhece o ISBN."""
+    return {'isbn': isbn, 'titulo': 'Título Desconhecido', 'autores': 'Autor Desconhecido', 'genero': None, 'editora': None, 'ano_publicacao': None, 'numero_paginas': None, 'capa_url': None, 'idioma': 'pt', 'localizacao_fisica': None, 'notas_pessoais': None, 'data_inicio_leitura': None, 'data_fim_leitura': None, 'id_usuario': None}
+
+# --- Cache em dois níveis ---
+
+# Marca usada no cache para "ISBN não existe na Google Books" (cache negativo)
+NAO_ENCONTRADO = {}
+
+class CacheLRU:
+    """Cache LRU em memória com TTL por entrada. Seguro para uso entre threads."""
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.time():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor, ttl):
+        with self._lock:
+            self._dados[chave] = (valor, time.time() + ttl)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.capacidade:
+                self._dados.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def __len__(self):
+        return len(self._dados)
+
+
+class CacheDisco:
+    """Cache persistente em SQLite, compartilhado entre workers e reinícios do servidor."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conn = self._conexao()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_isbn ("
+            " isbn TEXT PRIMARY KEY, dados TEXT NOT NULL, expira_em REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conexao(self):
+        # Conexões SQLite não podem ser compartilhadas entre threads nem entre processos
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT dados, expira_em FROM cache_isbn WHERE isbn = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            return None, 0
+        dados, expira_em = linha
+        restante = expira_em - time.time()
+        if restante <= 0:
+            return None, 0
+        return json.loads(dados), restante
+
+    def definir(self, chave, valor, ttl):
+        conn = self._conexao()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_isbn (isbn, dados, expira_em) VALUES (?, ?, ?)",
+            (chave, json.dumps(valor), time.time() + ttl)
+        )
+        conn.commit()
+
+    def remover_expirados(self):
+        conn = self._conexao()
+        conn.execute("DELETE FROM cache_isbn WHERE expira_em < ?", (time.time(),))
+        conn.commit()
+
+
+class LimitadorTaxa:
+    """Token bucket: no máximo `taxa` chamadas por segundo (com rajadas de até `rajada`)."""
+
+    def __init__(self, taxa, rajada):
+        self.taxa = taxa
+        self.rajada = max(1, rajada)
+        self._fichas = float(self.rajada)
+        self._atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self):
+        """Reserva uma ficha e devolve quantos segundos esperar antes de usá-la (0 = na hora).
+        Serve tanto para quem dorme na thread quanto para corrotinas (asyncio.sleep)."""
+        if not self.taxa:
+            return 0.0 # Sem limite configurado
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._atualizado_em) * self.taxa)
+            self._atualizado_em = agora
+            self._fichas -= 1 # Pode ficar negativo: é a fila de quem já reservou
+            return max(0.0, -self._fichas / self.taxa)
+
+    def devolver(self):
+        """Devolve uma ficha reservada e não usada (consulta cancelada antes da chamada)."""
+        if not self.taxa:
+            return
+        with self._lock:
+            self._fichas = min(self.rajada, self._fichas + 1)
+
+    def aguardar(self):
+        espera = self.reservar()
+        if espera:
+            time.sleep(espera)
+
+
+class GoogleBooksIndisponivelError(requests.exceptions.RequestException):
+    """Levantada sem chamar a API enquanto o disjuntor está aberto."""
+
+
+def erro_transitorio(erro):
+    """Timeouts, falhas de conexão, 429 e 5xx indicam o serviço degradado; outros 4xx não."""
+    if isinstance(erro, GoogleBooksIndisponivelError):
+        return False
+    resposta = getattr(erro, 'response', None)
+    if resposta is None:
+        return True
+    return resposta.status_code == 429 or resposta.status_code >= 500
+
+
+class Disjuntor:
+    """Circuit breaker: após `limite_falhas` falhas transitórias seguidas, as chamadas falham na hora
+    por `tempo_aberto` segundos. Depois disso uma única chamada de teste decide se fecha ou reabre."""
+
+    def __init__(self, limite_falhas, tempo_aberto):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._falhas_seguidas = 0
+        self._aberto_ate = 0.0
+        self._testando = False
+        self._aberturas = 0
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        if not self.limite_falhas:
+            return # Desligado
+        with self._lock:
+            if self._falhas_seguidas < self.limite_falhas:
+                return
+            if time.monotonic() < self._aberto_ate or self._testando:
+                raise GoogleBooksIndisponivelError(
+                    "Google Books API indisponível no momento (disjuntor aberto). Tente novamente em instantes."
+                )
+            self._testando = True # Meio-aberto: só esta chamada passa
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas_seguidas = 0
+            self._testando = False
+
+    def liberar_teste(self):
+        """Chamada desistida sem resposta do serviço (ex.: cancelada): não conta como sucesso nem
+        como falha, mas libera a vaga do teste do meio-aberto para a próxima chamada."""
+        with self._lock:
+            self._testando = False
+
+    def registrar_erro(self, erro):
+        if not erro_transitorio(erro):
+            self.registrar_sucesso() # O serviço respondeu; o problema é da requisição
+            return
+        with self._lock:
+            self._falhas_seguidas += 1
+            if self._falhas_seguidas >= self.limite_falhas and (self._testando or self._falhas_seguidas == self.limite_falhas):
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+                self._aberturas += 1
+            self._testando = False
+
+    def estado(self):
+        with self._lock:
+            if not self.limite_falhas or self._falhas_seguidas < self.limite_falhas:
+                situacao = "fechado"
+            elif time.monotonic() < self._aberto_ate:
+                situacao = "aberto"
+            else:
+                situacao = "meio_aberto"
+            return {"situacao": situacao, "falhas_seguidas": self._falhas_seguidas, "aberturas": self._aberturas}
+
+
+class MetricasGoogleBooks:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0 # Cache miss: foi preciso consultar a API
+        self.nao_encontrados = 0
+        self.erros = 0
+        self.chamadas_api = 0
+        self.latencia_api_total = 0.0
+        self.latencia_api_maxima = 0.0
+
+    def incrementar(self, nome):
+        with self._lock:
+            setattr(self, nome, getattr(self, nome) + 1)
+
+    def registrar_latencia(self, segundos):
+        with self._lock:
+            self.chamadas_api += 1
+            self.latencia_api_total += segundos
+            self.latencia_api_maxima = max(self.latencia_api_maxima, segundos)
+
+    def como_dict(self):
+        with self._lock:
+            consultas = self.acertos_memoria + self.acertos_disco + self.falhas
+            return {
+                "acertos_memoria": self.acertos_memoria,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "nao_encontrados": self.nao_encontrados,
+                "erros": self.erros,
+                "taxa_acerto": round((self.acertos_memoria + self.acertos_disco) / consultas, 4) if consultas else None,
+                "chamadas_api": self.chamadas_api,
+                "latencia_api_media_ms": round(self.latencia_api_total / self.chamadas_api * 1000, 2) if self.chamadas_api else None,
+                "latencia_api_maxima_ms": round(self.latencia_api_maxima * 1000, 2),
+            }
+
+
+metricas = MetricasGoogleBooks()
+_cache_memoria = CacheLRU(Config.ISBN_CACHE_TAMANHO)
+_cache_disco = None
+# Limite por processo de chamadas à Google Books (o único host externo consultado)
+limitador = LimitadorTaxa(Config.GOOGLE_BOOKS_TAXA_MAXIMA, Config.GOOGLE_BOOKS_RAJADA)
+disjuntor = Disjuntor(Config.GOOGLE_BOOKS_DISJUNTOR_FALHAS, Config.GOOGLE_BOOKS_DISJUNTOR_ESPERA)
+_sessao = None
+_sessao_pid = None
+_lock = threading.Lock()
+
+def get_cache_disco():
+    global _cache_disco
+    if _cache_disco is None and Config.ISBN_CACHE_ARQUIVO:
+        with _lock:
+            if _cache_disco is None:
+                _cache_disco = CacheDisco(Config.ISBN_CACHE_ARQUIVO)
+    return _cache_disco
+
+def get_sessao():
+    """Sessão HTTP com pool de conexões keep-alive para a Google Books API (uma por processo)."""
+    global _sessao, _sessao_pid
+    if _sessao is None or _sessao_pid != os.getpid():
+        with _lock:
+            if _sessao is None or _sessao_pid != os.getpid():
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=Config.GOOGLE_BOOKS_POOL_TAMANHO)
+                sessao.mount('https://', adaptador)
+                sessao.mount('http://', adaptador)
+                _sessao = sessao
+                _sessao_pid = os.getpid()
+    return _sessao
+
+def consultar_api(isbn):
+    """Consulta a Google Books API; retorna o volumeInfo do primeiro resultado ou None.
+    Erros de rede/HTTP são propagados como requests.exceptions.RequestException.
+    Fila do limitador, conexão e leitura cabem juntas em GOOGLE_BOOKS_PRAZO segundos (o mesmo
+    prazo do caminho assíncrono): GET /livros/buscar-isbn não prende a thread do worker por mais
+    que isso, por mais lenta que a API esteja."""
+    limite = time.monotonic() + Config.GOOGLE_BOOKS_PRAZO
+    disjuntor.permitir()
+    espera = limitador.reservar()
+    if espera >= Config.GOOGLE_BOOKS_PRAZO:
+        # A API nem chegou a ser chamada: não conta como falha do serviço
+        limitador.devolver()
+        disjuntor.liberar_teste()
+        raise requests.exceptions.Timeout(
+            f"Prazo de {Config.GOOGLE_BOOKS_PRAZO:g}s esgotado aguardando o limitador de taxa da Google Books API.")
+    if espera:
+        time.sleep(espera)
+    inicio = time.perf_counter()
+    try:
+        restante = max(0.01, limite - time.monotonic()) # O requests recusa timeout zero
+        response = get_sessao().get(
+            Config.GOOGLE_BOOKS_API_URL,
+            params={'q': f'isbn:{isbn}'},
+            stream=True,
+            # Cada espera no socket fica dentro do que resta do prazo
+            timeout=(min(Config.GOOGLE_BOOKS_TIMEOUT_CONEXAO, restante), min(Config.GOOGLE_BOOKS_TIMEOUT_LEITURA, restante))
+        )
+        try:
+            response.raise_for_status()
+            corpo = bytearray()
+            for bloco in response.iter_content(16 * 1024):
+                corpo += bloco
+                if time.monotonic() > limite: # Resposta chegando aos poucos
+                    raise requests.exceptions.Timeout(
+                        f"Prazo de {Config.GOOGLE_BOOKS_PRAZO:g}s esgotado lendo a resposta da Google Books API.")
+        finally:
+            response.close()
+        google_data = json.loads(corpo)
+    except requests.exceptions.RequestException as e:
+        disjuntor.registrar_erro(e)
+        raise
+    except ValueError as e:
+        erro = requests.exceptions.RequestException(f"Resposta inválida da Google Books API: {e}")
+        disjuntor.registrar_erro(erro)
+        raise erro from e
+    finally:
+        registrar_chamada(time.perf_counter() - inicio)
+    disjuntor.registrar_sucesso()
+    return volume_info_da_resposta(google_data)
+
+def registrar_chamada(duracao):
+    metricas.registrar_latencia(duracao)
+    google_books_segundos.observar(duracao)
+
+def volume_info_da_resposta(google_data):
+    if google_data and 'items' in google_data and len(google_data['items']) > 0:
+        return google_data['items'][0]['volumeInfo']
+    return None
+
+def ler_cache(chave):
+    """Valor em cache para a chave (prévia sem 'isbn' ou NAO_ENCONTRADO), ou None se for preciso ir à API."""
+    valor = _cache_memoria.obter(chave)
+    if valor is not None:
+        metricas.incrementar('acertos_memoria')
+        return valor
+    cache_disco = get_cache_disco()
+    if cache_disco is not None:
+        valor, restante = cache_disco.obter(chave)
+        if valor is not None:
+            metricas.incrementar('acertos_disco')
+            _cache_memoria.definir(chave, valor, min(restante, Config.ISBN_CACHE_TTL))
+            return valor
+    return None
+
+def guardar_no_cache(chave, volume_info):
+    """Converte a resposta da API no valor de cache e o grava nos dois níveis."""
+    if volume_info is None:
+        valor, ttl = NAO_ENCONTRADO, Config.ISBN_CACHE_TTL_NAO_ENCONTRADO
+    else:
+        valor, ttl = montar_book_data_preview(None, volume_info), Config.ISBN_CACHE_TTL
+    _cache_memoria.definir(chave, valor, ttl)
+    cache_disco = get_cache_disco()
+    if cache_disco is not None:
+        cache_disco.definir(chave, valor, ttl)
+    return valor
+
+def como_resposta(isbn, valor):
+    """Prévia para o ISBN digitado pelo usuário, ou None se o livro não existe.
+    Único lugar que conta os não encontrados (uma vez por ISBN respondido)."""
+    if valor == NAO_ENCONTRADO:
+        metricas.incrementar('nao_encontrados')
+        return None
+    # O ISBN devolvido é o que o usuário digitou, como antes do cache
+    return {**valor, 'isbn': isbn}
+
+def buscar_valor(chave):
+    """Valor de cache da chave (prévia sem 'isbn' ou NAO_ENCONTRADO), passando pelo cache em
+    memória, depois pelo cache em disco e só então pela API."""
+    valor = ler_cache(chave)
+    if valor is None:
+        metricas.incrementar('falhas')
+        try:
+            volume_info = consultar_api(chave)
+        except requests.exceptions.RequestException:
+            metricas.incrementar('erros')
+            raise # Erros não são cacheados
+        valor = guardar_no_cache(chave, volume_info)
+    return valor
+
+def buscar_dados_livro(isbn):
+    """Retorna a prévia do livro para o ISBN (ou None se não existir)."""
+    return como_resposta(isbn, buscar_valor(chave_isbn(isbn)))
+
+def metricas_cache():
+    dados = metricas.como_dict()
+    dados["entradas_memoria"] = len(_cache_memoria)
+    dados["disjuntor"] = disjuntor.estado()
+    return dados
@@ -0,0 +1,148 @@
+# utils/google_books_async.py
+# Caminho assíncrono das consultas do enriquecimento em lote (utils/enriquecimento.py). Cada processo
+# tem um event loop numa thread própria e um httpx.AsyncClient compartilhado (pool de conexões
+# keep-alive): até GOOGLE_BOOKS_ASYNC_CONCORRENCIA consultas em andamento e o resto do lote esperando
+# a vez, sem ocupar uma thread cada. Os caches, o limitador de taxa e o disjuntor são os mesmos de
+# utils/google_books.py. Sem o httpx instalado, o enriquecimento usa o pool de threads.
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+from config import Config
+from utils.google_books import (
+    chave_isbn, disjuntor, erro_transitorio, guardar_no_cache, ler_cache, limitador,
+    metricas, registrar_chamada, volume_info_da_resposta
+)
+
+try:
+    import httpx # Opcional
+except ImportError:
+    httpx = None
+
+_loop = None
+_loop_pid = None
+_cliente = None
+_semaforo = None
+_lock = threading.Lock()
+
+def disponivel():
+    return httpx is not None and Config.GOOGLE_BOOKS_ASSINCRONO
+
+def get_loop():
+    """Event loop do processo atual, rodando numa thread daemon (criado na primeira chamada)."""
+    global _loop, _loop_pid, _cliente, _semaforo
+    if _loop is None or _loop_pid != os.getpid():
+        with _lock:
+            if _loop is None or _loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='google-books-async', daemon=True).start()
+                _cliente = None # O cliente herdado de outro processo não serve
+                _semaforo = None
+                _loop = loop
+                _loop_pid = os.getpid()
+    return _loop
+
+def _get_cliente():
+    # Só é chamado dentro do event loop, então não precisa de lock
+    global _cliente
+    if _cliente is None:
+        _cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(Config.GOOGLE_BOOKS_TIMEOUT_LEITURA, connect=Config.GOOGLE_BOOKS_TIMEOUT_CONEXAO),
+            limits=httpx.Limits(max_connections=Config.GOOGLE_BOOKS_ASYNC_CONEXOES,
+                                max_keepalive_connections=Config.GOOGLE_BOOKS_ASYNC_CONEXOES),
+        )
+    return _cliente
+
+def _get_semaforo():
+    # Também só dentro do event loop
+    global _semaforo
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(max(1, Config.GOOGLE_BOOKS_ASYNC_CONCORRENCIA))
+    return _semaforo
+
+def _traduzir_erro(erro):
+    """Erros do httpx viram os equivalentes do requests, que as rotas e as novas tentativas já tratam."""
+    if isinstance(erro, httpx.HTTPStatusError):
+        return requests.exceptions.HTTPError(str(erro), response=erro.response)
+    if isinstance(erro, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(erro))
+    return requests.exceptions.ConnectionError(str(erro))
+
+async def consultar_api(isbn):
+    """Versão assíncrona de google_books.consultar_api: volumeInfo ou None.
+    Toda saída depois de disjuntor.permitir() registra um desfecho, senão uma chamada de teste
+    do meio-aberto deixaria o disjuntor travado."""
+    disjuntor.permitir()
+    try:
+        espera = limitador.reservar()
+        if espera:
+            try:
+                await asyncio.sleep(espera)
+            except asyncio.CancelledError:
+                limitador.devolver() # A ficha não chegou a ser usada
+                raise
+        inicio = time.perf_counter()
+        try:
+            response = await _get_cliente().get(Config.GOOGLE_BOOKS_API_URL, params={'q': f'isbn:{isbn}'})
+            response.raise_for_status()
+            google_data = response.json()
+        finally:
+            registrar_chamada(time.perf_counter() - inicio)
+    except httpx.HTTPError as e:
+        erro = _traduzir_erro(e)
+        disjuntor.registrar_erro(erro)
+        raise erro from e
+    except ValueError as e:
+        erro = requests.exceptions.RequestException(f"Resposta inválida da Google Books API: {e}")
+        disjuntor.registrar_erro(erro)
+        raise erro from e
+    except BaseException:
+        # Cancelada (prazo esgotado ou desligamento): não é falha do serviço
+        disjuntor.liberar_teste()
+        raise
+    disjuntor.registrar_sucesso()
+    return volume_info_da_resposta(google_data)
+
+async def _consultar_com_tentativas(chave, tentativas, backoff):
+    for tentativa in range(tentativas):
+        try:
+            return await consultar_api(chave)
+        except requests.exceptions.RequestException as e:
+            if tentativa == tentativas - 1 or not erro_transitorio(e):
+                raise
+            espera = backoff * (2 ** tentativa)
+            await asyncio.sleep(espera + random.uniform(0, espera / 2))
+
+async def _buscar(chave, tentativas, backoff):
+    metricas.incrementar('falhas')
+    # Espera a vez antes de reservar ficha e de contar o prazo: um lote grande não empurra a
+    # fila do limitador para além do prazo das últimas consultas
+    async with _get_semaforo():
+        try:
+            volume_info = await asyncio.wait_for(_consultar_com_tentativas(chave, tentativas, backoff),
+                                                 Config.GOOGLE_BOOKS_PRAZO)
+        except asyncio.TimeoutError:
+            metricas.incrementar('erros')
+            raise requests.exceptions.Timeout(
+                f"Prazo de {Config.GOOGLE_BOOKS_PRAZO:g}s esgotado consultando a Google Books API.")
+        except requests.exceptions.RequestException:
+            metricas.incrementar('erros')
+            raise
+    # O cache em disco é SQLite: grava fora do event loop para não travar as outras consultas
+    return await asyncio.get_running_loop().run_in_executor(None, guardar_no_cache, chave, volume_info)
+
+def agendar(isbn, tentativas=1, backoff=0.0):
+    """Future (concurrent.futures) com o valor de cache do ISBN: prévia sem 'isbn' ou {} se não existe.
+    Acertos de cache resolvem na hora, sem passar pelo event loop."""
+    chave = chave_isbn(isbn)
+    valor = ler_cache(chave)
+    if valor is not None:
+        futuro = Future()
+        futuro.set_result(valor)
+        return futuro
+    return asyncio.run_coroutine_threadsafe(_buscar(chave, tentativas, backoff), get_loop())
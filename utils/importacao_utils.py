@@ -0,0 +1,92 @@
+# utils/importacao_utils.py
+import csv
+import io
+import json
+
+CAMPOS_OBRIGATORIOS = ['isbn', 'titulo', 'autores']
+CAMPOS_INTEIROS = ['ano_publicacao', 'numero_paginas']
+CAMPOS_IMPORTAVEIS = [
+    'isbn', 'titulo', 'autores', 'genero', 'editora', 'ano_publicacao',
+    'numero_paginas', 'capa_url', 'localizacao_fisica', 'notas_pessoais',
+    'idioma', 'data_inicio_leitura', 'data_fim_leitura'
+]
+
+class ErroImportacao(Exception):
+    """Corpo da requisição ilegível como um todo (ex.: JSON malformado)."""
+
+def detectar_formato(request):
+    """Formato do corpo: ?formato= tem prioridade sobre o Content-Type. None se não suportado."""
+    formato = request.args.get('formato')
+    if formato:
+        formato = formato.lower()
+        return formato if formato in ('json', 'csv', 'ndjson') else None
+    tipo = (request.mimetype or '').lower()
+    if tipo in ('text/csv', 'application/csv'):
+        return 'csv'
+    if tipo in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        return 'ndjson'
+    if tipo == 'application/json':
+        return 'json'
+    return None
+
+def validar_linha(dados):
+    """Aplica as mesmas regras de POST /livros. Retorna (livro, None) ou (None, mensagem)."""
+    if not isinstance(dados, dict):
+        return None, "Cada linha deve ser um objeto com os campos do livro."
+    livro = {}
+    for campo in CAMPOS_IMPORTAVEIS:
+        valor = dados.get(campo)
+        if isinstance(valor, str):
+            valor = valor.strip()
+            if valor == '':
+                valor = None # Células vazias do CSV viram NULL
+        if campo in CAMPOS_INTEIROS and valor is not None:
+            try:
+                valor = int(valor)
+            except (TypeError, ValueError):
+                return None, f"Campo '{campo}' deve ser um número inteiro."
+        livro[campo] = valor
+    for campo in CAMPOS_OBRIGATORIOS:
+        if not livro.get(campo):
+            return None, f"Campo '{campo}' é obrigatório."
+    return livro, None
+
+def ler_linhas(request, formato):
+    """Gera (numero_linha, dados, erro) sem carregar CSV/NDJSON inteiros na memória."""
+    if formato == 'json':
+        try:
+            dados = json.loads(request.get_data(cache=False))
+        except ValueError as e:
+            raise ErroImportacao(f"JSON inválido: {e}")
+        if not isinstance(dados, list):
+            raise ErroImportacao("O corpo JSON deve ser uma lista de livros.")
+        for numero, item in enumerate(dados, start=1):
+            yield numero, item, None
+        return
+
+    texto = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        # numero = linha de dados (o cabeçalho não conta)
+        for numero, linha in enumerate(csv.DictReader(texto), start=1):
+            yield numero, linha, None
+        return
+
+    numero = 0
+    for linha in texto:
+        if not linha.strip():
+            continue
+        numero += 1
+        try:
+            yield numero, json.loads(linha), None
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+
+def em_lotes(iteravel, tamanho):
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
@@ -0,0 +1,53 @@
+# utils/json_utils.py
+# Serialização JSON das respostas. Com o orjson instalado (opcional) o app usa o encoder em C;
+# sem ele, o json da biblioteca padrão. Nos dois casos date/datetime/Decimal das linhas do
+# mysql.connector saem direto, sem converter linha a linha nas rotas.
+import decimal
+import json
+from datetime import date, datetime, time, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson # Opcional
+except ImportError:
+    orjson = None
+
+def _padrao(obj):
+    # Mesmo texto que str() gerava nas rotas: 'AAAA-MM-DD' e 'AAAA-MM-DD HH:MM:SS'
+    if isinstance(obj, (datetime, date, time, timedelta)):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj) # Como o provedor padrão do Flask: sem perder precisão
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode('utf-8')
+    if isinstance(obj, set):
+        return list(obj)
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+def dumps_bytes(obj, ordenar_chaves=False):
+    """JSON compacto em UTF-8."""
+    if orjson is not None:
+        opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if ordenar_chaves:
+            opcoes |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_padrao, option=opcoes)
+    return json.dumps(obj, default=_padrao, ensure_ascii=False, sort_keys=ordenar_chaves,
+                      separators=(',', ':')).encode('utf-8')
+
+def dumps(obj):
+    """Mesmo que dumps_bytes, como str (linhas de NDJSON, por exemplo)."""
+    return dumps_bytes(obj).decode('utf-8')
+
+
+class ProvedorJSONRapido(DefaultJSONProvider):
+    """app.json: jsonify passa a usar dumps_bytes, sem o passo intermediário por str."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs) # Opções específicas do json da biblioteca padrão
+        return dumps_bytes(obj, self.sort_keys).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys), mimetype=self.mimetype)
@@ -0,0 +1,234 @@
+# utils/metricas.py
+# Instrumentação por requisição: latência por rota, tempo de conexão x consulta x serialização,
+# número de instruções SQL e latência da Google Books, expostos em /metrics (formato Prometheus).
+# Os valores são por processo: com vários workers, cada um expõe os seus.
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request, Response
+
+from config import Config
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONTAGEM = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class Histograma:
+    def __init__(self, nome, descricao, buckets, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = buckets
+        self.rotulos = rotulos
+        self._series = {} # valores dos rótulos -> [contagens por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores_rotulos):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [0] * len(self.buckets) + [0.0, 0]
+            if indice < len(self.buckets):
+                serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for valores_rotulos, serie in sorted(series.items()):
+            base = _rotulos(self.rotulos, valores_rotulos)
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{_rotulos(self.rotulos, valores_rotulos, le=limite)} {acumulado}')
+            linhas.append(f'{self.nome}_bucket{_rotulos(self.rotulos, valores_rotulos, le="+Inf")} {serie[-1]}')
+            linhas.append(f"{self.nome}_sum{base} {serie[-2]}")
+            linhas.append(f"{self.nome}_count{base} {serie[-1]}")
+        return linhas
+
+
+class Contador:
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores_rotulos, quantidade=1):
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + quantidade
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} counter"]
+        with self._lock:
+            valores = dict(self._valores)
+        for valores_rotulos, valor in sorted(valores.items()):
+            linhas.append(f"{self.nome}{_rotulos(self.rotulos, valores_rotulos)} {valor}")
+        return linhas
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _rotulos(nomes, valores, le=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if le is not None:
+        pares.append(f'le="{le}"')
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+requisicoes_segundos = Histograma(
+    "http_requisicao_segundos", "Latência das requisições por rota.", BUCKETS_SEGUNDOS, ("rota", "metodo"))
+requisicoes_total = Contador(
+    "http_requisicoes_total", "Requisições por rota e status.", ("rota", "metodo", "status"))
+conexao_segundos = Histograma(
+    "db_conexao_segundos", "Tempo para obter uma conexão do pool.", BUCKETS_SEGUNDOS)
+consulta_segundos = Histograma(
+    "db_consulta_segundos", "Tempo de cada instrução SQL (execute + fetch).", BUCKETS_SEGUNDOS)
+sql_por_requisicao = Histograma(
+    "http_sql_por_requisicao", "Instruções SQL executadas por requisição.", BUCKETS_CONTAGEM, ("rota",))
+db_por_requisicao_segundos = Histograma(
+    "http_db_segundos", "Tempo total em SQL (conexão + consultas) por requisição.", BUCKETS_SEGUNDOS, ("rota",))
+serializacao_segundos = Histograma(
+    "http_serializacao_segundos", "Tempo serializando JSON por requisição.", BUCKETS_SEGUNDOS, ("rota",))
+google_books_segundos = Histograma(
+    "google_books_segundos", "Latência das chamadas à Google Books API.", BUCKETS_SEGUNDOS)
+consultas_lentas_total = Contador(
+    "db_consultas_lentas_total", "Instruções SQL acima de SQL_LENTO_MS.")
+leituras_total = Contador(
+    "db_leituras_total", "Conexões de leitura por destino (replica ou primario).", ("destino",))
+
+_METRICAS = [
+    requisicoes_segundos, requisicoes_total, conexao_segundos, consulta_segundos, sql_por_requisicao,
+    db_por_requisicao_segundos, serializacao_segundos, google_books_segundos, consultas_lentas_total,
+    leituras_total,
+]
+
+# --- Ganchos chamados por db_utils e pelo provedor JSON ---
+
+def registrar_conexao(segundos):
+    conexao_segundos.observar(segundos)
+    if has_request_context() and hasattr(g, 'metricas_db'):
+        g.metricas_db += segundos
+
+def registrar_consulta(sql, segundos, instrucoes=1):
+    consulta_segundos.observar(segundos)
+    if has_request_context() and hasattr(g, 'metricas_sql'):
+        g.metricas_sql += instrucoes
+        g.metricas_db += segundos
+    if Config.SQL_LENTO_MS and segundos * 1000 >= Config.SQL_LENTO_MS:
+        consultas_lentas_total.incrementar()
+        # Só o texto com os marcadores %s: os valores (senhas, e-mails...) nunca vão para o log
+        texto = " ".join(str(sql).split())
+        rota = request.path if has_request_context() else '-'
+        print(f"[SQL LENTO] {segundos * 1000:.1f} ms rota={rota} sql={texto[:Config.SQL_LENTO_TAMANHO_MAXIMO]}")
+
+def registrar_serializacao(segundos):
+    if has_request_context() and hasattr(g, 'metricas_serializacao'):
+        g.metricas_serializacao += segundos
+
+
+class CursorInstrumentado:
+    """Envolve um cursor do mysql.connector medindo execute/executemany/fetch*."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._sql = operation
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            registrar_consulta(operation, time.perf_counter() - inicio)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._sql = operation
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            registrar_consulta(operation, time.perf_counter() - inicio)
+
+    def _medir_fetch(self, metodo, *args):
+        inicio = time.perf_counter()
+        try:
+            return getattr(self._cursor, metodo)(*args)
+        finally:
+            # Leitura das linhas entra no tempo de consulta, mas não conta como outra instrução
+            if self._sql is not None:
+                registrar_consulta(self._sql, time.perf_counter() - inicio, instrucoes=0)
+
+    def fetchone(self):
+        return self._medir_fetch('fetchone')
+
+    def fetchmany(self, *args):
+        return self._medir_fetch('fetchmany', *args)
+
+    def fetchall(self):
+        return self._medir_fetch('fetchall')
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+# --- Integração com o Flask ---
+
+def _rota():
+    return request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+
+def _antes():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_sql = 0
+    g.metricas_db = 0.0
+    g.metricas_serializacao = 0.0
+
+def _depois(response):
+    inicio = getattr(g, 'metricas_inicio', None)
+    if inicio is None:
+        return response
+    rota = _rota()
+    requisicoes_segundos.observar(time.perf_counter() - inicio, rota, request.method)
+    requisicoes_total.incrementar(rota, request.method, response.status_code)
+    sql_por_requisicao.observar(g.metricas_sql, rota)
+    db_por_requisicao_segundos.observar(g.metricas_db, rota)
+    serializacao_segundos.observar(g.metricas_serializacao, rota)
+    return response
+
+def exportar_prometheus():
+    linhas = []
+    for metrica in _METRICAS:
+        linhas.extend(metrica.exportar())
+    # Estado atual do pool de conexões como gauges
+    from utils.db_utils import metricas_pool
+    for nome, valor in metricas_pool().items():
+        linhas.append(f"# TYPE db_pool_{nome} gauge")
+        linhas.append(f"db_pool_{nome} {valor}")
+    return "\n".join(linhas) + "\n"
+
+def init_app(app):
+    """Registra os ganchos de medição e a rota /metrics no app (depois de definir app.json)."""
+    app.before_request(_antes)
+    app.after_request(_depois)
+
+    # Mede o provedor JSON que o app já usa (o padrão do Flask ou o de utils/json_utils.py)
+    class ProvedorJSONInstrumentado(type(app.json)):
+        def response(self, *args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return super().response(*args, **kwargs)
+            finally:
+                registrar_serializacao(time.perf_counter() - inicio)
+
+    app.json = ProvedorJSONInstrumentado(app)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(exportar_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,242 @@
+# utils/migracoes.py
+# Migrações versionadas do esquema (pasta migrations/) e verificação dos planos de execução.
+# A versão aplicada fica registrada na tabela schema_migracoes.
+import importlib
+import json
+import pkgutil
+
+import migrations
+
+SQL_CRIAR_TABELA_MIGRACOES = """
+CREATE TABLE IF NOT EXISTS schema_migracoes (
+    versao INT NOT NULL PRIMARY KEY,
+    descricao VARCHAR(255) NOT NULL,
+    aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# --- Passos reutilizáveis pelas migrações ---
+
+def _indice_existe(cursor, tabela, nome):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (tabela, nome)
+    )
+    return cursor.fetchone() is not None
+
+def criar_indice(tabela, nome, colunas, tipo=''):
+    """Passo que cria o índice só se ele ainda não existir (bancos antigos podem já tê-lo)."""
+    def passo(conn):
+        cursor = conn.cursor()
+        try:
+            if not _indice_existe(cursor, tabela, nome):
+                cursor.execute(f"ALTER TABLE {tabela} ADD {tipo} INDEX {nome} ({', '.join(colunas)})")
+        finally:
+            cursor.close()
+    passo.__doc__ = f"índice {nome} em {tabela}"
+    return passo
+
+def remover_indice(tabela, nome):
+    def passo(conn):
+        cursor = conn.cursor()
+        try:
+            if _indice_existe(cursor, tabela, nome):
+                cursor.execute(f"ALTER TABLE {tabela} DROP INDEX {nome}")
+        finally:
+            cursor.close()
+    passo.__doc__ = f"remove índice {nome} de {tabela}"
+    return passo
+
+def _coluna_existe(cursor, tabela, nome):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+        (tabela, nome)
+    )
+    return cursor.fetchone() is not None
+
+def adicionar_coluna(tabela, nome, definicao):
+    """Passo que adiciona a coluna só se ela ainda não existir."""
+    def passo(conn):
+        cursor = conn.cursor()
+        try:
+            if not _coluna_existe(cursor, tabela, nome):
+                cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {nome} {definicao}")
+        finally:
+            cursor.close()
+    passo.__doc__ = f"coluna {nome} em {tabela}"
+    return passo
+
+def remover_coluna(tabela, nome):
+    def passo(conn):
+        cursor = conn.cursor()
+        try:
+            if _coluna_existe(cursor, tabela, nome):
+                cursor.execute(f"ALTER TABLE {tabela} DROP COLUMN {nome}")
+        finally:
+            cursor.close()
+    passo.__doc__ = f"remove coluna {nome} de {tabela}"
+    return passo
+
+# --- Execução ---
+
+def carregar_migracoes():
+    """Módulos de migrations/ ordenados por VERSAO."""
+    modulos = []
+    for info in pkgutil.iter_modules(migrations.__path__):
+        if info.name.startswith('v'):
+            modulos.append(importlib.import_module(f"migrations.{info.name}"))
+    modulos.sort(key=lambda m: m.VERSAO)
+    versoes = [m.VERSAO for m in modulos]
+    if len(versoes) != len(set(versoes)):
+        raise RuntimeError(f"Versões de migração repetidas: {versoes}")
+    return modulos
+
+def versoes_aplicadas(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SQL_CRIAR_TABELA_MIGRACOES)
+        cursor.execute("SELECT versao FROM schema_migracoes ORDER BY versao")
+        return [linha[0] for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def _executar_passos(conn, passos):
+    for passo in passos:
+        if callable(passo):
+            passo(conn)
+        else:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(passo)
+            finally:
+                cursor.close()
+    conn.commit()
+
+def migrar(conn, ate=None, saida=print):
+    """Aplica, em ordem, as migrações pendentes (até a versão `ate`, se informada).
+    DDL no MySQL faz commit implícito, então cada migração é registrada logo após rodar."""
+    aplicadas = set(versoes_aplicadas(conn))
+    for modulo in carregar_migracoes():
+        if modulo.VERSAO in aplicadas or (ate is not None and modulo.VERSAO > ate):
+            continue
+        saida(f"Aplicando {modulo.VERSAO:03d}: {modulo.DESCRICAO}")
+        _executar_passos(conn, modulo.SUBIR)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO schema_migracoes (versao, descricao) VALUES (%s, %s)",
+                           (modulo.VERSAO, modulo.DESCRICAO))
+            conn.commit()
+        finally:
+            cursor.close()
+
+def reverter(conn, passos=1, saida=print):
+    """Desfaz as `passos` últimas migrações aplicadas, da mais nova para a mais antiga."""
+    aplicadas = versoes_aplicadas(conn)
+    por_versao = {m.VERSAO: m for m in carregar_migracoes()}
+    for versao in list(reversed(aplicadas))[:passos]:
+        modulo = por_versao.get(versao)
+        if modulo is None:
+            raise RuntimeError(f"Migração {versao} aplicada no banco mas ausente em migrations/.")
+        saida(f"Revertendo {versao:03d}: {modulo.DESCRICAO}")
+        _executar_passos(conn, modulo.DESCER)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM schema_migracoes WHERE versao = %s", (versao,))
+            conn.commit()
+        finally:
+            cursor.close()
+
+def situacao(conn):
+    """[(versao, descricao, aplicada?)] de todas as migrações conhecidas."""
+    aplicadas = set(versoes_aplicadas(conn))
+    return [(m.VERSAO, m.DESCRICAO, m.VERSAO in aplicadas) for m in carregar_migracoes()]
+
+# --- Verificação de planos (EXPLAIN) ---
+
+# Consultas quentes das rotas, com valores de exemplo. Se alguma voltar a varrer a tabela
+# inteira (type=ALL) ou o índice inteiro (type=index), verificar_planos acusa regressão.
+USUARIO_EXEMPLO = '00000000-0000-0000-0000-000000000000'
+CONSULTAS_VERIFICADAS = [
+    ("GET /livros (ordem padrão)",
+     "SELECT l.* FROM livros l WHERE l.id_usuario = %s ORDER BY titulo ASC",
+     (USUARIO_EXEMPLO,)),
+    ("GET /livros paginado por data_cadastro",
+     "SELECT l.* FROM livros l WHERE l.id_usuario = %s AND (l.data_cadastro < %s OR (l.data_cadastro = %s AND l.id < %s) "
+     "OR l.data_cadastro IS NULL) ORDER BY l.data_cadastro DESC, l.id DESC LIMIT 51",
+     (USUARIO_EXEMPLO, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 1000)),
+    ("GET /livros?genero=",
+     "SELECT l.* FROM livros l WHERE l.id_usuario = %s AND l.genero = %s ORDER BY titulo ASC",
+     (USUARIO_EXEMPLO, 'Romance')),
+    ("GET /livros?editora=",
+     "SELECT l.* FROM livros l WHERE l.id_usuario = %s AND l.editora = %s ORDER BY titulo ASC",
+     (USUARIO_EXEMPLO, 'Rocco')),
+    ("GET /livros?idioma=",
+     "SELECT l.* FROM livros l WHERE l.id_usuario = %s AND l.idioma = %s ORDER BY titulo ASC",
+     (USUARIO_EXEMPLO, 'pt')),
+    ("GET /livros?categoria_id=",
+     "SELECT l.* FROM livros l WHERE l.id_usuario = %s AND EXISTS (SELECT 1 FROM livro_categoria lc "
+     "WHERE lc.id_livro = l.id AND lc.id_categoria = %s) ORDER BY titulo ASC",
+     (USUARIO_EXEMPLO, 1)),
+    ("GET /livros?busca=",
+     "SELECT l.id FROM livros l WHERE l.id_usuario = %s AND MATCH(l.titulo, l.autores, l.editora, l.genero, "
+     "l.notas_pessoais) AGAINST (%s IN BOOLEAN MODE)",
+     (USUARIO_EXEMPLO, '+machado*')),
+    ("GET /livros/facetas (genero)",
+     "SELECT l.genero, COUNT(*) FROM livros l WHERE l.id_usuario = %s AND l.editora = %s "
+     "AND l.genero IS NOT NULL AND l.genero <> '' GROUP BY l.genero",
+     (USUARIO_EXEMPLO, 'Rocco')),
+    ("GET /sync",
+     "SELECT seq, entidade, id_entidade, operacao FROM alteracoes WHERE id_usuario = %s AND seq > %s ORDER BY seq LIMIT 501",
+     (USUARIO_EXEMPLO, 0)),
+    ("GET /livros/<id>",
+     "SELECT * FROM livros WHERE id = %s AND id_usuario = %s",
+     (1, USUARIO_EXEMPLO)),
+    ("GET /categorias",
+     "SELECT c.id, c.nome, c.descricao, (SELECT COUNT(*) FROM livro_categoria lc WHERE lc.id_categoria = c.id) "
+     "AS total_livros FROM categorias c WHERE c.id_usuario = %s",
+     (USUARIO_EXEMPLO,)),
+    ("?incluir=categorias",
+     "SELECT lc.id_livro, c.id, c.nome FROM livro_categoria lc JOIN categorias c ON c.id = lc.id_categoria "
+     "WHERE lc.id_livro IN (%s, %s, %s) ORDER BY c.nome",
+     (1, 2, 3)),
+    ("Verificação de posse (livro_categoria)",
+     "SELECT id FROM categorias WHERE id = %s AND id_usuario = %s",
+     (1, USUARIO_EXEMPLO)),
+]
+
+ACESSOS_PROIBIDOS = {'ALL', 'index'}
+
+def _acessos(no, encontrados):
+    """Percorre o EXPLAIN FORMAT=JSON coletando (tabela, access_type, key)."""
+    if isinstance(no, dict):
+        if 'table_name' in no and 'access_type' in no:
+            encontrados.append((no['table_name'], no['access_type'], no.get('key')))
+        for valor in no.values():
+            _acessos(valor, encontrados)
+    elif isinstance(no, list):
+        for item in no:
+            _acessos(item, encontrados)
+    return encontrados
+
+def verificar_planos(conn, saida=print):
+    """Roda EXPLAIN nas consultas conhecidas; retorna a lista de regressões (vazia = ok).
+    Rode contra um banco com volume realista: em tabelas quase vazias o otimizador
+    pode preferir varrer tudo."""
+    problemas = []
+    cursor = conn.cursor()
+    try:
+        for nome, sql, valores in CONSULTAS_VERIFICADAS:
+            cursor.execute("EXPLAIN FORMAT=JSON " + sql, valores)
+            plano = json.loads(cursor.fetchone()[0])
+            acessos = _acessos(plano, [])
+            ruins = [(tabela, tipo) for tabela, tipo, _ in acessos if tipo in ACESSOS_PROIBIDOS]
+            if ruins:
+                problemas.append((nome, ruins))
+                saida(f"[FALHA] {nome}: " + ", ".join(f"{t} ({tipo})" for t, tipo in ruins))
+            else:
+                saida(f"[ok]    {nome}: " + ", ".join(f"{t}={tipo}/{chave}" for t, tipo, chave in acessos))
+    finally:
+        cursor.close()
+    return problemas
@@ -0,0 +1,154 @@
+# utils/repositorio.py
+# Consultas de tamanho fixo de livros, categorias, associações e usuários, executadas como
+# instruções preparadas no servidor: o MySQL analisa cada uma uma vez por conexão do pool e depois
+# só recebe os parâmetros (ConexaoPooled.preparada). As linhas voltam como namedtuples, com o
+# mapa de colunas montado uma vez por consulta.
+# Quem chama cuida da transação (commit/rollback), como em utils/estatisticas_utils.py.
+# Consultas de forma variável (filtros da listagem, facetas, lotes com IN de tamanho variável,
+# exportação em streaming) continuam nas rotas, com cursor comum: prepará-las encheria o cache.
+from collections import namedtuple
+
+from utils.estatisticas_utils import COLUNAS_ESTATISTICAS
+
+_tipos_linha = {} # colunas -> namedtuple
+
+def tipo_linha(colunas):
+    """namedtuple para as colunas (criado uma vez por conjunto de colunas)."""
+    colunas = tuple(colunas)
+    tipo = _tipos_linha.get(colunas)
+    if tipo is None:
+        tipo = _tipos_linha.setdefault(colunas, namedtuple('Linha', colunas, rename=True))
+    return tipo
+
+def _executar(conn, sql, valores):
+    cursor = conn.preparada(sql)
+    cursor.execute(sql, valores)
+    return cursor
+
+def _linhas(conn, sql, valores):
+    cursor = _executar(conn, sql, valores)
+    linhas = cursor.fetchall() # Sempre até o fim: o cursor preparado é reutilizado depois
+    tipo = tipo_linha(cursor.column_names)
+    return [tipo._make(linha) for linha in linhas]
+
+def _linha(conn, sql, valores):
+    linhas = _linhas(conn, sql, valores)
+    return linhas[0] if linhas else None
+
+# --- Usuários ---
+
+def usuario_por_username(conn, username):
+    return _linha(conn, "SELECT id, username, password_hash FROM usuarios WHERE username = %s", (username,))
+
+def email_em_uso(conn, email):
+    return _linha(conn, "SELECT id FROM usuarios WHERE email = %s", (email,)) is not None
+
+def inserir_usuario(conn, user_id, username, password_hash, email):
+    _executar(conn, "INSERT INTO usuarios (id, username, password_hash, email) VALUES (%s, %s, %s, %s)",
+              (user_id, username, password_hash, email))
+
+def atualizar_hash_senha(conn, user_id, password_hash):
+    _executar(conn, "UPDATE usuarios SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+
+# --- Livros ---
+
+SQL_INSERIR_LIVRO = """
+INSERT INTO livros (
+    isbn, titulo, autores, genero, editora, ano_publicacao,
+    numero_paginas, capa_url, localizacao_fisica, notas_pessoais,
+    idioma, data_inicio_leitura, data_fim_leitura, data_cadastro, id_usuario
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s)
+"""
+
+# Campos que PUT /livros/<id> pode alterar
+CAMPOS_ATUALIZAVEIS_LIVRO = [
+    'isbn', 'titulo', 'autores', 'genero', 'editora', 'ano_publicacao',
+    'numero_paginas', 'capa_url', 'localizacao_fisica', 'notas_pessoais',
+    'idioma', 'data_inicio_leitura', 'data_fim_leitura'
+]
+
+def livro_por_id(conn, livro_id, id_usuario):
+    return _linha(conn, "SELECT * FROM livros WHERE id = %s AND id_usuario = %s", (livro_id, id_usuario))
+
+def livro_existe(conn, livro_id, id_usuario):
+    return _linha(conn, "SELECT id FROM livros WHERE id = %s AND id_usuario = %s", (livro_id, id_usuario)) is not None
+
+def inserir_livro(conn, valores):
+    """valores na ordem de SQL_INSERIR_LIVRO; retorna o id do livro."""
+    return _executar(conn, SQL_INSERIR_LIVRO, valores).lastrowid
+
+def livro_para_estatisticas(conn, livro_id, id_usuario):
+    """Colunas que alimentam as estatísticas (dict), travando a linha até o fim da transação."""
+    linha = _linha(
+        conn,
+        f"SELECT {', '.join(COLUNAS_ESTATISTICAS)} FROM livros WHERE id = %s AND id_usuario = %s FOR UPDATE",
+        (livro_id, id_usuario)
+    )
+    return linha._asdict() if linha else None
+
+def atualizar_livro(conn, livro_id, id_usuario, campos, limpar_capa=False):
+    """UPDATE só dos campos informados (chaves de CAMPOS_ATUALIZAVEIS_LIVRO). Retorna as linhas alteradas.
+    Cada combinação de campos é uma instrução preparada à parte; na prática são poucas."""
+    nomes = [campo for campo in CAMPOS_ATUALIZAVEIS_LIVRO if campo in campos]
+    set_clauses = [f"{campo} = %s" for campo in nomes]
+    if limpar_capa:
+        set_clauses.append("capa_hash = NULL") # A capa local antiga não vale mais; uma nova é baixada
+    sql = f"UPDATE livros SET {', '.join(set_clauses)} WHERE id = %s AND id_usuario = %s"
+    return _executar(conn, sql, (*[campos[campo] for campo in nomes], livro_id, id_usuario)).rowcount
+
+def excluir_livro(conn, livro_id, id_usuario):
+    return _executar(conn, "DELETE FROM livros WHERE id = %s AND id_usuario = %s", (livro_id, id_usuario)).rowcount
+
+# --- Categorias ---
+
+def categoria_existe(conn, categoria_id, id_usuario):
+    return _linha(conn, "SELECT id FROM categorias WHERE id = %s AND id_usuario = %s",
+                  (categoria_id, id_usuario)) is not None
+
+def categoria_nome_em_uso(conn, nome, id_usuario):
+    return _linha(conn, "SELECT id FROM categorias WHERE nome = %s AND id_usuario = %s", (nome, id_usuario)) is not None
+
+def listar_categorias(conn, id_usuario):
+    # Subconsulta correlacionada: conta pelo índice de livro_categoria, sem JOIN + GROUP BY
+    return _linhas(
+        conn,
+        "SELECT c.id, c.nome, c.descricao, "
+        "(SELECT COUNT(*) FROM livro_categoria lc WHERE lc.id_categoria = c.id) AS total_livros "
+        "FROM categorias c WHERE c.id_usuario = %s",
+        (id_usuario,)
+    )
+
+def inserir_categoria(conn, nome, descricao, id_usuario):
+    return _executar(conn, "INSERT INTO categorias (nome, descricao, id_usuario) VALUES (%s, %s, %s)",
+                     (nome, descricao, id_usuario)).lastrowid
+
+def atualizar_categoria(conn, categoria_id, id_usuario, campos):
+    """campos: dict com 'nome' e/ou 'descricao'. Retorna as linhas alteradas."""
+    nomes = [campo for campo in ('nome', 'descricao') if campo in campos]
+    sql = f"UPDATE categorias SET {', '.join(f'{campo} = %s' for campo in nomes)} WHERE id = %s AND id_usuario = %s"
+    return _executar(conn, sql, (*[campos[campo] for campo in nomes], categoria_id, id_usuario)).rowcount
+
+def excluir_categoria(conn, categoria_id, id_usuario):
+    return _executar(conn, "DELETE FROM categorias WHERE id = %s AND id_usuario = %s",
+                     (categoria_id, id_usuario)).rowcount
+
+# --- Associações livro-categoria ---
+
+def categorias_do_livro(conn, livro_id):
+    return [linha.id_categoria for linha in
+            _linhas(conn, "SELECT id_categoria FROM livro_categoria WHERE id_livro = %s", (livro_id,))]
+
+def livros_da_categoria(conn, categoria_id, id_usuario):
+    return [linha.id_livro for linha in _linhas(
+        conn,
+        "SELECT lc.id_livro FROM livro_categoria lc JOIN categorias c ON c.id = lc.id_categoria "
+        "WHERE c.id = %s AND c.id_usuario = %s",
+        (categoria_id, id_usuario)
+    )]
+
+def associar(conn, livro_id, categoria_id):
+    _executar(conn, "INSERT INTO livro_categoria (id_livro, id_categoria) VALUES (%s, %s)", (livro_id, categoria_id))
+
+def desassociar(conn, livro_id, categoria_id):
+    return _executar(conn, "DELETE FROM livro_categoria WHERE id_livro = %s AND id_categoria = %s",
+                     (livro_id, categoria_id)).rowcount
@@ -0,0 +1,88 @@
+# utils/senha_utils.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturoTimeoutError
+
+import bcrypt
+
+from config import Config
+
+class FilaSenhaCheiaError(Exception):
+    """Já há cálculos de bcrypt demais na fila; a rota deve responder 429."""
+
+# --- Funções executadas nos processos do pool (precisam ser de nível de módulo) ---
+# São compatíveis com os hashes do Flask-Bcrypt ($2b$<custo>$...).
+
+def _gerar_hash(senha, custo):
+    return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(rounds=custo)).decode('utf-8')
+
+def _verificar(password_hash, senha):
+    try:
+        return bcrypt.checkpw(senha.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        return False # Hash malformado no banco
+
+# --- Pool de processos com fila limitada ---
+
+_executor = None
+_executor_pid = None
+_vagas = threading.BoundedSemaphore(max(1, Config.SENHA_FILA_MAXIMA))
+_lock = threading.Lock()
+
+def get_executor():
+    """Pool de processos do bcrypt (um por processo do servidor, criado sob demanda)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                # 'spawn' evita herdar threads e conexões abertas do servidor via fork
+                _executor = ProcessPoolExecutor(max_workers=Config.SENHA_PROCESSOS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+                _executor_pid = os.getpid()
+    return _executor
+
+def encerrar_executor():
+    """Encerra o pool de processos deste processo (desligamento do worker)."""
+    global _executor
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _executar(funcao, *args):
+    if Config.SENHA_PROCESSOS <= 0:
+        return funcao(*args) # Pool desligado: calcula na própria thread da requisição
+    if not _vagas.acquire(blocking=False):
+        raise FilaSenhaCheiaError("Muitas operações de senha em andamento. Tente novamente em instantes.")
+    try:
+        futuro = get_executor().submit(funcao, *args)
+    except BaseException:
+        _vagas.release()
+        raise
+    # A vaga só volta quando o cálculo termina (ou é cancelado antes de começar), não no
+    # timeout: senão a fila aceitaria trabalho novo enquanto os processos seguem ocupados
+    futuro.add_done_callback(lambda _: _vagas.release())
+    try:
+        return futuro.result(timeout=Config.SENHA_TIMEOUT)
+    except FuturoTimeoutError:
+        futuro.cancel() # Tira da fila se ainda não começou; um cálculo em andamento vai até o fim
+        # Fila andando devagar demais: mesmo tratamento de sobrecarga
+        raise FilaSenhaCheiaError("Tempo esgotado aguardando a verificação de senha. Tente novamente em instantes.")
+
+def gerar_hash_senha(senha):
+    """Hash bcrypt com o custo configurado em Config.BCRYPT_CUSTO."""
+    return _executar(_gerar_hash, senha, Config.BCRYPT_CUSTO)
+
+def verificar_senha(password_hash, senha):
+    return _executar(_verificar, password_hash, senha)
+
+def custo_do_hash(password_hash):
+    """'$2b$12$...' -> 12. None se o formato não for reconhecido."""
+    partes = password_hash.split('$')
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
+def precisa_rehash(password_hash):
+    return custo_do_hash(password_hash) != Config.BCRYPT_CUSTO
@@ -0,0 +1,213 @@
+# utils/versao_utils.py
+# Versão do catálogo por usuário, incrementada a cada escrita. Com ela as rotas GET geram
+# ETag/Last-Modified e respondem 304 a If-None-Match sem consultar o MySQL.
+# Onde a versão fica define o alcance: VersoesSQLite vale para uma máquina só (todos os seus
+# workers); com várias máquinas é preciso ESTADO_REDIS_URL (VersoesRedis), senão uma escrita
+# feita numa delas não muda os ETags, o cache de respostas nem a leitura do primário após
+# escrita (utils/db_utils.escolher_replica) nas outras.
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from functools import wraps
+
+from flask import request, make_response
+
+from config import Config
+from utils.cache_utils import cliente_redis, invalidar_respostas
+
+try:
+    import brotli # Opcional: sem ele só gzip é oferecido
+except ImportError:
+    brotli = None
+
+
+class VersoesMemoria:
+    """Versões só deste processo. Serve para desenvolvimento com um único worker."""
+
+    def __init__(self):
+        self.epoca = uuid.uuid4().hex[:8]
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, id_usuario):
+        with self._lock:
+            return self._versoes.get(id_usuario, (0, 0.0))
+
+    def incrementar(self, id_usuario):
+        with self._lock:
+            versao, _ = self._versoes.get(id_usuario, (0, 0.0))
+            self._versoes[id_usuario] = (versao + 1, time.time())
+
+
+class VersoesSQLite:
+    """Versões num arquivo SQLite local, compartilhadas por todos os workers da máquina."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conn = self._conexao()
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS versoes ("
+            " id_usuario TEXT PRIMARY KEY, versao INTEGER NOT NULL, modificado_em REAL NOT NULL)"
+        )
+        # A época muda se o arquivo for recriado, invalidando ETags antigos dos clientes
+        conn.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('epoca', ?)", (uuid.uuid4().hex[:8],))
+        conn.commit()
+        self.epoca = conn.execute("SELECT valor FROM meta WHERE chave = 'epoca'").fetchone()[0]
+
+    def _conexao(self):
+        # Conexões SQLite não podem ser compartilhadas entre threads nem entre processos
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def obter(self, id_usuario):
+        linha = self._conexao().execute(
+            "SELECT versao, modificado_em FROM versoes WHERE id_usuario = ?", (id_usuario,)
+        ).fetchone()
+        return linha if linha else (0, 0.0)
+
+    def incrementar(self, id_usuario):
+        conn = self._conexao()
+        conn.execute(
+            "INSERT INTO versoes (id_usuario, versao, modificado_em) VALUES (?, 1, ?) "
+            "ON CONFLICT(id_usuario) DO UPDATE SET versao = versao + 1, modificado_em = excluded.modificado_em",
+            (id_usuario, time.time())
+        )
+        conn.commit()
+
+
+class VersoesRedis:
+    """Versões num Redis, compartilhadas por todas as máquinas (um hash por usuário)."""
+
+    def __init__(self, cliente, prefixo):
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self.cliente.set(f"{prefixo}epoca", uuid.uuid4().hex[:8], nx=True)
+        self.epoca = self.cliente.get(f"{prefixo}epoca").decode('ascii')
+
+    def obter(self, id_usuario):
+        versao, modificado_em = self.cliente.hmget(f"{self.prefixo}versao:{id_usuario}", 'versao', 'modificado_em')
+        if versao is None:
+            return (0, 0.0)
+        return int(versao), float(modificado_em or 0.0)
+
+    def incrementar(self, id_usuario):
+        chave = f"{self.prefixo}versao:{id_usuario}"
+        pipeline = self.cliente.pipeline() # MULTI/EXEC: versão e instante mudam juntos
+        pipeline.hincrby(chave, 'versao', 1)
+        pipeline.hset(chave, 'modificado_em', repr(time.time()))
+        pipeline.execute()
+
+
+_versoes = None
+_lock = threading.Lock()
+
+def criar_versoes():
+    if Config.ESTADO_REDIS_URL:
+        return VersoesRedis(cliente_redis(Config.ESTADO_REDIS_URL, "ESTADO_REDIS_URL"), Config.ESTADO_REDIS_PREFIXO)
+    if Config.VERSOES_ARQUIVO:
+        return VersoesSQLite(Config.VERSOES_ARQUIVO)
+    return VersoesMemoria()
+
+def get_versoes():
+    global _versoes
+    if _versoes is None:
+        with _lock:
+            if _versoes is None:
+                _versoes = criar_versoes()
+    return _versoes
+
+def versao_catalogo(id_usuario):
+    """(versão, instante da última alteração) do catálogo do usuário."""
+    return get_versoes().obter(id_usuario)
+
+def incrementar_versao(id_usuario):
+    get_versoes().incrementar(id_usuario)
+
+def _etag_base(id_usuario, versao):
+    # A mesma versão gera corpos diferentes para rotas/filtros diferentes
+    consulta = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    bruto = f"{get_versoes().epoca}|{id_usuario}|{versao}|{request.path}|{consulta}"
+    return hashlib.sha1(bruto.encode('utf-8')).hexdigest()
+
+def _comprimir(response, etag):
+    """gzip/brotli para respostas grandes. Cada codificação tem seu próprio ETag forte."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.calculate_content_length() is None
+            or response.calculate_content_length() < Config.COMPRESSAO_MINIMO_BYTES):
+        return etag
+    aceitas = request.accept_encodings
+    if brotli is not None and aceitas['br']:
+        response.set_data(brotli.compress(response.get_data()))
+        codificacao = 'br'
+    elif aceitas['gzip']:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=Config.COMPRESSAO_NIVEL_GZIP))
+        codificacao = 'gzip'
+    else:
+        return etag
+    response.headers['Content-Encoding'] = codificacao
+    return f"{etag}-{codificacao}"
+
+def com_etag(f):
+    """Para rotas GET protegidas (abaixo de @token_required): ETag, Last-Modified e 304."""
+    @wraps(f)
+    def decorated(current_user_id, *args, **kwargs):
+        # A versão é lida ANTES da consulta: se uma escrita acontecer no meio, o
+        # ETag fica "velho" e o próximo pedido recebe o corpo novo, nunca o contrário
+        versao, modificado_em = versao_catalogo(current_user_id)
+        etag = _etag_base(current_user_id, versao)
+        variantes = [etag, f"{etag}-gzip", f"{etag}-br"]
+
+        correspondente = next((v for v in variantes if request.if_none_match.contains(v)), None)
+        if correspondente is not None:
+            resposta = make_response('', 304)
+            etag = correspondente # O 304 devolve o validador da representação que o cliente tem
+        elif (not request.if_none_match and request.if_modified_since and modificado_em
+              and int(modificado_em) <= request.if_modified_since.timestamp()):
+            resposta = make_response('', 304)
+        else:
+            resposta = make_response(f(current_user_id, *args, **kwargs))
+            if resposta.status_code != 200:
+                return resposta
+            etag = _comprimir(resposta, etag)
+
+        resposta.set_etag(etag)
+        if modificado_em:
+            resposta.headers['Last-Modified'] = formatdate(modificado_em, usegmt=True)
+        # O navegador guarda, mas sempre revalida (os dados são por usuário)
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        resposta.vary.add('Authorization')
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+    return decorated
+
+def catalogo_alterado(id_usuario):
+    """Nova versão e cache de respostas do usuário invalidado. Para rotas que confirmaram parte
+    das escritas e ainda assim respondem com erro (que @altera_catalogo ignora)."""
+    incrementar_versao(id_usuario)
+    invalidar_respostas(id_usuario)
+
+def altera_catalogo(f):
+    """Para rotas de escrita (abaixo de @token_required): nova versão após uma escrita bem-sucedida."""
+    @wraps(f)
+    def decorated(current_user_id, *args, **kwargs):
+        resposta = make_response(f(current_user_id, *args, **kwargs))
+        if 200 <= resposta.status_code < 300:
+            catalogo_alterado(current_user_id)
+        return resposta
+    return decorated
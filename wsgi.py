@@ -0,0 +1,5 @@
+# wsgi.py
+# Ponto de entrada para servidores WSGI de produção (o app.run de app.py é só para desenvolvimento):
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+from app import app